@@ -3,26 +3,73 @@ YOLOv8 Clinical Vision API
 Análise de vídeo clínico especializado em saúde da mulher.
 
 Endpoints:
-  GET  /health            - health check
+  GET  /health            - health check (processo vivo)
+  GET  /ready             - prontidão: 503 até os modelos carregarem e aquecerem
   POST /detect            - analisa arquivo de vídeo completo
   POST /detect/frames     - analisa lista de frames base64
+  POST /detect/frames/binary - analisa frames JPEG binários (multipart ou length-prefixed)
+  POST /detect/frame      - analisa um único frame base64 (tempo real, polling)
+  WS   /ws/detect         - stream de frames JPEG binários (tempo real)
+  POST /jobs              - enfileira análise assíncrona de vídeo longo
+  GET  /jobs/{id}         - progresso e resultados parciais do job
+  GET  /jobs/{id}/result  - DetectionResponse final do job
 
 Usage:
   uvicorn main:app --host 0.0.0.0 --port 8000 --reload
+  YOLO_SERVING_MODE=processes uvicorn main:app --host 0.0.0.0 --port 8000   # 1 processo de inferência por núcleo físico
 """
 import os
+import json
+import time
+import asyncio
 import base64
 import tempfile
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable
+from pathlib import Path
 
 import cv2
 import numpy as np
-from fastapi import FastAPI, File, Form, UploadFile, HTTPException
+from fastapi import FastAPI, File, Form, UploadFile, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 
-from schemas.detection import DetectionResponse, FramesInput
+from schemas.detection import DetectionResponse, FramesInput, JobStatus
 from services.detector import YOLODetector
-from services.analyzer import analyze_clinical_context
+from services.sampler import FrameSampler
+from services.executor import InferenceExecutor, ExecutorSaturated
+from services.batcher import MicroBatcher
+from services.backends import configure_backend, default_intra_op_threads
+from services.process_pool import ProcessInferencePool, physical_cores
+from services.frame_cache import FrameResultCache
+from services.video_cache import VideoResultCache, video_digest
+from services.resolution import ResolutionPolicy, round_imgsz
+from services.jobs import JobManager, DONE, FAILED
+from services.analyzer import analyze_clinical_context, ClinicalContextAccumulator
 from services.clinical_analyzer import analyze_for_context
+from services.poses import PoseArray
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if process_pool is not None:
+        process_pool.start()
+    job_manager.start()
+    # Warm-up runs in the background: /health answers at once, /ready once it is done
+    warmup_task = asyncio.create_task(_warm_up())
+    yield
+    warmup_task.cancel()
+    job_manager.stop()
+    await frame_batcher.close()
+    executor.shutdown(wait=False)
+    _decode_pool.shutdown(wait=False, cancel_futures=True)
+    if process_pool is not None:
+        process_pool.close()
+
 
 app = FastAPI(
     title="YOLOv8 Clinical Vision API",
@@ -35,6 +82,7 @@ app = FastAPI(
         "- **consultation**: consulta médica (ambiente clínico, profissional + paciente)"
     ),
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -44,44 +92,331 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-detector = YOLODetector()
+# Max frames per model forward pass for the multi-frame endpoints
+MAX_BATCH_SIZE = int(os.getenv("YOLO_MAX_BATCH_SIZE", "8"))
+
+# Frame sampler for /detect: YOLO_KEYFRAME_INTERVAL = encoder GOP in frames (default 2 s
+# of video); YOLO_SNAP_KEYFRAMES=1 moves sparse samples onto keyframes for cheaper seeks.
+sampler = FrameSampler(
+    keyframe_interval=int(os.getenv("YOLO_KEYFRAME_INTERVAL", "0")) or None,
+    snap_to_keyframes=os.getenv("YOLO_SNAP_KEYFRAMES", "0") == "1",
+)
+
+# Model input size (ultralytics imgsz, rounded to a multiple of 32) per endpoint:
+# YOLO_IMGSZ for all of them (default 640), overridden by YOLO_IMGSZ_FRAME (/detect/frame,
+# /ws/detect, /detect/frames*), YOLO_IMGSZ_SAMPLE (/detect mode=sample) and
+# YOLO_IMGSZ_DENSE (/detect and /jobs mode=dense). Lower is faster; higher finds
+# smaller, more distant people.
+_IMGSZ_DEFAULT = int(os.getenv("YOLO_IMGSZ", "640"))
+IMGSZ = {
+    endpoint: round_imgsz(int(os.getenv(f"YOLO_IMGSZ_{endpoint.upper()}", "0")) or _IMGSZ_DEFAULT)
+    for endpoint in ("frame", "sample", "dense")
+}
+
+# Dense analysis also adapts the resolution along each video (services/resolution.py):
+# with YOLO_ADAPTIVE_MIN_IMGSZ > 0 the input size drops (down to that value) while the
+# people in recent frames keep at least YOLO_SUBJECT_PX pixels of height; YOLO_POSE_ROI=1
+# runs the pose model on a crop around the people of the previous batch (the whole frame
+# again every YOLO_POSE_ROI_REFRESH batches; ignored by YOLO_INFERENCE_MODE=crops, which
+# crops each person of the current frame).
+DENSE_RESOLUTION = {
+    "imgsz": IMGSZ["dense"],
+    "min_imgsz": int(os.getenv("YOLO_ADAPTIVE_MIN_IMGSZ", "0")) or None,
+    "subject_px": int(os.getenv("YOLO_SUBJECT_PX", "96")),
+    "roi": os.getenv("YOLO_POSE_ROI", "0") == "1",
+    "roi_refresh": int(os.getenv("YOLO_POSE_ROI_REFRESH", "4")),
+}
+
+# YOLO_INFERENCE_MODE=unified takes person boxes from the pose model and runs the
+# object model only on 1 of every YOLO_OBJECT_EVERY frames (or on every frame for
+# the surgery hint), instead of both models on every frame ("dual", default).
+# YOLO_INFERENCE_MODE=crops runs the pose model only on the people found by the
+# object model: one crop per person (YOLO_POSE_CROP_PADDING margin around the box,
+# letterboxed to YOLO_POSE_CROP_IMGSZ), none on frames without people.
+detector = YOLODetector(
+    max_batch_size=MAX_BATCH_SIZE,
+    sampler=sampler,
+    inference_mode=os.getenv("YOLO_INFERENCE_MODE", "dual"),
+    object_every=int(os.getenv("YOLO_OBJECT_EVERY", "3")),
+    imgsz=round_imgsz(_IMGSZ_DEFAULT),
+    pose_crop_imgsz=round_imgsz(int(os.getenv("YOLO_POSE_CROP_IMGSZ", "256"))),
+    pose_crop_padding=float(os.getenv("YOLO_POSE_CROP_PADDING", "0.2")),
+)
+
+# Hints whose analysis depends on non-person objects (instruments) in every frame
+_OBJECT_HINTS = {"surgery", "cirurgia"}
+
+# Dense /detect mode: analyze one frame every YOLO_DENSE_STRIDE frames of the whole
+# video; frame_detections reports at most YOLO_DENSE_MAX_REPORTED scene-change frames.
+DENSE_STRIDE = int(os.getenv("YOLO_DENSE_STRIDE", "15"))
+DENSE_MAX_REPORTED_FRAMES = int(os.getenv("YOLO_DENSE_MAX_REPORTED", "64"))
+
+# All CPU-bound work (decode, inference, overlay encode) runs here, off the event loop.
+# Workers default to the number of cores; queue depth to 4x workers.
+executor = InferenceExecutor(
+    max_workers=int(os.getenv("YOLO_INFERENCE_WORKERS", "0")) or None,
+    max_queue=int(os.getenv("YOLO_INFERENCE_QUEUE")) if os.getenv("YOLO_INFERENCE_QUEUE") else None,
+)
+
+# Model runtime: YOLO_BACKEND=torch (default) | onnx | openvino. Exports are cached in
+# assets/models/exported/. Runtime threads per forward pass default to the cores
+# divided among inference workers (YOLO_BACKEND_THREADS / YOLO_BACKEND_INTER_THREADS).
+# YOLO_PRECISION=int8 serves the quantized exports made by scripts/quantize_models.py.
+model_loader = configure_backend(
+    os.getenv("YOLO_BACKEND", "torch"),
+    intra_op_threads=int(os.getenv("YOLO_BACKEND_THREADS", "0")) or default_intra_op_threads(executor.max_workers),
+    inter_op_threads=int(os.getenv("YOLO_BACKEND_INTER_THREADS", "1")),
+    precision=os.getenv("YOLO_PRECISION", "fp32"),
+)
+
+# Startup warm-up: every inference worker loads its models and runs dummy
+# forward passes on YOLO_WARMUP_FRAME-sized (WxH) frames at batch size 1 and at
+# the configured batch sizes, before /ready reports ready. YOLO_WARMUP=0 skips it
+# (models then load on the first request, as in development with --reload).
+WARMUP_ENABLED = os.getenv("YOLO_WARMUP", "1") == "1"
+WARMUP_FRAME_SIZE = tuple(int(v) for v in os.getenv("YOLO_WARMUP_FRAME", "1280x720").lower().split("x"))
+
+# Single-frame requests (/detect/frame) are grouped into batches: a batch closes
+# at YOLO_MICROBATCH_SIZE frames or YOLO_MICROBATCH_WAIT_MS after its first frame.
+frame_batcher = MicroBatcher(
+    lambda frames, frame_indices: _detect_batch(frames, frame_indices),
+    executor,
+    max_batch_size=int(os.getenv("YOLO_MICROBATCH_SIZE", str(MAX_BATCH_SIZE))),
+    max_wait_ms=float(os.getenv("YOLO_MICROBATCH_WAIT_MS", "10")),
+)
+
+WARMUP_BATCH_SIZES = tuple(sorted({1, MAX_BATCH_SIZE, frame_batcher.max_batch_size}))
+WARMUP_IMGSIZES = tuple(sorted(set(IMGSZ.values())))
+
+# YOLO_SERVING_MODE=processes runs the models in YOLO_PROCESS_WORKERS processes
+# (default: one per physical core) instead of the executor threads. Frames up to
+# YOLO_SHM_MAX_FRAME (WxH) travel through a shared-memory ring of YOLO_SHM_SLOTS
+# slots; executor threads then only decode, wait and build responses. A request
+# fails after waiting YOLO_PROCESS_TIMEOUT_S (default 120) for its worker results.
+SERVING_MODE = os.getenv("YOLO_SERVING_MODE", "threads")
+if SERVING_MODE not in ("threads", "processes"):
+    raise ValueError(f"YOLO_SERVING_MODE deve ser threads ou processes: {SERVING_MODE!r}")
+
+process_pool: ProcessInferencePool | None = None
+if SERVING_MODE == "processes":
+    _process_workers = int(os.getenv("YOLO_PROCESS_WORKERS", "0")) or physical_cores()
+    process_pool = ProcessInferencePool(
+        workers=_process_workers,
+        max_batch_size=MAX_BATCH_SIZE,
+        slots=int(os.getenv("YOLO_SHM_SLOTS", "0")) or None,
+        max_frame_size=tuple(int(v) for v in os.getenv("YOLO_SHM_MAX_FRAME", "1280x720").lower().split("x")),
+        result_timeout=float(os.getenv("YOLO_PROCESS_TIMEOUT_S", "120")),
+        detector_kwargs={
+            "inference_mode": detector.inference_mode,
+            "object_every": detector.object_every,
+            "imgsz": detector.imgsz,
+            "pose_crop_imgsz": detector.pose_crop_imgsz,
+            "pose_crop_padding": detector.pose_crop_padding,
+        },
+        backend={
+            "backend": model_loader.backend,
+            "intra_op_threads": (int(os.getenv("YOLO_BACKEND_THREADS", "0"))
+                                 or default_intra_op_threads(_process_workers)),
+            "inter_op_threads": model_loader.inter_op_threads,
+            "precision": model_loader.precision,
+        },
+        warmup={
+            "frame_size": WARMUP_FRAME_SIZE,
+            "batch_sizes": WARMUP_BATCH_SIZES,
+            "imgsizes": WARMUP_IMGSIZES,
+        } if WARMUP_ENABLED else None,
+    )
+
+# Whatever runs detect_batch(frames, need_objects) in this serving mode
+inference = process_pool or detector
+
+# Frame result cache: repeated frames (paused video, idle exam room) reuse earlier
+# detections and /detect/frame responses instead of running the models again.
+# YOLO_FRAME_CACHE=exact (default, identical pixels) | perceptual (near-duplicates
+# within YOLO_FRAME_CACHE_DISTANCE of 64 dHash bits) | off. Results live
+# YOLO_FRAME_CACHE_TTL_S seconds; at most YOLO_FRAME_CACHE_ENTRIES results and
+# YOLO_FRAME_CACHE_MB megabytes are kept.
+frame_cache = FrameResultCache(
+    max_entries=int(os.getenv("YOLO_FRAME_CACHE_ENTRIES", "512")),
+    max_bytes=int(os.getenv("YOLO_FRAME_CACHE_MB", "64")) * 1024 * 1024,
+    ttl_s=float(os.getenv("YOLO_FRAME_CACHE_TTL_S", "30")),
+    mode=os.getenv("YOLO_FRAME_CACHE", "exact"),
+    max_distance=int(os.getenv("YOLO_FRAME_CACHE_DISTANCE", "4")),
+)
+
+# Video cache: /detect and /jobs keep the hint-independent part of every video
+# analysis (per-frame detections, aggregate counters) on disk under
+# YOLO_VIDEO_CACHE_DIR, keyed by video content + sampling params + model
+# versions, so re-uploading a recording with another analysis_type only reruns
+# the aggregation. At most YOLO_VIDEO_CACHE_MB megabytes are kept (0 disables it).
+video_cache = VideoResultCache(
+    Path(os.getenv("YOLO_VIDEO_CACHE_DIR", str(Path(__file__).parent / "assets" / "cache" / "videos"))),
+    max_bytes=int(os.getenv("YOLO_VIDEO_CACHE_MB", "256")) * 1024 * 1024,
+)
+
+# Weights whose content is part of the video cache key (missing files are skipped)
+_MODEL_WEIGHTS = (
+    Path(__file__).parent / "yolov8n.pt",
+    Path(__file__).parent / "yolov8n-pose.pt",
+    Path(__file__).parent / "assets" / "models" / "surgical_classifier.pt",
+)
+_model_versions: dict | None = None
+
+# /detect/frame and /ws/detect render profiles: none (coordinates only), thumbnail
+# (annotated frame downscaled to YOLO_THUMBNAIL_SIZE px on its longer side), full
+# (annotated frame) or layer (transparent PNG with just the overlay, composited
+# over the video by the browser).
+RENDER_PROFILES = ("none", "thumbnail", "full", "layer")
+THUMBNAIL_SIZE = int(os.getenv("YOLO_THUMBNAIL_SIZE", "320"))
+
+# Largest accepted upload (video or binary frames); bigger bodies get 413 before being read
+MAX_UPLOAD_BYTES = int(os.getenv("YOLO_MAX_UPLOAD_MB", "500")) * 1024 * 1024
+_UPLOAD_CHUNK = 1024 * 1024
+# Endpoints taking a file upload (_upload_path, _read_body)
+_UPLOAD_PATHS = {"/detect", "/jobs", "/detect/frames/binary"}
+
+
+@app.middleware("http")
+async def _reject_oversized_uploads(request: Request, call_next):
+    # Starlette parses the multipart body before the endpoint runs, so the
+    # declared size is checked here to fail fast on huge recordings.
+    length = request.headers.get("content-length")
+    if (request.method == "POST" and request.url.path in _UPLOAD_PATHS
+            and length and length.isdigit() and int(length) > MAX_UPLOAD_BYTES):
+        return JSONResponse(status_code=413, content={"detail": _upload_too_large_msg()})
+    return await call_next(request)
+
+# Asynchronous jobs (/jobs): persisted under YOLO_JOBS_DIR, run by YOLO_JOB_WORKERS
+# dedicated threads so long videos don't occupy the realtime inference executor.
+# Finished jobs are deleted after YOLO_JOB_RETENTION_HOURS (default 24) and beyond
+# the YOLO_JOB_MAX_FINISHED (default 1000) most recent ones; 0 disables either limit.
+job_manager = JobManager(
+    Path(os.getenv("YOLO_JOBS_DIR", str(Path(__file__).parent / "assets" / "jobs"))),
+    lambda job, video_path, report: _run_job(job, video_path, report),
+    workers=int(os.getenv("YOLO_JOB_WORKERS", "1")),
+    retention_s=float(os.getenv("YOLO_JOB_RETENTION_HOURS", "24")) * 3600 or None,
+    max_finished=int(os.getenv("YOLO_JOB_MAX_FINISHED", "1000")) or None,
+)
+
+
+@app.exception_handler(ExecutorSaturated)
+async def _executor_saturated_handler(request: Request, exc: ExecutorSaturated):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
 
 
 # ── Routes ─────────────────────────────────────────────────────────────────
 
+@app.get("/ready", summary="Readiness: modelos carregados e aquecidos")
+async def ready():
+    return JSONResponse(status_code=200 if _readiness["ready"] else 503, content=_readiness)
+
+
 @app.get("/health", summary="Health check")
 async def health():
-    return {"status": "ok", "model": "yolov8n", "pose_model": "yolov8n-pose"}
+    return {
+        "status": "ok",
+        "model": "yolov8n",
+        "pose_model": "yolov8n-pose",
+        "inference_mode": detector.inference_mode,
+        "backend": model_loader.backend,
+        "precision": model_loader.precision,
+        "serving_mode": SERVING_MODE,
+        "imgsz": IMGSZ,
+        "dense_resolution": DENSE_RESOLUTION,
+        "inference": executor.stats(),
+        "processes": process_pool.stats() if process_pool is not None else None,
+        "microbatch": frame_batcher.stats(),
+        "frame_cache": frame_cache.stats(),
+        "video_cache": video_cache.stats(),
+    }
 
 
 @app.post(
     "/detect",
     response_model=DetectionResponse,
     summary="Analisa arquivo de vídeo",
-    description="Recebe um arquivo de vídeo (mp4/webm/avi) e retorna análise clínica YOLOv8.",
+    description=(
+        "Recebe um arquivo de vídeo (mp4/webm/avi) e retorna análise clínica YOLOv8.\n\n"
+        "- `mode=sample` (padrão): 8 frames uniformemente espaçados;\n"
+        "- `mode=dense`: o vídeo inteiro a cada `stride` frames, com amostragem extra "
+        "em mudanças de cena. `frame_detections` lista apenas os frames de mudança de cena."
+    ),
 )
 async def detect_video(
     file: UploadFile = File(..., description="Arquivo de vídeo (.mp4, .webm, .avi)"),
     analysis_type: str | None = Form(None, description="Hint de tipo: surgery | physiotherapy | violence_screening | consultation"),
+    mode: str = Form("sample", description="sample | dense"),
+    stride: int | None = Form(None, ge=1, description="Passo entre frames no modo dense"),
 ):
-    suffix = os.path.splitext(file.filename or "video.mp4")[1] or ".mp4"
+    if mode not in {"sample", "dense"}:
+        raise HTTPException(status_code=422, detail="mode deve ser 'sample' ou 'dense'.")
 
-    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
-        content = await file.read()
-        tmp.write(content)
-        tmp_path = tmp.name
+    video_path, is_copy = await run_in_threadpool(_upload_path, file)
 
     try:
-        frames = detector.extract_frames(tmp_path, num_frames=8)
-        if not frames:
-            raise HTTPException(status_code=422, detail="Não foi possível extrair frames do vídeo.")
-        return _process_frames(frames, hint=analysis_type)
-    except HTTPException:
+        if mode == "dense":
+            return await executor.run(_analyze_video_dense, video_path, analysis_type, stride or DENSE_STRIDE)
+        return await executor.run(_analyze_video, video_path, analysis_type)
+    except (HTTPException, ExecutorSaturated):
         raise
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc)) from exc
     finally:
-        os.unlink(tmp_path)
+        if is_copy:
+            os.unlink(video_path)
+
+
+@app.post(
+    "/jobs",
+    response_model=JobStatus,
+    status_code=202,
+    summary="Enfileira análise assíncrona de vídeo",
+    description=(
+        "Recebe um vídeo e retorna imediatamente um job. Acompanhe o progresso em "
+        "`GET /jobs/{id}` e obtenha o resultado em `GET /jobs/{id}/result`. "
+        "A fila é persistida em disco e sobrevive a reinícios do servidor."
+    ),
+)
+async def create_job(
+    file: UploadFile = File(..., description="Arquivo de vídeo (.mp4, .webm, .avi)"),
+    analysis_type: str | None = Form(None, description="Hint de tipo clínico"),
+    mode: str = Form("dense", description="sample | dense"),
+    stride: int | None = Form(None, ge=1, description="Passo entre frames no modo dense"),
+):
+    if mode not in {"sample", "dense"}:
+        raise HTTPException(status_code=422, detail="mode deve ser 'sample' ou 'dense'.")
+
+    video_path, is_copy = await run_in_threadpool(_upload_path, file)
+    try:
+        job = await run_in_threadpool(job_manager.submit, video_path, {
+            "analysis_type": analysis_type,
+            "mode": mode,
+            "stride": stride or DENSE_STRIDE,
+        }, _upload_suffix(file), is_copy)
+    finally:
+        if is_copy and os.path.exists(video_path):
+            os.unlink(video_path)
+    return _job_status(job)
+
+
+@app.get("/jobs/{job_id}", response_model=JobStatus, summary="Progresso de um job")
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado.")
+    return _job_status(job)
+
+
+@app.get("/jobs/{job_id}/result", response_model=DetectionResponse, summary="Resultado final de um job")
+async def get_job_result(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado.")
+    if job["status"] == FAILED:
+        raise HTTPException(status_code=500, detail=f"Job falhou: {job['error']}")
+    if job["status"] != DONE:
+        raise HTTPException(status_code=409, detail=f"Job ainda não concluído (status: {job['status']}).")
+    return job["result"]
 
 
 @app.post(
@@ -91,22 +426,37 @@ async def detect_video(
     description="Recebe uma lista de frames codificados em base64 (JPEG) e retorna análise clínica YOLOv8.",
 )
 async def detect_frames(payload: FramesInput):
-    frames: list[np.ndarray] = []
+    return await executor.run(_analyze_b64_frames, payload.frames, payload.analysis_type)
 
-    for b64 in payload.frames:
-        try:
-            img_bytes = base64.b64decode(b64)
-            arr = np.frombuffer(img_bytes, np.uint8)
-            frame = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-            if frame is not None:
-                frames.append(frame)
-        except Exception:
-            continue
 
-    if not frames:
-        raise HTTPException(status_code=400, detail="Nenhum frame válido fornecido.")
+@app.post(
+    "/detect/frames/binary",
+    response_model=DetectionResponse,
+    summary="Analisa frames JPEG binários (sem base64)",
+    description=(
+        "Variante binária de /detect/frames. Aceita dois formatos de corpo:\n\n"
+        "- `multipart/form-data`: uma parte de arquivo `frames` por JPEG, "
+        "mais o campo opcional `analysis_type`;\n"
+        "- `application/octet-stream`: frames concatenados, cada um precedido do seu "
+        "tamanho em 4 bytes big-endian; `analysis_type` via query string.\n\n"
+        "Os JPEGs são decodificados diretamente do buffer da requisição, em paralelo "
+        "com a inferência do lote anterior."
+    ),
+)
+async def detect_frames_binary(request: Request, analysis_type: str | None = None):
+    content_type = request.headers.get("content-type", "")
+
+    if content_type.startswith("multipart/form-data"):
+        async with request.form() as form:
+            buffers = [await part.read() for part in form.getlist("frames") if hasattr(part, "read")]
+            analysis_type = form.get("analysis_type") or analysis_type
+    else:
+        buffers = _split_length_prefixed(await _read_body(request))
 
-    return _process_frames(frames, hint=payload.analysis_type)
+    if not buffers:
+        raise HTTPException(status_code=400, detail="Nenhum frame fornecido.")
+
+    return await executor.run(_analyze_jpeg_buffers, buffers, analysis_type)
 
 
 @app.post(
@@ -115,45 +465,626 @@ async def detect_frames(payload: FramesInput):
     description=(
         "Recebe um único frame JPEG em base64 e retorna detecções de objetos e pose "
         "com bounding boxes anotadas. Projetado para polling de baixa latência (~10 fps) "
-        "a partir do frontend."
+        "a partir do frontend. Frames repetidos são respondidos do cache de resultados. "
+        "Com `stream_id`, os frames de um mesmo cliente são contados como um stream "
+        "(cadência do modelo de objetos no modo unified); sem ele, todo frame roda os dois modelos."
     ),
 )
 async def detect_single_frame(
     frame_b64: str = Form(..., description="Frame JPEG em base64"),
     analysis_type: str | None = Form(None, description="Hint de tipo clínico"),
-    draw_overlay: bool = Form(True, description="Se true, retorna frame anotado em base64"),
+    draw_overlay: bool = Form(True, description="Se true, retorna frame anotado em base64 (render=full)"),
+    render: str | None = Form(None, description="none | thumbnail | full | layer (substitui draw_overlay)"),
+    stream_id: str | None = Form(None, description="Identificador do stream do cliente (cadência do modo unified)"),
 ):
     """
     Endpoint de tempo real para detecção frame-a-frame.
 
+    Perfis de renderização (`render`):
+        none       apenas coordenadas, sem imagem
+        thumbnail  frame anotado reduzido (lado maior = YOLO_THUMBNAIL_SIZE)
+        full       frame anotado no tamanho original (padrão, draw_overlay=true)
+        layer      só o overlay: PNG transparente da região desenhada, que o
+                   navegador compõe sobre o vídeo na posição (x, y)
+
     Returns:
         {
           detections: [{class_name, confidence, x1, y1, x2, y2}],
           poses: [{person_id, posture_label, keypoints}],
           person_count: int,
           clinical_context: str,
-          annotated_frame: str | null   # base64 JPEG com overlay desenhado
+          render: str,
+          annotated_frame: str | null   # base64 JPEG com overlay desenhado (thumbnail | full)
+          overlay_layer: {x, y, width, height, png} | null
+                                        # layer: base64 PNG RGBA da região desenhada, posição em pixels do frame
         }
     """
+    render = _render_profile(render, draw_overlay)
+    frame, fingerprint = await executor.run(_fingerprinted, _decode_single_frame, frame_b64)
+    return await _cached_frame_response(frame, fingerprint, analysis_type, render, _frame_stream_index(stream_id))
+
+
+@app.websocket("/ws/detect")
+async def ws_detect(websocket: WebSocket):
+    """
+    Streaming de tempo real: o cliente envia frames JPEG como mensagens binárias
+    e recebe, para cada frame processado, o mesmo JSON de /detect/frame acrescido de
+    `frame_seq`, `dropped_frames` e `context_window`.
+
+    Mensagens de texto (JSON) alteram o estado da conexão:
+        {"analysis_type": "physiotherapy" | null, "render": "none" | "thumbnail" | "full" | "layer"}
+    (`"draw_overlay": true | false` equivale a render full | none.)
+
+    Se o cliente envia frames mais rápido do que o servidor processa, apenas o
+    frame mais recente é analisado; os intermediários são descartados.
+    Query params `analysis_type` e `render` (ou `draw_overlay`) definem o estado inicial.
+    """
+    await websocket.accept()
     try:
-        img_bytes = base64.b64decode(frame_b64)
-        arr = np.frombuffer(img_bytes, np.uint8)
-        frame = cv2.imdecode(arr, cv2.IMREAD_COLOR)
+        render = _render_profile(
+            websocket.query_params.get("render") or None,
+            websocket.query_params.get("draw_overlay", "false").lower() in {"1", "true"},
+        )
+    except HTTPException as exc:
+        await websocket.close(code=1008, reason=exc.detail)
+        return
+    session = _StreamSession(
+        analysis_type=websocket.query_params.get("analysis_type") or None,
+        render=render,
+    )
+    processor = asyncio.create_task(_ws_process(websocket, session))
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes") is not None:
+                session.push(message["bytes"])
+            elif message.get("text"):
+                try:
+                    control = json.loads(message["text"])
+                except ValueError:
+                    control = None
+                if not isinstance(control, dict):
+                    await websocket.send_json({"error": "Mensagem de controle inválida (objeto JSON esperado)."})
+                    continue
+                try:
+                    session.configure(control)
+                except HTTPException as exc:
+                    await websocket.send_json({"error": exc.detail})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        processor.cancel()
+
+
+# ── Internal helpers ────────────────────────────────────────────────────────
+# Everything below runs on the inference executor threads, never on the event loop.
+
+# ── Warm-up ────────────────────────────────────────────────────────────────
+
+_readiness: dict = {"ready": False, "warmup_seconds": None, "error": None}
+
+
+async def _warm_up():
+    """
+    Load the models on every executor worker (they are per-thread) and run
+    warm-up inferences, then mark the API ready. Job workers keep loading
+    lazily: a few seconds are negligible next to a long video job.
+
+    In processes mode each inference process warms itself up at start and
+    the API is ready once all of them have reported in.
+    """
+    if not WARMUP_ENABLED:
+        _readiness["ready"] = True
+        return
+
+    workers = process_pool.workers if process_pool is not None else executor.max_workers
+    print(f"[warmup] Aquecendo modelos em {workers} worker(s) ({SERVING_MODE}), "
+          f"frame {WARMUP_FRAME_SIZE[0]}x{WARMUP_FRAME_SIZE[1]}, batches {WARMUP_BATCH_SIZES}, "
+          f"imgsz {WARMUP_IMGSIZES}...")
+    t0 = time.perf_counter()
+    try:
+        if process_pool is not None:
+            await asyncio.wrap_future(process_pool.ready)
+        else:
+            futures = executor.run_on_each_worker(
+                lambda: detector.warmup(WARMUP_FRAME_SIZE, WARMUP_BATCH_SIZES, WARMUP_IMGSIZES)
+            )
+            await asyncio.gather(*(asyncio.wrap_future(f) for f in futures))
+    except Exception as exc:
+        _readiness["error"] = str(exc)
+        print(f"[warmup] Falha no aquecimento: {exc}")
+        return
+
+    _readiness.update(ready=True, warmup_seconds=round(time.perf_counter() - t0, 2))
+    print(f"[warmup] Pronto em {_readiness['warmup_seconds']}s.")
+
+
+def _upload_too_large_msg() -> str:
+    return f"Arquivo excede o limite de {MAX_UPLOAD_BYTES // (1024 * 1024)} MB."
+
+
+async def _read_body(request: Request) -> bytearray:
+    """Request body, read incrementally so chunked requests (no Content-Length) also stop at MAX_UPLOAD_BYTES."""
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail=_upload_too_large_msg())
+    return body
+
+
+def _upload_suffix(file: UploadFile) -> str:
+    return os.path.splitext(file.filename or "video.mp4")[1] or ".mp4"
+
+
+def _upload_path(file: UploadFile) -> tuple[str, bool]:
+    """
+    Path OpenCV can open for an uploaded video, and whether it is a temp copy
+    the caller must delete. Starlette has already spooled the upload to an
+    anonymous temp file; on Linux that file is opened through /proc/self/fd
+    instead of being written to disk a second time (it stays valid until the
+    request ends). Elsewhere the upload is copied (_save_upload).
+    Enforces MAX_UPLOAD_BYTES (also for chunked requests that carry no
+    Content-Length). Runs on the I/O threadpool.
+    """
+    spooled = file.file
+    try:
+        fd = spooled.fileno()   # moves a small in-memory upload to its temp file
+    except (OSError, ValueError):
+        return _save_upload(file), True
+    spooled.flush()
+    if os.fstat(fd).st_size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=_upload_too_large_msg())
+    path = f"/proc/self/fd/{fd}"
+    if not os.path.exists(path):
+        return _save_upload(file), True
+    return path, False
+
+
+def _save_upload(file: UploadFile) -> str:
+    """
+    Stream an uploaded video to a temp file in 1 MB chunks, so memory stays
+    bounded regardless of the recording size. Enforces MAX_UPLOAD_BYTES
+    (also for chunked requests that carry no Content-Length).
+    Runs on the I/O threadpool; returns the temp file path.
+    """
+    suffix = _upload_suffix(file)
+    written = 0
+
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        try:
+            file.file.seek(0)
+            while chunk := file.file.read(_UPLOAD_CHUNK):
+                written += len(chunk)
+                if written > MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail=_upload_too_large_msg())
+                tmp.write(chunk)
+        except BaseException:
+            tmp.close()
+            os.unlink(tmp.name)
+            raise
+
+    return tmp.name
+
+
+def _decode_frame(frame_b64: str) -> np.ndarray | None:
+    """Decode a base64 JPEG into a BGR frame. Returns None if undecodable."""
+    return _decode_jpeg(base64.b64decode(frame_b64))
+
+
+def _decode_jpeg(data: bytes | memoryview) -> np.ndarray | None:
+    """Decode raw JPEG bytes into a BGR frame. Returns None if undecodable."""
+    arr = np.frombuffer(data, np.uint8)   # view over the buffer, no copy
+    if arr.size == 0:
+        return None
+    return cv2.imdecode(arr, cv2.IMREAD_COLOR)
+
+
+def _split_length_prefixed(body: bytes | bytearray) -> list[memoryview]:
+    """
+    Split a body of [4-byte big-endian length][JPEG bytes]... records into
+    zero-copy views over the original buffer.
+    """
+    view = memoryview(body)
+    buffers: list[memoryview] = []
+    offset = 0
+
+    while offset < len(view):
+        if offset + 4 > len(view):
+            raise HTTPException(status_code=400, detail="Prefixo de tamanho truncado no corpo binário.")
+        size = int.from_bytes(view[offset:offset + 4], "big")
+        offset += 4
+        if offset + size > len(view):
+            raise HTTPException(status_code=400, detail="Frame truncado no corpo binário.")
+        buffers.append(view[offset:offset + size])
+        offset += size
+
+    return buffers
+
+
+# Decodes the next batch of JPEGs while the current batch is being inferred
+# (cv2.imdecode and the torch forward pass both release the GIL). Only used from
+# requests already admitted by the executor, each with at most one decode in
+# flight: one thread per executor worker, so decodes never queue up here. Not
+# the executor itself, whose worker would then wait on a job queued behind it.
+_decode_pool = ThreadPoolExecutor(max_workers=executor.max_workers, thread_name_prefix="decode")
+
+
+def _decode_jpegs(buffers: list) -> list[np.ndarray]:
+    frames: list[np.ndarray] = []
+    for data in buffers:
+        try:
+            frame = _decode_jpeg(data)
+        except cv2.error:
+            continue
+        if frame is not None:
+            frames.append(frame)
+    return frames
+
+
+def _analyze_jpeg_buffers(buffers: list, hint: str | None) -> dict:
+    """
+    Decode and analyze JPEG buffers in batches of MAX_BATCH_SIZE, pipelining the
+    decode of batch k+1 with inference on batch k.
+    """
+    chunks = [buffers[i:i + MAX_BATCH_SIZE] for i in range(0, len(buffers), MAX_BATCH_SIZE)]
+    all_detections: list[list[dict]] = []
+    all_poses: list[PoseArray] = []
+
+    pending = _decode_pool.submit(_decode_jpegs, chunks[0])
+    for k in range(len(chunks)):
+        frames = pending.result()
+        if k + 1 < len(chunks):
+            pending = _decode_pool.submit(_decode_jpegs, chunks[k + 1])
+        for detections, poses in _detect_cached(frames, _needs_objects(hint), first_index=len(all_detections)):
+            all_detections.append(detections)
+            all_poses.append(poses)
+
+    if not all_detections:
+        raise HTTPException(status_code=400, detail="Nenhum frame válido fornecido.")
+
+    return _build_detection_response(all_detections, all_poses, hint=hint)
+
+
+def _analyze_video(video_path: str, hint: str | None) -> dict:
+    need_objects = _needs_objects(hint)
+    summary, cached = _cached_video_summary(
+        video_path,
+        {"mode": "sample", "num_frames": 8, "need_objects": need_objects, "imgsz": IMGSZ["sample"]},
+        lambda: _sample_video(video_path, need_objects),
+    )
+    response = _video_response(summary, hint)
+    # Timings of a cache hit are those of the original decode, not of this request
+    response["sampling"] = {**summary["sampling"], "cached": cached}
+    return response
+
+
+def _analyze_video_dense(
+    video_path: str,
+    hint: str | None,
+    stride: int,
+    on_batch: Callable[[int, int, list[dict]], None] | None = None,
+) -> dict:
+    need_objects = _needs_objects(hint)
+    summary, _ = _cached_video_summary(
+        video_path,
+        {"mode": "dense", "stride": stride, "max_reported": DENSE_MAX_REPORTED_FRAMES,
+         "need_objects": need_objects},
+        lambda: _dense_video(video_path, stride, need_objects, on_batch),
+    )
+    return _video_response(summary, hint)
+
+
+def _cached_video_summary(video_path: str, params: dict, analyze: Callable[[], dict]) -> tuple[dict, bool]:
+    """
+    Hint-independent part of a video analysis ({frames_processed,
+    frame_detections, aggregates, ...}), from the video cache when this video
+    was already analyzed with the same params and models; analyze() otherwise.
+    Also returns whether the summary came from the cache.
+    """
+    # need_objects only changes the detections when the object model is skipped on some frames
+    params = {**params, "need_objects": params["need_objects"] and detector.inference_mode == "unified"}
+    key = video_cache.key(video_path, {**params, **_model_versions_key()})
+    summary = video_cache.get(key)
+    if summary is not None:
+        return summary, True
+    summary = analyze()
+    video_cache.put(key, summary)
+    return summary, False
+
+
+def _model_versions_key() -> dict:
+    """Every model and server setting that changes the detections, for video cache keys."""
+    global _model_versions
+    if _model_versions is None:
+        _model_versions = {
+            "weights": {path.name: video_digest(path) for path in _MODEL_WEIGHTS if path.exists()},
+            "backend": model_loader.backend,
+            "precision": model_loader.precision,
+            "inference_mode": detector.inference_mode,
+            "object_every": detector.object_every,
+            "imgsz": IMGSZ,
+            "pose_crop": [detector.pose_crop_imgsz, detector.pose_crop_padding],
+            # Dense mode plans the input size and pose crop once per batch
+            "max_batch_size": MAX_BATCH_SIZE,
+            "resolution": DENSE_RESOLUTION,
+            "sampler": [sampler.keyframe_interval, sampler.snap_to_keyframes, sampler.scan_gap_factor],
+        }
+    return _model_versions
+
+
+def _video_response(summary: dict, hint: str | None) -> dict:
+    """DetectionResponse-compatible dict: the cheap, hint-dependent step of a video analysis."""
+    return {
+        "frames_processed": summary["frames_processed"],
+        "frame_detections": summary["frame_detections"],
+        "clinical_analysis": ClinicalContextAccumulator.from_dict(summary["aggregates"]).analyze(hint),
+        "model_version": "yolov8n",
+    }
+
+
+def _sample_video(video_path: str, need_objects: bool) -> dict:
+    """8 evenly spaced frames, in one batched pass per model."""
+    frames, stats = detector.sample_frames(video_path, num_frames=8)
+    if not frames:
+        raise HTTPException(status_code=422, detail="Não foi possível extrair frames do vídeo.")
+
+    acc = ClinicalContextAccumulator()
+    frame_results = []
+    for i, (detections, poses) in enumerate(_detect_cached(frames, need_objects, IMGSZ["sample"])):
+        acc.update(detections, poses)
+        frame_results.append(_frame_result(i, detections, poses))
+
+    return {
+        "frames_processed": acc.total_frames,
+        "frame_detections": frame_results,
+        "aggregates": acc.to_dict(),
+        "sampling": stats.to_dict(),
+    }
+
+
+def _dense_video(
+    video_path: str,
+    stride: int,
+    need_objects: bool,
+    on_batch: Callable[[int, int, list[dict]], None] | None = None,
+) -> dict:
+    """
+    Whole-video analysis: frames stream from the sampler in batches of
+    MAX_BATCH_SIZE and are folded into a ClinicalContextAccumulator, so only
+    one batch of frames is in memory at any time.
+
+    on_batch(frames_processed, last_frame_index, reported_frames) is called
+    after every batch (used by jobs to publish progress).
+    """
+    acc = ClinicalContextAccumulator()
+    reported: list[dict] = []
+    batch: list[tuple[int, np.ndarray, bool]] = []
+    policy = ResolutionPolicy(**DENSE_RESOLUTION)
+
+    def flush():
+        frames = [frame for _, frame, _ in batch]
+        imgsz, roi = policy.plan(frames[0].shape)
+        results = inference.detect_batch(
+            frames, need_objects=need_objects, imgsz=imgsz,
+            pose_rois=[roi] * len(frames) if roi is not None else None,
+            # Position among the analyzed frames of the video
+            frame_indices=list(range(acc.total_frames, acc.total_frames + len(frames))),
+        )
+        for (index, frame, scene_change), (detections, poses) in zip(batch, results):
+            if scene_change:
+                policy.reset()
+            policy.observe(frame.shape, [
+                (d["x1"], d["y1"], d["x2"], d["y2"]) for d in detections if d["class_id"] == 0
+            ])
+            acc.update(detections, poses)
+            if scene_change and len(reported) < DENSE_MAX_REPORTED_FRAMES:
+                reported.append(_frame_result(index, detections, poses))
+        if on_batch:
+            on_batch(acc.total_frames, batch[-1][0], reported)
+        batch.clear()
+
+    for sample in detector.iter_frames(video_path, stride=stride):
+        batch.append(sample)
+        if len(batch) >= MAX_BATCH_SIZE:
+            flush()
+    if batch:
+        flush()
+
+    if acc.total_frames == 0:
+        raise HTTPException(status_code=422, detail="Não foi possível extrair frames do vídeo.")
+
+    return {
+        "frames_processed": acc.total_frames,
+        "frame_detections": reported,
+        "aggregates": acc.to_dict(),
+    }
+
+
+def _run_job(job: dict, video_path: str, report: Callable[[dict], None]) -> dict:
+    """JobManager runner: same pipelines as /detect, publishing progress as it goes."""
+    params = job["params"]
+    if params["mode"] == "sample":
+        return _analyze_video(video_path, params["analysis_type"])
+
+    cap = cv2.VideoCapture(video_path)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    started = time.time()
+    last_reported = 0
+
+    def on_batch(frames_processed: int, last_index: int, reported: list[dict]):
+        nonlocal last_reported
+        progress = min(1.0, (last_index + 1) / total) if total > 0 else None
+        elapsed = time.time() - started
+        update = {
+            "total_frames": total if total > 0 else None,
+            "frames_processed": frames_processed,
+            "progress": round(progress, 4) if progress else None,
+            "eta_seconds": round(elapsed * (1 - progress) / progress, 1) if progress else None,
+        }
+        if len(reported) != last_reported:
+            update["frame_detections"] = list(reported)
+            last_reported = len(reported)
+        report(update)
+
+    return _analyze_video_dense(video_path, params["analysis_type"], params["stride"], on_batch=on_batch)
+
+
+def _job_status(job: dict) -> dict:
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "queue_position": job_manager.queue_position(job["id"]),
+        "total_frames": job["total_frames"],
+        "frames_processed": job["frames_processed"],
+        "progress": job["progress"],
+        "eta_seconds": job["eta_seconds"],
+        "frame_detections": job["frame_detections"],
+        "error": job["error"],
+    }
+
+
+def _analyze_b64_frames(frames_b64: list[str], hint: str | None) -> dict:
+    frames: list[np.ndarray] = []
+
+    for b64 in frames_b64:
+        try:
+            frame = _decode_frame(b64)
+            if frame is not None:
+                frames.append(frame)
+        except Exception:
+            continue
+
+    if not frames:
+        raise HTTPException(status_code=400, detail="Nenhum frame válido fornecido.")
+
+    return _process_frames(frames, hint=hint)
+
+
+def _decode_single_frame(frame_b64: str) -> np.ndarray:
+    try:
+        frame = _decode_frame(frame_b64)
     except Exception:
         raise HTTPException(status_code=400, detail="Frame base64 inválido.")
 
     if frame is None:
         raise HTTPException(status_code=400, detail="Não foi possível decodificar o frame.")
+    return frame
+
+
+def _detect_batch(frames: list[np.ndarray], frame_indices: list[int]) -> list[tuple[list[dict], PoseArray]]:
+    """
+    Detections and poses for a batch of frames from unrelated requests, as one
+    (detections, poses) pair per frame; frame_indices are the positions of the
+    frames in their own streams.
+    """
+    return inference.detect_batch(frames, imgsz=IMGSZ["frame"], frame_indices=frame_indices)
+
+
+# ── Frame result cache ──────────────────────────────────────────────────────
+
+def _fingerprinted(decode: Callable[[Any], np.ndarray | None], data) -> tuple[np.ndarray | None, tuple | None]:
+    """Decode a frame and compute its cache key in the same executor call."""
+    frame = decode(data)
+    return frame, frame_cache.fingerprint(frame) if frame is not None else None
 
-    detections = detector.detect_objects(frame)
-    poses = detector.detect_poses(frame)
 
-    # ── Draw overlay ───────────────────────────────────────────────────────
-    annotated_b64: str | None = None
-    if draw_overlay:
-        annotated = _draw_frame_overlay(frame.copy(), detections, poses)
-        _, buf = cv2.imencode(".jpg", annotated, [cv2.IMWRITE_JPEG_QUALITY, 75])
-        annotated_b64 = base64.b64encode(buf.tobytes()).decode()
+async def _cached_frame_response(
+    frame: np.ndarray,
+    fingerprint: tuple | None,
+    analysis_type: str | None,
+    render: str,
+    frame_index: int = 0,
+) -> dict:
+    """
+    /detect/frame response for a decoded frame. A cached response for the same
+    frame and options is returned as is; otherwise cached detections are
+    reused (skipping the models) and only the response is rebuilt.
+    frame_index is the frame's position in its stream (websocket session or
+    /detect/frame stream_id); in unified mode it decides whether the object
+    model runs.
+    """
+    # Results with and without the object model are cached apart
+    objects = detector.runs_objects(frame_index)
+    variant = ("frame", analysis_type, render, objects)
+    response = frame_cache.get(fingerprint, variant)
+    if response is not None:
+        return response
+
+    detect_variant = ("detect", objects, IMGSZ["frame"])
+    result = frame_cache.get(fingerprint, detect_variant)
+    if result is None:
+        result = await frame_batcher.submit(frame, frame_index)
+        frame_cache.put(fingerprint, detect_variant, result, _result_nbytes(*result))
+
+    response = await executor.run(_frame_response, frame, *result, analysis_type, render)
+    frame_cache.put(fingerprint, variant, response, _response_nbytes(response))
+    return response
+
+
+def _detect_cached(
+    frames: list[np.ndarray],
+    need_objects: bool = False,
+    imgsz: int | None = None,
+    first_index: int = 0,
+) -> list[tuple[list[dict], PoseArray]]:
+    """
+    inference.detect_batch(), running the models only on frames missing from
+    the frame cache. first_index is the position of frames[0] in its request.
+    """
+    imgsz = imgsz or IMGSZ["frame"]
+    frame_indices = list(range(first_index, first_index + len(frames)))
+    if not frame_cache.enabled:
+        return inference.detect_batch(frames, need_objects=need_objects, imgsz=imgsz, frame_indices=frame_indices)
+
+    # Results with and without the object model are cached apart
+    variants = [("detect", detector.runs_objects(index, need_objects), imgsz) for index in frame_indices]
+    fingerprints = [frame_cache.fingerprint(frame) for frame in frames]
+    results = [frame_cache.get(fp, variant) for fp, variant in zip(fingerprints, variants)]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        fresh = inference.detect_batch(
+            [frames[i] for i in missing], need_objects=need_objects, imgsz=imgsz,
+            frame_indices=[frame_indices[i] for i in missing],
+        )
+        for i, result in zip(missing, fresh):
+            results[i] = result
+            frame_cache.put(fingerprints[i], variants[i], result, _result_nbytes(*result))
+    return results
+
+
+def _result_nbytes(detections: list[dict], poses: PoseArray) -> int:
+    """Rough in-memory size of one frame's (detections, poses)."""
+    return 1024 * len(detections) + poses.data.nbytes + 128 * len(poses)
+
+
+def _response_nbytes(response: dict) -> int:
+    """Rough in-memory size of a /detect/frame response (17 keypoint dicts per pose)."""
+    layer = response["overlay_layer"]
+    return (len(response["annotated_frame"] or "") + (len(layer["png"]) if layer else 0)
+            + 1024 * len(response["detections"]) + 8 * 1024 * len(response["poses"]))
+
+
+def _needs_objects(hint: str | None) -> bool:
+    return bool(hint) and hint.lower() in _OBJECT_HINTS
+
+
+def _frame_response(
+    frame: np.ndarray,
+    detections: list[dict],
+    poses: PoseArray,
+    analysis_type: str | None,
+    render: str,
+) -> dict:
+    """Build the /detect/frame response: overlay, quick clinical context and serialized results."""
+    annotated_b64, layer_b64 = _render_overlay(frame, detections, poses, render)
 
     # ── Clinical context (quick heuristic) ────────────────────────────────
     # Includes COCO knife/scissors AND custom classifier synthetic detections
@@ -161,8 +1092,8 @@ async def detect_single_frame(
         1 for d in detections
         if d["class_id"] in {43, 76} or d.get("surgical_label") is not None
     )
-    defensive_pose = any(p["posture_label"] in {"defensive", "distress"} for p in poses)
-    exercise_pose  = any(p["posture_label"] == "exercise" for p in poses)
+    defensive_pose = any(label in {"defensive", "distress"} for label in poses.postures)
+    exercise_pose  = "exercise" in poses.postures
 
     if analysis_type:
         clinical_context = analysis_type
@@ -193,17 +1124,176 @@ async def detect_single_frame(
                 "person_id":       p["person_id"],
                 "posture_label":   p["posture_label"],
                 "keypoints":       p["keypoints"],
-                "clinical_signals": analyze_for_context(p["keypoints"], clinical_context),
+                "clinical_signals": signals,
             }
-            for p in poses
+            # Signals of every person in one vectorized pass
+            for p, signals in zip(poses.to_dicts(), analyze_for_context(poses.data, clinical_context))
         ],
         "person_count": sum(1 for d in detections if d["class_id"] == 0),
         "clinical_context": clinical_context,
+        "render": render,
         "annotated_frame": annotated_b64,
+        "overlay_layer": layer_b64,
     }
 
 
-# ── Internal helpers ────────────────────────────────────────────────────────
+def _render_profile(render: str | None, draw_overlay: bool) -> str:
+    """Validated render profile; without one, draw_overlay picks full or none."""
+    if render is None:
+        return "full" if draw_overlay else "none"
+    if render not in RENDER_PROFILES:
+        raise HTTPException(status_code=422, detail=f"render deve ser um de {RENDER_PROFILES}.")
+    return render
+
+
+def _render_overlay(
+    frame: np.ndarray,
+    detections: list[dict],
+    poses: PoseArray,
+    render: str,
+) -> tuple[str | None, dict | None]:
+    """
+    (annotated_frame, overlay_layer) of a render profile: a base64 JPEG, or a
+    base64 transparent PNG of the overlay's bounding region with its position
+    in frame pixels ({x, y, width, height, png}).
+    """
+    if render == "full":
+        # The decoded frame is not used after the response: draw on it in place
+        return _b64_jpeg(_draw_frame_overlay(frame, detections, poses)), None
+
+    if render == "thumbnail":
+        # Downscale first, then draw with scaled coordinates: both the drawing
+        # and the JPEG encode work on the small image
+        scale = min(1.0, THUMBNAIL_SIZE / max(frame.shape[:2]))
+        if scale < 1.0:
+            frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        return _b64_jpeg(_draw_frame_overlay(frame, detections, poses, scale=scale)), None
+
+    if render == "layer":
+        # Drawn on a key-colored BGR canvas with hard-edged lines (text sits on
+        # opaque banners), so no pixel blends with the key; alpha is everything
+        # that isn't key. Drawing on BGRA directly doesn't work: OpenCV's text
+        # rendering blends into the alpha channel too.
+        height, width = frame.shape[:2]
+        canvas = np.empty((height, width, 3), dtype=np.uint8)
+        # Filled by OpenCV: numpy broadcasting a 3-value color is ~20x slower
+        cv2.rectangle(canvas, (0, 0), (width, height), _LAYER_KEY, -1)
+        _draw_frame_overlay(canvas, detections, poses, antialias=False)
+        alpha = cv2.bitwise_not(cv2.inRange(canvas, _LAYER_KEY, _LAYER_KEY))
+        # Only the region that was drawn on is encoded; its offset lets the client place it
+        x, y, w, h = cv2.boundingRect(alpha)
+        if w == 0 or h == 0:
+            return None, None
+        canvas, alpha = canvas[y:y + h, x:x + w], alpha[y:y + h, x:x + w]
+        # Transparent pixels get black instead of the key color
+        layer = cv2.merge([*cv2.split(cv2.bitwise_and(canvas, canvas, mask=alpha)), alpha])
+        # No PNG row filters: they barely help on flat overlay colors and dominate encode time
+        _, buf = cv2.imencode(".png", layer, [
+            cv2.IMWRITE_PNG_COMPRESSION, 1,
+            cv2.IMWRITE_PNG_FILTER, cv2.IMWRITE_PNG_FILTER_NONE,
+        ])
+        return None, {"x": x, "y": y, "width": w, "height": h,
+                      "png": base64.b64encode(buf.tobytes()).decode()}
+
+    return None, None
+
+
+def _b64_jpeg(image: np.ndarray) -> str:
+    _, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 75])
+    return base64.b64encode(buf.tobytes()).decode()
+
+
+# ── WebSocket streaming ─────────────────────────────────────────────────────
+
+# Frames of clinical context kept per connection for the rolling summary
+_STREAM_HISTORY = 30
+
+# /detect/frame frames counted per stream_id, like a /ws/detect session, for the
+# unified mode object cadence; the least recently seen streams beyond this many
+# are forgotten (and start over at frame 0).
+_FRAME_STREAMS_MAX = 1024
+_frame_streams: OrderedDict[str, int] = OrderedDict()
+
+
+def _frame_stream_index(stream_id: str | None) -> int:
+    """Position of the next /detect/frame frame in its stream; 0 (every model runs) without stream_id."""
+    if stream_id is None:
+        return 0
+    index = _frame_streams.pop(stream_id, 0)
+    _frame_streams[stream_id] = index + 1
+    if len(_frame_streams) > _FRAME_STREAMS_MAX:
+        _frame_streams.popitem(last=False)
+    return index
+
+
+@dataclass
+class _StreamSession:
+    """Per-connection state of /ws/detect."""
+    analysis_type: str | None = None
+    render: str = "none"
+    history: deque = field(default_factory=lambda: deque(maxlen=_STREAM_HISTORY))
+    seq: int = 0                      # frames received
+    analyzed: int = 0                 # frames sent to the models (unified mode object cadence)
+    dropped: int = 0                  # frames replaced before being processed
+    _pending: bytes | None = None
+    _ready: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def push(self, data: bytes):
+        """Keep only the newest frame; an unprocessed older one is dropped."""
+        if self._pending is not None:
+            self.dropped += 1
+        self._pending = data
+        self.seq += 1
+        self._ready.set()
+
+    async def next_frame(self) -> tuple[int, bytes]:
+        await self._ready.wait()
+        self._ready.clear()
+        data, self._pending = self._pending, None
+        return self.seq, data
+
+    def configure(self, msg: dict):
+        if "analysis_type" in msg:
+            if msg["analysis_type"] is not None and not isinstance(msg["analysis_type"], str):
+                raise HTTPException(status_code=422, detail="analysis_type deve ser texto ou null.")
+            self.analysis_type = msg["analysis_type"] or None
+            self.history.clear()
+        if "render" in msg or "draw_overlay" in msg:
+            self.render = _render_profile(msg.get("render"), bool(msg.get("draw_overlay")))
+
+
+async def _ws_process(websocket: WebSocket, session: _StreamSession):
+    """Processing side of /ws/detect: always analyzes the newest pending frame."""
+    while True:
+        seq, data = await session.next_frame()
+        try:
+            frame, fingerprint = await executor.run(_fingerprinted, _decode_jpeg, data)
+            if frame is None:
+                await websocket.send_json({"frame_seq": seq, "error": "Não foi possível decodificar o frame."})
+                continue
+            # Copy: the stream fields added below must not end up in the cached response
+            session.analyzed += 1
+            result = dict(await _cached_frame_response(
+                frame, fingerprint, session.analysis_type, session.render, session.analyzed - 1,
+            ))
+        except Exception as exc:
+            # Saturation or inference failure: report it and move on to the next frame
+            await websocket.send_json({"frame_seq": seq, "error": str(exc)})
+            continue
+
+        session.history.append(result["clinical_context"])
+        dominant, count = Counter(session.history).most_common(1)[0]
+        result.update({
+            "frame_seq": seq,
+            "dropped_frames": session.dropped,
+            "context_window": {
+                "dominant": dominant,
+                "ratio": round(count / len(session.history), 3),
+                "frames": len(session.history),
+            },
+        })
+        await websocket.send_json(result)
+
 
 # Colors for overlay (BGR)
 _CLASS_COLORS = {
@@ -217,6 +1307,9 @@ _CLASS_COLORS = {
 }
 _DEFAULT_COLOR = (180, 180, 50)
 
+# Background of the layer render profile before it becomes transparent; not an overlay color
+_LAYER_KEY = (255, 0, 255)
+
 _POSTURE_COLORS = {
     "defensive": (0, 140, 255),
     "distress":  (0,   0, 220),
@@ -235,12 +1328,21 @@ _SKELETON_EDGES = [
 def _draw_frame_overlay(
     frame: np.ndarray,
     detections: list[dict],
-    poses: list[dict],
+    poses: PoseArray,
+    scale: float = 1.0,
+    antialias: bool = True,
 ) -> np.ndarray:
-    """Draw bounding boxes + pose skeleton on a frame. Returns annotated frame."""
+    """
+    Draw bounding boxes + pose skeleton on a frame. Returns annotated frame.
+
+    scale maps detection coordinates onto a resized frame (thumbnails);
+    antialias=False draws hard-edged lines and circles (transparent layers).
+    """
+    line_type = cv2.LINE_AA if antialias else cv2.LINE_8
+
     # ── Bounding boxes ─────────────────────────────────────────────────────
     for d in detections:
-        x1, y1, x2, y2 = int(d["x1"]), int(d["y1"]), int(d["x2"]), int(d["y2"])
+        x1, y1, x2, y2 = (int(d[k] * scale) for k in ("x1", "y1", "x2", "y2"))
         color = _CLASS_COLORS.get(d["class_id"], _DEFAULT_COLOR)
         # Use specific instrument label when custom classifier identified it
         display_name = d.get("surgical_label") or d["class_name"]
@@ -255,32 +1357,29 @@ def _draw_frame_overlay(
                     cv2.FONT_HERSHEY_SIMPLEX, 0.52, (0, 0, 0), 1, cv2.LINE_AA)
 
     # ── Pose skeleton + posture badge ──────────────────────────────────────
-    for pose in poses:
-        kps = pose["keypoints"]
-        posture = pose["posture_label"]
+    confident = poses.conf > 0.3
+    visible = poses.visible(0.3)
+    for kps, posture, conf_ok, vis_ok in zip((poses.xy * scale).tolist(), poses.postures, confident, visible):
         color = _POSTURE_COLORS.get(posture, _POSTURE_COLORS["neutral"])
 
         # Skeleton lines
         for (a, b) in _SKELETON_EDGES:
-            if a >= len(kps) or b >= len(kps):
-                continue
-            ka, kb = kps[a], kps[b]
-            if ka["confidence"] > 0.3 and kb["confidence"] > 0.3:
+            if conf_ok[a] and conf_ok[b]:
                 cv2.line(frame,
-                         (int(ka["x"]), int(ka["y"])),
-                         (int(kb["x"]), int(kb["y"])),
-                         (255, 200, 50), 2, cv2.LINE_AA)
+                         (int(kps[a][0]), int(kps[a][1])),
+                         (int(kps[b][0]), int(kps[b][1])),
+                         (255, 200, 50), 2, line_type)
 
         # Keypoint circles
-        for kp in kps:
-            if kp["confidence"] > 0.3 and (kp["x"] > 0 or kp["y"] > 0):
-                cv2.circle(frame, (int(kp["x"]), int(kp["y"])), 4,
-                           (50, 230, 230), -1, cv2.LINE_AA)
+        for (x, y), ok in zip(kps, vis_ok):
+            if ok:
+                cv2.circle(frame, (int(x), int(y)), 4,
+                           (50, 230, 230), -1, line_type)
 
         # Posture badge near first visible keypoint
-        for kp in kps:
-            if kp["confidence"] > 0.3 and kp["x"] > 0:
-                bx, by = int(kp["x"]), max(int(kp["y"]) - 28, 0)
+        for (x, y), ok in zip(kps, conf_ok):
+            if ok and x > 0:
+                bx, by = int(x), max(int(y) - 28, 0)
                 (tw, th), _ = cv2.getTextSize(posture.upper(), cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
                 cv2.rectangle(frame, (bx, by), (bx + tw + 8, by + th + 8), color, -1)
                 cv2.putText(frame, posture.upper(), (bx + 4, by + th + 4),
@@ -291,44 +1390,48 @@ def _draw_frame_overlay(
 
 
 def _process_frames(frames: list[np.ndarray], hint: str | None = None) -> dict:
-    all_detections: list[list[dict]] = []
-    all_poses: list[list[dict]] = []
-    frame_results: list[dict] = []
-
-    for i, frame in enumerate(frames):
-        detections = detector.detect_objects(frame)
-        poses = detector.detect_poses(frame)
-        all_detections.append(detections)
-        all_poses.append(poses)
-
-        frame_results.append({
-            "frame_index": i,
-            "objects": [
-                {
-                    "class_id": d["class_id"],
-                    "class_name": d["class_name"],
-                    "confidence": d["confidence"],
-                    "x1": d["x1"], "y1": d["y1"],
-                    "x2": d["x2"], "y2": d["y2"],
-                }
-                for d in detections
-            ],
-            "person_count": sum(1 for d in detections if d["class_id"] == 0),
-            "poses": [
-                {
-                    "person_id": p["person_id"],
-                    "posture_label": p["posture_label"],
-                    "keypoints": p["keypoints"],
-                }
-                for p in poses
-            ] or None,
-        })
+    # One batched forward pass per model instead of one per frame
+    results = _detect_cached(frames, need_objects=_needs_objects(hint))
+    all_detections = [detections for detections, _ in results]
+    all_poses = [poses for _, poses in results]
+    return _build_detection_response(all_detections, all_poses, hint=hint)
+
+
+def _build_detection_response(
+    all_detections: list[list[dict]],
+    all_poses: list[PoseArray],
+    hint: str | None = None,
+) -> dict:
+    """DetectionResponse-compatible dict from per-frame detections and poses."""
+    frame_results = [
+        _frame_result(i, detections, poses)
+        for i, (detections, poses) in enumerate(zip(all_detections, all_poses))
+    ]
 
     clinical = analyze_clinical_context(all_detections, all_poses, hint=hint)
 
     return {
-        "frames_processed": len(frames),
+        "frames_processed": len(all_detections),
         "frame_detections": frame_results,
         "clinical_analysis": clinical,
         "model_version": "yolov8n",
     }
+
+
+def _frame_result(frame_index: int, detections: list[dict], poses: PoseArray) -> dict:
+    """FrameDetection-compatible dict for one analyzed frame."""
+    return {
+        "frame_index": frame_index,
+        "objects": [
+            {
+                "class_id": d["class_id"],
+                "class_name": d["class_name"],
+                "confidence": d["confidence"],
+                "x1": d["x1"], "y1": d["y1"],
+                "x2": d["x2"], "y2": d["y2"],
+            }
+            for d in detections
+        ],
+        "person_count": sum(1 for d in detections if d["class_id"] == 0),
+        "poses": poses.to_dicts() or None,
+    }
@@ -18,31 +18,38 @@ Usage:
   python realtime.py --source video.mp4         # arquivo de vídeo
   python realtime.py --no-pose                  # desativa estimação de pose
   python realtime.py --conf 0.4                 # limiar de confiança
+  python realtime.py --inference-mode unified   # uma passada de pose por frame
+  python realtime.py --inference-mode crops     # pose só nos recortes das pessoas detectadas
+  python realtime.py --track --detect-every 5   # rastreamento entre detecções
+  python realtime.py --backend onnx             # ONNX Runtime (exporta na 1ª execução)
+  python realtime.py --backend openvino --precision int8   # modelos INT8 quantizados
+  python realtime.py --imgsz 480 --capture-size 960x540     # menor resolução, menor latência
+  python realtime.py --min-imgsz 320 --roi      # resolução adaptativa + pose no recorte das pessoas
 """
 
 import argparse
-import math
 import sys
+import threading
+import time
 from collections import deque
 from dataclasses import dataclass, field
 
 import cv2
 import numpy as np
-from ultralytics import YOLO
+from services.backends import INFERENCE_BACKENDS, PRECISIONS, configure_backend, load_model
+from services.detector import (
+    _box_arrays, _classify_posture, _crop_pose, _keypoint_array, _offset_keypoints, _person_rois,
+)
+from services.clinical_analyzer import (
+    CONSULTATION_LEVELS, RECOVERY_LABELS, VIOLENCE_RISK_LABELS,
+    consultation_signals, physiotherapy_signals, violence_signals,
+)
+from services.poses import Keypoint, visible_keypoints
+from services.resolution import ResolutionPolicy
 from services.surgical_classifier import get_classifier
+from services.tracker import IoUTracker, iou_matrix, match_boxes
 
-# ── COCO-17 keypoint index map ───────────────────────────────────────────────
-KP = {
-    "nose": 0, "left_eye": 1, "right_eye": 2, "left_ear": 3, "right_ear": 4,
-    "left_shoulder": 5, "right_shoulder": 6,
-    "left_elbow": 7, "right_elbow": 8,
-    "left_wrist": 9, "right_wrist": 10,
-    "left_hip": 11, "right_hip": 12,
-    "left_knee": 13, "right_knee": 14,
-    "left_ankle": 15, "right_ankle": 16,
-}
-KP_NAMES = list(KP.keys())
-
+# ── COCO-17 skeleton (keypoint indices, see services/poses.py) ──────────────
 SKELETON = [
     (0, 1), (0, 2), (1, 3), (2, 4),
     (5, 6), (5, 7), (7, 9), (6, 8), (8, 10),
@@ -86,24 +93,6 @@ DEFAULT_CLASS_COLOR = C["yellow"]
 
 # ── Data classes ─────────────────────────────────────────────────────────────
 
-@dataclass
-class Keypoint:
-    name: str
-    x: float
-    y: float
-    conf: float
-
-    @property
-    def visible(self) -> bool:
-        return self.conf > 0.30 and (self.x > 0 or self.y > 0)
-
-    def pt(self) -> tuple[int, int]:
-        return (int(self.x), int(self.y))
-
-    def dist(self, other: "Keypoint") -> float:
-        return math.hypot(self.x - other.x, self.y - other.y)
-
-
 @dataclass
 class ConsultationSignals:
     """Sinais não-verbais detectados em contexto de consulta médica."""
@@ -146,111 +135,47 @@ class ViolenceSignals:
     risk_color:       tuple = field(default_factory=lambda: (160, 160, 160))
 
 
-# ── Keypoint extractor ────────────────────────────────────────────────────────
-
-def _extract_keypoints(xy: list, conf_list: list) -> list[Keypoint]:
-    return [
-        Keypoint(
-            name=KP_NAMES[i],
-            x=float(xy[i][0]),
-            y=float(xy[i][1]),
-            conf=float(conf_list[i]),
-        )
-        for i in range(min(len(xy), 17))
-    ]
+# People without a pose (object-model boxes in dual mode): no visible keypoint
+_NO_KEYPOINTS = np.zeros((17, 3), dtype=np.float32)
 
 
-def _kp_map(keypoints: list[Keypoint]) -> dict[str, Keypoint]:
-    return {kp.name: kp for kp in keypoints if kp.visible}
+# ── Clinical analyzers ────────────────────────────────────────────────────────
+# Indicators come from the vectorized engine in services/clinical_analyzer.py
+# (all people of the frame in one pass); here they only get their overlay colors.
 
+_LEVEL_COLORS = (C["grey"], C["green"], C["yellow"], C["orange"], C["red"])
+_RECOVERY_COLORS = (C["green"], C["yellow"], C["orange"], C["red"])
 
-# ── Clinical analyzers ────────────────────────────────────────────────────────
 
-def _analyze_consultation(kps: list[Keypoint]) -> ConsultationSignals:
+def _analyze_consultation(kps: np.ndarray) -> list[ConsultationSignals]:
     """
-    Identifica sinais não-verbais de desconforto ou medo em consulta médica.
+    Identifica sinais não-verbais de desconforto ou medo em consulta médica,
+    para cada pessoa de kps (N, 17, 3).
 
     Indicadores avaliados:
     - Evitação ocular: nariz deslocado do centro dos ombros (>70 px)
     - Braços cruzados: cotovelos muito próximos (<12% da largura do frame)
-    - Pulsos perto do rosto: wrists dentro de 70px do nariz
+    - Pulsos perto do rosto: wrists dentro de 80px do nariz
     - Ombros elevados: ombros acima da linha do nariz (tensão)
     - Corpo encurvado: ombros acima do nível esperado relativo ao quadril
     """
-    sig = ConsultationSignals()
-    m = _kp_map(kps)
-
-    nose  = m.get("nose")
-    ls    = m.get("left_shoulder")
-    rs    = m.get("right_shoulder")
-    le    = m.get("left_elbow")
-    re    = m.get("right_elbow")
-    lw    = m.get("left_wrist")
-    rw    = m.get("right_wrist")
-    lh    = m.get("left_hip")
-    rh    = m.get("right_hip")
-
-    # 1. Eye avoidance: nose significantly off-center from shoulders
-    if nose and ls and rs:
-        mid_x = (ls.x + rs.x) / 2
-        if abs(nose.x - mid_x) > 70:
-            sig.eye_avoidance = True
-
-    # 2. Arms crossed: elbows close together horizontally
-    if le and re:
-        elbow_span = abs(le.x - re.x)
-        ref_width  = max(le.x, re.x, 1)
-        if elbow_span / ref_width < 0.12:
-            sig.arms_crossed = True
-
-    # 3. Wrists near face
-    for wrist in (lw, rw):
-        if wrist and nose and wrist.dist(nose) < 80:
-            sig.wrist_near_face = True
-            break
-
-    # 4. Shoulders raised (above nose — tension/cowering)
-    if ls and rs and nose:
-        shoulder_avg_y = (ls.y + rs.y) / 2
-        if shoulder_avg_y < nose.y * 0.93:
-            sig.shoulder_raised = True
-
-    # 5. Body contracted: shoulder-to-hip distance significantly shorter than expected
-    if ls and rs and lh and rh:
-        sh_center = ((ls.x + rs.x) / 2, (ls.y + rs.y) / 2)
-        hip_center = ((lh.x + rh.x) / 2, (lh.y + rh.y) / 2)
-        torso_h = hip_center[1] - sh_center[1]
-        # Estimate expected torso based on shoulder width
-        sh_width = abs(ls.x - rs.x)
-        if sh_width > 0 and torso_h < sh_width * 0.9:
-            sig.body_contracted = True
-
-    # Composite score
-    sig.discomfort_score = sum([
-        sig.eye_avoidance,
-        sig.arms_crossed,
-        sig.wrist_near_face,
-        sig.shoulder_raised,
-        sig.body_contracted,
-    ])
-
-    if sig.discomfort_score == 0:
-        sig.level, sig.level_color = "Neutro",      C["grey"]
-    elif sig.discomfort_score == 1:
-        sig.level, sig.level_color = "Observação",  C["green"]
-    elif sig.discomfort_score == 2:
-        sig.level, sig.level_color = "Atenção",     C["yellow"]
-    elif sig.discomfort_score == 3:
-        sig.level, sig.level_color = "Desconforto", C["orange"]
-    else:
-        sig.level, sig.level_color = "Alerta",      C["red"]
-
-    return sig
+    sig = consultation_signals(kps)
+    return [
+        ConsultationSignals(
+            eye_avoidance=eye, arms_crossed=arms, wrist_near_face=wrist,
+            shoulder_raised=shoulder, body_contracted=body, discomfort_score=score,
+            level=CONSULTATION_LEVELS[min(score, 4)], level_color=_LEVEL_COLORS[min(score, 4)],
+        )
+        for eye, arms, wrist, shoulder, body, score in zip(*(sig[k].tolist() for k in (
+            "eye_avoidance", "arms_crossed", "wrist_near_face",
+            "shoulder_raised", "body_contracted", "discomfort_score")))
+    ]
 
 
-def _analyze_physiotherapy(kps: list[Keypoint]) -> PhysiotherapySignals:
+def _analyze_physiotherapy(kps: np.ndarray) -> list[PhysiotherapySignals]:
     """
-    Avalia qualidade de movimento e recuperação em fisioterapia pós-parto.
+    Avalia qualidade de movimento e recuperação em fisioterapia pós-parto,
+    para cada pessoa de kps (N, 17, 3).
 
     Métricas calculadas:
     - ROM braço (esq/dir): elevação do pulso em relação ao ombro (0–1)
@@ -259,84 +184,28 @@ def _analyze_physiotherapy(kps: list[Keypoint]) -> PhysiotherapySignals:
     - Inclinação do tronco (°)
     - Atividade dos membros inferiores: joelhos/tornozelos em movimento
     """
-    sig = PhysiotherapySignals()
-    m = _kp_map(kps)
-
-    ls  = m.get("left_shoulder")
-    rs  = m.get("right_shoulder")
-    lw  = m.get("left_wrist")
-    rw  = m.get("right_wrist")
-    lh  = m.get("left_hip")
-    rh  = m.get("right_hip")
-    lk  = m.get("left_knee")
-    rk  = m.get("right_knee")
-    la  = m.get("left_ankle")
-    ra  = m.get("right_ankle")
-
-    # ROM: how far the wrist is elevated above the shoulder (0 = at shoulder, 1 = full overhead)
-    if lw and ls and ls.y > 0:
-        elev = max(0.0, ls.y - lw.y)
-        sig.left_rom = min(1.0, elev / max(ls.y, 1))
-    if rw and rs and rs.y > 0:
-        elev = max(0.0, rs.y - rw.y)
-        sig.right_rom = min(1.0, elev / max(rs.y, 1))
-
-    # Arm symmetry (1 = symmetric, 0 = completely asymmetric)
-    if lw and rw and (ls or rs):
-        sig.arm_symmetry = max(0.0, 1.0 - abs(sig.left_rom - sig.right_rom) / max(max(sig.left_rom, sig.right_rom), 0.01))
-        sig.compensation = abs(sig.left_rom - sig.right_rom) > 0.30
-
-    # Shoulder tilt angle (°) — 0 = perfectly horizontal
-    if ls and rs:
-        dx = rs.x - ls.x
-        dy = rs.y - ls.y
-        sig.shoulder_tilt_deg = abs(math.degrees(math.atan2(dy, dx)))
-
-    # Hip tilt angle (°)
-    if lh and rh:
-        dx = rh.x - lh.x
-        dy = rh.y - lh.y
-        sig.hip_tilt_deg = abs(math.degrees(math.atan2(dy, dx)))
-
-    # Trunk lean (° from vertical): angle between mid-shoulder and mid-hip
-    if ls and rs and lh and rh:
-        ms_x = (ls.x + rs.x) / 2; ms_y = (ls.y + rs.y) / 2
-        mh_x = (lh.x + rh.x) / 2; mh_y = (lh.y + rh.y) / 2
-        dx = ms_x - mh_x
-        dy = mh_y - ms_y  # positive = trunk above hip
-        sig.trunk_lean_deg = abs(math.degrees(math.atan2(dx, max(dy, 1))))
-
-    # Lower limb activity: any knee or ankle visible and elevated
-    for jt in (lk, rk, la, ra):
-        if jt and jt.visible:
-            sig.lower_limb_active = True
-            break
-
-    # Recovery label based on metrics
-    issues = sum([
-        sig.compensation,
-        sig.shoulder_tilt_deg > 10,
-        sig.hip_tilt_deg > 10,
-        sig.trunk_lean_deg > 15,
-    ])
-
-    if not (ls or rs or lw or rw):
-        sig.recovery_label, sig.recovery_color = "Sem dados",    C["grey"]
-    elif issues == 0:
-        sig.recovery_label, sig.recovery_color = "Adequado",     C["green"]
-    elif issues == 1:
-        sig.recovery_label, sig.recovery_color = "Observar",     C["yellow"]
-    elif issues == 2:
-        sig.recovery_label, sig.recovery_color = "Compensação",  C["orange"]
-    else:
-        sig.recovery_label, sig.recovery_color = "Limitado",     C["red"]
-
-    return sig
-
-
-def _analyze_violence(kps: list[Keypoint]) -> ViolenceSignals:
+    sig = physiotherapy_signals(kps)
+    signals = []
+    for left, right, sym, sh, hip, trunk, lower, comp, issues, no_data in zip(*(sig[k].tolist() for k in (
+            "left_rom", "right_rom", "arm_symmetry", "shoulder_tilt_deg", "hip_tilt_deg",
+            "trunk_lean_deg", "lower_limb_active", "compensation", "issues", "no_data"))):
+        if no_data:
+            label, color = "Sem dados", C["grey"]
+        else:
+            label, color = RECOVERY_LABELS[min(issues, 3)], _RECOVERY_COLORS[min(issues, 3)]
+        signals.append(PhysiotherapySignals(
+            left_rom=left, right_rom=right, arm_symmetry=sym,
+            shoulder_tilt_deg=sh, hip_tilt_deg=hip, trunk_lean_deg=trunk,
+            lower_limb_active=lower, compensation=comp,
+            recovery_label=label, recovery_color=color,
+        ))
+    return signals
+
+
+def _analyze_violence(kps: np.ndarray) -> list[ViolenceSignals]:
     """
-    Detecta linguagem corporal indicativa de abuso ou violência doméstica.
+    Detecta linguagem corporal indicativa de abuso ou violência doméstica,
+    para cada pessoa de kps (N, 17, 3).
 
     Indicadores avaliados (princípio de não exposição da vítima):
     - Braços cruzados / postura fechada
@@ -347,73 +216,24 @@ def _analyze_violence(kps: list[Keypoint]) -> ViolenceSignals:
 
     O risco é apresentado como nível progressivo, nunca como conclusão.
     """
-    sig = ViolenceSignals()
-    m = _kp_map(kps)
-
-    nose = m.get("nose")
-    ls   = m.get("left_shoulder")
-    rs   = m.get("right_shoulder")
-    le   = m.get("left_elbow")
-    re   = m.get("right_elbow")
-    lw   = m.get("left_wrist")
-    rw   = m.get("right_wrist")
-    lh   = m.get("left_hip")
-    rh   = m.get("right_hip")
-
-    # 1. Arms crossed
-    if le and re:
-        elbow_span = abs(le.x - re.x)
-        ref        = max(le.x, re.x, 1)
-        if elbow_span / ref < 0.12:
-            sig.arms_crossed = True
-
-    # 2. Wrists near face (protecting face)
-    for wrist in (lw, rw):
-        if wrist and nose and wrist.dist(nose) < 80:
-            sig.wrist_near_face = True
-            break
-
-    # 3. Shoulders raised above nose line
-    if ls and rs and nose:
-        avg_sh_y = (ls.y + rs.y) / 2
-        if avg_sh_y < nose.y * 0.93:
-            sig.shoulder_raised = True
-
-    # 4. Body contracted
-    if ls and rs and lh and rh:
-        sh_w     = abs(ls.x - rs.x)
-        hip_w    = abs(lh.x - rh.x)
-        torso_h  = abs(((lh.y + rh.y) / 2) - ((ls.y + rs.y) / 2))
-        # Contracted: narrow shoulders or torso shorter than shoulder width
-        if sh_w > 0 and (hip_w / max(sh_w, 1) < 0.65 or torso_h < sh_w * 0.80):
-            sig.body_contracted = True
-
-    # 5. Head avoidance: nose strongly offset from shoulder midpoint
-    if nose and ls and rs:
-        mid_x = (ls.x + rs.x) / 2
-        if abs(nose.x - mid_x) > 80:
-            sig.head_avoidance = True
-
-    sig.risk_score = sum([
-        sig.arms_crossed,
-        sig.wrist_near_face,
-        sig.shoulder_raised,
-        sig.body_contracted,
-        sig.head_avoidance,
-    ])
-
-    if sig.risk_score == 0:
-        sig.risk_label, sig.risk_color = "Neutro",            C["grey"]
-    elif sig.risk_score == 1:
-        sig.risk_label, sig.risk_color = "Observação",        C["green"]
-    elif sig.risk_score == 2:
-        sig.risk_label, sig.risk_color = "Atenção",           C["yellow"]
-    elif sig.risk_score == 3:
-        sig.risk_label, sig.risk_color = "Suspeita moderada", C["orange"]
-    else:
-        sig.risk_label, sig.risk_color = "Suspeita alta",     C["red"]
+    sig = violence_signals(kps)
+    return [
+        ViolenceSignals(
+            arms_crossed=arms, wrist_near_face=wrist, shoulder_raised=shoulder,
+            body_contracted=body, head_avoidance=head, risk_score=score,
+            risk_label=VIOLENCE_RISK_LABELS[min(score, 4)], risk_color=_LEVEL_COLORS[min(score, 4)],
+        )
+        for arms, wrist, shoulder, body, head, score in zip(*(sig[k].tolist() for k in (
+            "arms_crossed", "wrist_near_face", "shoulder_raised",
+            "body_contracted", "head_avoidance", "risk_score")))
+    ]
+
 
-    return sig
+_ANALYZERS = {
+    "consultation":  _analyze_consultation,
+    "physiotherapy": _analyze_physiotherapy,
+    "violence":      _analyze_violence,
+}
 
 
 # ── Drawing helpers ───────────────────────────────────────────────────────────
@@ -428,17 +248,18 @@ def _draw_box(frame: np.ndarray, x1, y1, x2, y2, label: str, color: tuple):
                 cv2.FONT_HERSHEY_SIMPLEX, 0.52, (0, 0, 0), 1, cv2.LINE_AA)
 
 
-def _draw_skeleton(frame: np.ndarray, kps: list[Keypoint],
+def _draw_skeleton(frame: np.ndarray, kps: np.ndarray,
                    bone_color: tuple = (255, 200, 50),
                    joint_color: tuple = (50, 230, 230)):
+    """kps: (17, 3) x, y, conf of one person."""
+    visible = (kps[:, 2] > 0.30) & ((kps[:, 0] > 0) | (kps[:, 1] > 0))
+    pts = [(int(x), int(y)) for x, y in kps[:, :2].tolist()]
     for (a, b) in SKELETON:
-        if a >= len(kps) or b >= len(kps): continue
-        ka, kb = kps[a], kps[b]
-        if ka.visible and kb.visible:
-            cv2.line(frame, ka.pt(), kb.pt(), bone_color, 2, cv2.LINE_AA)
-    for kp in kps:
-        if kp.visible:
-            cv2.circle(frame, kp.pt(), 4, joint_color, -1, cv2.LINE_AA)
+        if visible[a] and visible[b]:
+            cv2.line(frame, pts[a], pts[b], bone_color, 2, cv2.LINE_AA)
+    for pt, ok in zip(pts, visible):
+        if ok:
+            cv2.circle(frame, pt, 4, joint_color, -1, cv2.LINE_AA)
 
 
 def _draw_badge(frame: np.ndarray, x: int, y: int, text: str, color: tuple,
@@ -516,9 +337,9 @@ def _overlay_consultation(frame: np.ndarray, sig: ConsultationSignals,
 
 
 def _overlay_physiotherapy(frame: np.ndarray, sig: PhysiotherapySignals,
-                            kps: list[Keypoint], x1: int, y2: int, x2: int):
+                            kps: np.ndarray, x1: int, y2: int, x2: int):
     """Draws ROM arcs, angle lines and recovery panel."""
-    m = _kp_map(kps)
+    m = visible_keypoints(kps)
     ls, rs = m.get("left_shoulder"), m.get("right_shoulder")
     lw, rw = m.get("left_wrist"),    m.get("right_wrist")
     lh, rh = m.get("left_hip"),      m.get("right_hip")
@@ -652,10 +473,12 @@ _MODE_COLORS = {
 
 
 def _draw_hud(frame: np.ndarray, mode: str, fps: float,
-              n_persons: int, alert_msg: str | None):
+              n_persons: int, alert_msg: str | None,
+              stage_ms: dict[str, float] | None = None, dropped: int = 0,
+              resolution: ResolutionPolicy | None = None):
     h, w = frame.shape[:2]
     overlay = frame.copy()
-    cv2.rectangle(overlay, (0, 0), (300, 95), C["dark"], -1)
+    cv2.rectangle(overlay, (0, 0), (300, 115 if resolution else 95), C["dark"], -1)
     cv2.addWeighted(overlay, 0.60, frame, 0.40, 0, frame)
 
     mode_color = _MODE_COLORS.get(mode, C["grey"])
@@ -666,6 +489,20 @@ def _draw_hud(frame: np.ndarray, mode: str, fps: float,
     cv2.putText(frame, f"FPS: {fps:.1f}   Pessoas: {n_persons}",
                 (10, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.50, C["white"], 1, cv2.LINE_AA)
 
+    if stage_ms:
+        # Per-stage pipeline timings (moving averages, ms)
+        def ms(stage: str) -> str:
+            return f"{stage_ms[stage]:.0f}" if stage in stage_ms else "-"
+        cv2.putText(frame, f"Cap {ms('capture')}  Inf {ms('inference')}  Ren {ms('render')} ms",
+                    (10, 62), cv2.FONT_HERSHEY_SIMPLEX, 0.42, C["white"], 1, cv2.LINE_AA)
+        cv2.putText(frame, f"Latencia {ms('latency')} ms   Descartados: {dropped}",
+                    (10, 82), cv2.FONT_HERSHEY_SIMPLEX, 0.42, C["grey"], 1, cv2.LINE_AA)
+
+    if resolution:
+        roi = " ROI" if resolution.last_roi is not None else ""
+        cv2.putText(frame, f"Entrada {w}x{h} -> imgsz {resolution.last_imgsz}{roi}",
+                    (10, 102), cv2.FONT_HERSHEY_SIMPLEX, 0.42, C["grey"], 1, cv2.LINE_AA)
+
     if alert_msg:
         # Flashing alert bar at top of frame
         ov = frame.copy()
@@ -702,21 +539,382 @@ def _auto_classify(postures: list[str], detections: list[dict]) -> str:
 _MODES_CYCLE = ["auto", "consultation", "physiotherapy", "violence"]
 
 
+def _detect_objects(frame, obj_model, conf_threshold: float,
+                    include_persons: bool = True, imgsz: int = 640) -> tuple[list[dict], dict | None]:
+    """
+    Object detections for a frame, enriched with the surgical classifier.
+    Returns (detections, full_frame_classification). Must run before any
+    overlay is drawn on the frame, since crops are classified from it.
+    """
+    clf = get_classifier()
+    _SURGICAL_COCO = {43, 76}
+
+    boxes_raw = []
+    for result in obj_model(frame, verbose=False, conf=conf_threshold, imgsz=imgsz):
+        xyxy, conf, cls = _box_arrays(result)
+        if not include_persons:
+            keep = cls != 0
+            xyxy, conf, cls = xyxy[keep], conf[keep], cls[keep]
+        boxes_raw += [
+            (cls_id, score, *box, result.names[cls_id])
+            for box, score, cls_id in zip(xyxy.tolist(), conf.tolist(), cls.tolist())
+        ]
+
+    # Enrich knife/scissors with custom instrument label — one classifier batch per frame
+    surgical_idx = [i for i, b in enumerate(boxes_raw) if b[0] in _SURGICAL_COCO]
+    surgical_labels: dict[int, str] = {}
+    if surgical_idx and clf.available:
+        regions = [tuple(int(v) for v in boxes_raw[i][2:6]) for i in surgical_idx]
+        for i, custom in zip(surgical_idx, clf.classify_regions(frame, regions)):
+            if custom:
+                surgical_labels[i] = custom["label"]
+
+    detections = []
+    for i, (cls_id, conf, x1, y1, x2, y2, name) in enumerate(boxes_raw):
+        surgical_label = surgical_labels.get(i)
+        detections.append({"cls_id": cls_id, "name": surgical_label or name, "conf": conf,
+                           "x1": x1, "y1": y1, "x2": x2, "y2": y2,
+                           "surgical_label": surgical_label})
+
+    full = None
+    if not surgical_idx and clf.available:
+        full = clf.classify(frame)
+    return detections, full
+
+
+def _detect_people(frame, pose_model, conf_threshold: float | None = None,
+                   imgsz: int = 640, roi: tuple[int, int, int, int] | None = None) -> list[dict]:
+    """
+    Pose model people: [{"box": (x1, y1, x2, y2), "conf", "kps": (17, 3) array}].
+    With roi (x1, y1, x2, y2), only that crop goes through the model; boxes
+    and keypoints are still in frame coordinates.
+    """
+    kwargs = {"conf": conf_threshold} if conf_threshold is not None else {}
+    offset = (0, 0)
+    if roi is not None:
+        frame, offset = frame[roi[1]:roi[3], roi[0]:roi[2]], roi[:2]
+    people = []
+    for result in pose_model(frame, verbose=False, imgsz=imgsz, **kwargs):
+        kps = _keypoint_array(result).astype(np.float32)
+        boxes, box_conf, _ = _box_arrays(result)
+        if roi is not None:
+            _offset_keypoints(kps, offset)
+            boxes = boxes + np.tile(offset, 2)
+        people += [
+            {"box": tuple(box), "conf": score, "kps": person_kps}
+            for box, score, person_kps in zip(boxes.tolist(), box_conf.tolist(), kps)
+        ]
+    return people
+
+
+def _detect_people_in_boxes(frame, pose_model, person_dets: list[dict],
+                            imgsz: int = 256, padding: float = 0.2) -> list[dict]:
+    """
+    Object-model people with keypoints from the pose model run on a padded
+    crop of each box (all crops in one forward pass; none without people).
+    """
+    people = [
+        {"box": (d["x1"], d["y1"], d["x2"], d["y2"]), "conf": d["conf"], "kps": None}
+        for d in person_dets
+    ]
+    if not people:
+        return people
+    rois = _person_rois(frame.shape, [p["box"] for p in people], padding)
+    crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in rois]
+    for person, roi, result in zip(people, rois, pose_model(crops, verbose=False, imgsz=imgsz)):
+        person["kps"] = _crop_pose(result, roi[:2], person["box"])
+    return people
+
+
+def _people_from_detections(person_dets: list[dict], people: list[dict]) -> list[dict]:
+    """
+    Pair object-model person boxes with pose-model keypoints by IoU, rather
+    than assuming both models list people in the same order. Poses that match
+    no box are kept with their own pose box.
+    """
+    persons = [
+        {"box": (d["x1"], d["y1"], d["x2"], d["y2"]), "conf": d["conf"], "kps": None}
+        for d in person_dets
+    ]
+    ious = iou_matrix([p["box"] for p in persons], [p["box"] for p in people])
+    paired = set()
+    for i, j in match_boxes(ious, 0.3):
+        persons[i]["kps"] = people[j]["kps"]
+        paired.add(j)
+    persons.extend(p for j, p in enumerate(people) if j not in paired)
+    return persons
+
+
+# ── Pipeline stages ───────────────────────────────────────────────────────────
+#
+#   capture thread ──(ring buffer, drop-oldest)──▶ inference thread
+#                  ──(latest result)──▶ render (main thread: overlays, HUD, imshow)
+#
+# Each stage runs at its own pace: camera I/O and rendering no longer add to
+# inference latency, and inference always picks the freshest captured frame.
+
+class _StageTimes:
+    """Exponential moving averages of per-stage durations, in ms."""
+
+    def __init__(self, alpha: float = 0.1):
+        self.alpha = alpha
+        self._ms: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, ms: float):
+        with self._lock:
+            prev = self._ms.get(stage)
+            self._ms[stage] = ms if prev is None else prev + self.alpha * (ms - prev)
+
+    def snapshot(self) -> dict[str, float]:
+        with self._lock:
+            return dict(self._ms)
+
+
+class _LatestBuffer:
+    """
+    Drop-oldest ring buffer between two pipeline stages. The consumer always
+    takes the newest item; older ones are discarded and counted as dropped.
+    """
+
+    def __init__(self, size: int = 2):
+        self._items: deque = deque(maxlen=size)
+        self._cond = threading.Condition()
+        self.closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout: float):
+        """Newest item, or None if nothing arrived within timeout."""
+        with self._cond:
+            if not self._items and not self.closed:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            item = self._items.pop()
+            self.dropped += len(self._items)
+            self._items.clear()
+            return item
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    @property
+    def exhausted(self) -> bool:
+        with self._cond:
+            return self.closed and not self._items
+
+
+class _Inferer:
+    """Inference stage: models plus the per-stream detection/tracking state."""
+
+    def __init__(self, obj_model, pose_model, conf_threshold: float,
+                 inference_mode: str, object_every: int, tracking: bool, detect_every: int,
+                 resolution: ResolutionPolicy | None = None):
+        self.obj_model = obj_model
+        self.pose_model = pose_model
+        self.conf_threshold = conf_threshold
+        # Model input size (and pose crop) for each detection round
+        self.resolution = resolution or ResolutionPolicy()
+        # unified: one pose pass per detection, object model every `object_every` detections
+        self.unified = inference_mode == "unified"
+        # crops: pose pass only on the person boxes of the object model
+        self.crops = inference_mode == "crops"
+        self.object_every = max(1, object_every)
+        self.last_objects: tuple[list[dict], dict | None] = ([], None)
+        self.detect_round = 0
+
+        # tracking: models every `detect_every` frames, tracks propagated in between
+        self.tracking = tracking
+        self.detect_every = max(1, detect_every)
+        self.person_tracker = IoUTracker()
+        self.object_tracker = IoUTracker()
+        self.frames_since_detect = self.detect_every    # first frame always gets a detection
+        self.persons: list[dict] = []
+        self.objects: list[dict] = []
+
+    def process(self, frame: np.ndarray) -> tuple[list[dict], list[dict], dict | None]:
+        """(persons, non-person objects, full-frame classification) for a frame."""
+        # With tracking, the models run every detect_every frames (or sooner
+        # when a tracker is uncertain); frames in between reuse the tracks,
+        # extrapolated with their constant-velocity model.
+        detect_now = (not self.tracking or self.frames_since_detect + 1 >= self.detect_every
+                      or self.person_tracker.uncertain or self.object_tracker.uncertain)
+
+        if detect_now:
+            self.frames_since_detect = 0
+            imgsz, roi = self.resolution.plan(frame.shape)
+            # unified: persons come from the pose model and the object
+            # model only refreshes the other classes every object_every rounds
+            if not self.unified or self.detect_round % self.object_every == 0:
+                self.last_objects = _detect_objects(frame, self.obj_model, self.conf_threshold,
+                                                    include_persons=not self.unified, imgsz=imgsz)
+            self.detect_round += 1
+            object_dets = self.last_objects[0]
+
+            people = []
+            if self.crops:
+                people = _detect_people_in_boxes(frame, self.pose_model, [d for d in object_dets if d["cls_id"] == 0])
+            elif self.pose_model is not None:
+                people = _detect_people(frame, self.pose_model, self.conf_threshold if self.unified else None,
+                                        imgsz=imgsz, roi=roi)
+            self.objects = [d for d in object_dets if d["cls_id"] != 0]
+            if self.unified or self.crops:
+                self.persons = people
+            else:
+                self.persons = _people_from_detections([d for d in object_dets if d["cls_id"] == 0], people)
+            self.resolution.observe(frame.shape, [p["box"] for p in self.persons])
+            for person in self.persons:
+                person["posture"] = _classify_posture(person["kps"]) if person["kps"] is not None else None
+                person["track_id"] = None
+
+            if self.tracking:
+                self.person_tracker.step([
+                    {"box": p["box"], "cls_id": 0, "confidence": p["conf"],
+                     "keypoints": p["kps"], "data": {"posture": p["posture"]}}
+                    for p in self.persons
+                ])
+                self.object_tracker.step([
+                    {"box": (d["x1"], d["y1"], d["x2"], d["y2"]), "cls_id": d["cls_id"],
+                     "confidence": d["conf"], "data": d}
+                    for d in self.objects
+                ])
+        else:
+            self.frames_since_detect += 1
+            self.person_tracker.step()
+            self.object_tracker.step()
+
+        if self.tracking:
+            # Stable IDs: each person keeps its own box and keypoints
+            self.persons = [
+                {"box": tuple(t.box), "conf": t.confidence, "kps": t.keypoints,
+                 "posture": t.data.get("posture"), "track_id": t.track_id}
+                for t in self.person_tracker.tracks
+            ]
+            self.objects = [
+                dict(t.data, x1=float(t.box[0]), y1=float(t.box[1]), x2=float(t.box[2]), y2=float(t.box[3]))
+                for t in self.object_tracker.tracks
+            ]
+
+        # Fresh dicts: the render stage adds per-frame keys to them
+        return [dict(p) for p in self.persons], list(self.objects), self.last_objects[1]
+
+
+def _capture_loop(cap, frames_out: _LatestBuffer, times: _StageTimes,
+                  stop: threading.Event, running: threading.Event, pace_fps: float | None):
+    """Capture thread. Video files are paced at their own FPS, like a live camera."""
+    interval = 1.0 / pace_fps if pace_fps else 0.0
+    next_due = time.perf_counter()
+    try:
+        while not stop.is_set():
+            if not running.wait(0.1):
+                next_due = time.perf_counter()
+                continue
+            t0 = time.perf_counter()
+            ret, frame = cap.read()
+            times.add("capture", (time.perf_counter() - t0) * 1000)
+            if not ret:
+                print("[realtime] Fim do vídeo ou falha de captura.")
+                break
+            frames_out.put((frame, time.perf_counter()))
+
+            if interval:
+                next_due += interval
+                delay = next_due - time.perf_counter()
+                if delay > 0:
+                    stop.wait(delay)
+                else:
+                    next_due = time.perf_counter()
+    finally:
+        frames_out.close()
+
+
+def _inference_loop(inferer: _Inferer, frames_in: _LatestBuffer, results_out: _LatestBuffer,
+                    times: _StageTimes, stop: threading.Event, running: threading.Event,
+                    errors: list):
+    """Inference thread: newest captured frame → (frame, captured_at, persons, objects, full)."""
+    try:
+        while not stop.is_set():
+            if not running.wait(0.1):
+                continue
+            item = frames_in.get(timeout=0.1)
+            if item is None:
+                if frames_in.exhausted:
+                    break
+                continue
+            frame, captured_at = item
+            t0 = time.perf_counter()
+            persons, objects, full = inferer.process(frame)
+            times.add("inference", (time.perf_counter() - t0) * 1000)
+            results_out.put((frame, captured_at, persons, objects, full))
+    except Exception as exc:
+        errors.append(exc)
+    finally:
+        results_out.close()
+
+
 def run(source, conf_threshold: float = 0.35,
-        enable_pose: bool = True, initial_mode: str = "auto"):
+        enable_pose: bool = True, initial_mode: str = "auto",
+        inference_mode: str = "dual", object_every: int = 3,
+        tracking: bool = False, detect_every: int = 5,
+        imgsz: int = 640, min_imgsz: int | None = None, pose_roi: bool = False,
+        capture_size: tuple[int, int] | None = (1280, 720)):
+
+    if inference_mode != "dual" and not enable_pose:
+        print(f"[realtime] Modo {inference_mode} requer pose; usando dual.")
+        inference_mode = "dual"
 
     print("[realtime] Carregando modelos YOLOv8...")
-    obj_model  = YOLO("yolov8n.pt")
-    pose_model = YOLO("yolov8n-pose.pt") if enable_pose else None
-    print(f"[realtime] Modelos carregados. Fonte: {source} | Modo: {initial_mode}")
+    obj_model  = load_model("yolov8n.pt", task="detect")
+    pose_model = load_model("yolov8n-pose.pt", task="pose") if enable_pose else None
+    # crops mode already runs the pose model on person crops
+    resolution = ResolutionPolicy(imgsz=imgsz, min_imgsz=min_imgsz,
+                                  roi=pose_roi and enable_pose and inference_mode != "crops")
+    print(f"[realtime] Modelos carregados. Fonte: {source} | Modo: {initial_mode} | "
+          f"Inferência: {inference_mode} | imgsz: "
+          f"{f'{resolution.min_imgsz}–{resolution.imgsz}' if resolution.min_imgsz < resolution.imgsz else resolution.imgsz}"
+          f"{' + ROI de pose' if resolution.roi_enabled else ''}"
+          f"{f' | Tracking: detecção a cada {max(1, detect_every)} frames' if tracking else ''}")
 
     cap = cv2.VideoCapture(source)
     if not cap.isOpened():
         print(f"[realtime] ERRO: não foi possível abrir: {source}", file=sys.stderr)
         sys.exit(1)
 
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH,  1280)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+    if capture_size is not None:
+        # Only a request: cameras fall back to their nearest supported mode
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH,  capture_size[0])
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, capture_size[1])
+
+    # Webcams deliver frames at their own rate; files are paced to their FPS
+    pace_fps = None if isinstance(source, int) else (cap.get(cv2.CAP_PROP_FPS) or 30.0)
+
+    inferer = _Inferer(obj_model, pose_model, conf_threshold, inference_mode,
+                       object_every, tracking, detect_every, resolution)
+    times       = _StageTimes()
+    frames_buf  = _LatestBuffer(size=2)
+    results_buf = _LatestBuffer(size=1)
+    stop        = threading.Event()
+    running     = threading.Event()
+    running.set()
+    errors: list[Exception] = []
+
+    threads = [
+        threading.Thread(target=_capture_loop, name="capture", daemon=True,
+                         args=(cap, frames_buf, times, stop, running, pace_fps)),
+        threading.Thread(target=_inference_loop, name="inference", daemon=True,
+                         args=(inferer, frames_buf, results_buf, times, stop, running, errors)),
+    ]
+    for thread in threads:
+        thread.start()
 
     print("[realtime] Iniciado. Q=sair  P=pausar  M=trocar modo")
 
@@ -726,7 +924,7 @@ def run(source, conf_threshold: float = 0.35,
     frame_count   = 0
     fps_timer     = cv2.TickMeter()
     fps_timer.start()
-    last_frame    = None
+    display       = None
 
     # Multi-frame alert history (rolling window)
     violence_history: deque[int]  = deque(maxlen=40)
@@ -735,12 +933,17 @@ def run(source, conf_threshold: float = 0.35,
 
     try:
         while True:
-            if not paused:
-                ret, frame = cap.read()
-                if not ret:
-                    print("[realtime] Fim do vídeo ou falha de captura.")
+            win_title = f"YOLOv8 — Saúde da Mulher | {_MODE_LABELS.get(mode, mode)}"
+            item = None if paused else results_buf.get(timeout=0.03)
+
+            if item is None:
+                if not paused and results_buf.exhausted:
+                    if errors:
+                        raise errors[0]
                     break
-                last_frame = frame.copy()
+            else:
+                t_render = time.perf_counter()
+                frame, captured_at, persons, objects, full = item
 
                 frame_count += 1
                 if frame_count % 15 == 0:
@@ -748,89 +951,41 @@ def run(source, conf_threshold: float = 0.35,
                     fps = 15 / max(fps_timer.getTimeSec(), 0.001)
                     fps_timer.reset(); fps_timer.start()
 
-                # ── Object detection ─────────────────────────────────────
-                obj_results = obj_model(frame, verbose=False, conf=conf_threshold)
-
-                detections_raw = []
-                person_boxes   = []     # [(x1,y1,x2,y2), ...]
-                n_persons      = 0
-
-                clf = get_classifier()
-                _SURGICAL_COCO = {43, 76}
-                has_coco_surgical = False
-
-                for result in obj_results:
-                    for box in result.boxes:
-                        cls_id = int(box.cls[0])
-                        conf   = float(box.conf[0])
-                        x1, y1, x2, y2 = box.xyxy[0].tolist()
-                        name   = result.names[cls_id]
-                        color  = CLASS_COLORS.get(cls_id, DEFAULT_CLASS_COLOR)
-
-                        surgical_label = None
-                        # Enrich knife/scissors with custom instrument label
-                        if cls_id in _SURGICAL_COCO:
-                            has_coco_surgical = True
-                            if clf.available:
-                                custom = clf.classify_region(frame, int(x1), int(y1), int(x2), int(y2))
-                                if custom:
-                                    surgical_label = custom["label"]
-
-                        display_name = surgical_label if surgical_label else name
-                        detections_raw.append({"cls_id": cls_id, "name": display_name, "conf": conf,
-                                                "x1": x1, "y1": y1, "x2": x2, "y2": y2,
-                                                "surgical_label": surgical_label})
-
-                        # Only draw bare box for non-person objects here;
-                        # person boxes are drawn by the context overlay.
-                        if cls_id != 0:
-                            _draw_box(frame, x1, y1, x2, y2, f"{display_name} {conf:.0%}", color)
-                        else:
-                            n_persons += 1
-                            person_boxes.append((int(x1), int(y1), int(x2), int(y2)))
+                detections_raw = list(objects)
+                n_persons      = len(persons)
+
+                # Only draw bare box for non-person objects here;
+                # person boxes are drawn by the context overlay.
+                for det in objects:
+                    _draw_box(frame, det["x1"], det["y1"], det["x2"], det["y2"],
+                              f"{det['name']} {det['conf']:.0%}",
+                              CLASS_COLORS.get(det["cls_id"], DEFAULT_CLASS_COLOR))
 
                 # Full-frame surgical classification when COCO missed instruments
-                if not has_coco_surgical and clf.available:
-                    full = clf.classify(frame)
-                    if full:
-                        h_f, w_f = frame.shape[:2]
-                        detections_raw.append({
-                            "cls_id": -1, "name": full["label"], "conf": full["confidence"],
-                            "x1": 0.0, "y1": 0.0, "x2": float(w_f), "y2": float(h_f),
-                            "surgical_label": full["label"],
-                        })
-                        # Draw subtle full-frame border for classifier-only match
-                        _draw_box(frame, 4, 4, w_f - 4, h_f - 4,
-                                  f"INSTRUMENTO: {full['label']} {full['confidence']:.0%}",
-                                  CLASS_COLORS.get(43, DEFAULT_CLASS_COLOR))
-
-                # ── Pose estimation ──────────────────────────────────────
-                all_keypoints: list[list[Keypoint]] = []
+                if full:
+                    h_f, w_f = frame.shape[:2]
+                    detections_raw.append({
+                        "cls_id": -1, "name": full["label"], "conf": full["confidence"],
+                        "x1": 0.0, "y1": 0.0, "x2": float(w_f), "y2": float(h_f),
+                        "surgical_label": full["label"],
+                    })
+                    # Draw subtle full-frame border for classifier-only match
+                    _draw_box(frame, 4, 4, w_f - 4, h_f - 4,
+                              f"INSTRUMENTO: {full['label']} {full['confidence']:.0%}",
+                              CLASS_COLORS.get(43, DEFAULT_CLASS_COLOR))
+
+                # ── Pose overlay ─────────────────────────────────────────
                 postures: list[str] = []
-
-                if enable_pose and pose_model is not None:
-                    pose_results = pose_model(frame, verbose=False)
-
-                    for result in pose_results:
-                        if result.keypoints is None: continue
-                        kps_xy   = result.keypoints.xy
-                        kps_conf = result.keypoints.conf
-
-                        for pid in range(len(kps_xy)):
-                            xy      = kps_xy[pid].tolist()
-                            conf_kp = kps_conf[pid].tolist() if kps_conf is not None else [1.0] * 17
-                            kps     = _extract_keypoints(xy, conf_kp)
-                            all_keypoints.append(kps)
-
-                            # Base skeleton (always drawn)
-                            _draw_skeleton(frame, kps)
-
-                            # Quick posture label for auto mode
-                            from services.detector import _classify_posture as _cp_srv
-                            # Adapt our Keypoint objects to the dict format used by services/detector.py
-                            kp_dicts = [{"name": k.name, "x": k.x, "y": k.y, "confidence": k.conf} for k in kps]
-                            posture = _cp_srv(kp_dicts)
-                            postures.append(posture)
+                for person in persons:
+                    detections_raw.append({"cls_id": 0, "name": "person", "conf": person["conf"],
+                                           "x1": person["box"][0], "y1": person["box"][1],
+                                           "x2": person["box"][2], "y2": person["box"][3],
+                                           "surgical_label": None})
+                    if person["kps"] is not None:
+                        # Base skeleton (always drawn)
+                        _draw_skeleton(frame, person["kps"])
+                    if person["posture"]:
+                        postures.append(person["posture"])
 
                 # ── Determine active clinical mode ────────────────────────
                 active_mode = mode
@@ -840,11 +995,17 @@ def run(source, conf_threshold: float = 0.35,
                 # ── Context-specific overlay per person ───────────────────
                 alert_msg: str | None = None
 
-                for pid, (px1, py1, px2, py2) in enumerate(person_boxes):
-                    kps = all_keypoints[pid] if pid < len(all_keypoints) else []
+                # Signals of every person in one vectorized pass
+                kps_all = np.stack([
+                    person["kps"] if person["kps"] is not None else _NO_KEYPOINTS for person in persons
+                ]) if persons else np.zeros((0, 17, 3), dtype=np.float32)
+                analyzer = _ANALYZERS.get(active_mode)
+                person_signals = analyzer(kps_all) if analyzer else [None] * len(persons)
+
+                for person, kps, sig in zip(persons, kps_all, person_signals):
+                    px1, py1, px2, py2 = (int(v) for v in person["box"])
 
                     if active_mode == "consultation":
-                        sig = _analyze_consultation(kps)
                         consult_history.append(sig.discomfort_score)
                         _overlay_consultation(frame, sig, px1, py1, px2, py2)
 
@@ -855,14 +1016,12 @@ def run(source, conf_threshold: float = 0.35,
                                 alert_msg = "Desconforto persistente detectado — avaliação clínica recomendada"
 
                     elif active_mode == "physiotherapy":
-                        sig = _analyze_physiotherapy(kps)
                         _overlay_physiotherapy(frame, sig, kps, px1, py2, px2)
 
                         if sig.compensation:
                             alert_msg = "Compensação motora detectada — ajustar exercício"
 
                     elif active_mode == "violence":
-                        sig = _analyze_violence(kps)
                         violence_history.append(sig.risk_score)
 
                         # Sustained risk: count consecutive frames with risk_score >= 2
@@ -881,23 +1040,33 @@ def run(source, conf_threshold: float = 0.35,
                     else:
                         # Unknown/surgery — just draw person box
                         cv2.rectangle(frame, (px1, py1), (px2, py2), C["green"], 2)
-                        if pid < len(postures):
-                            _draw_badge(frame, px1, py2 + 4, postures[pid].upper(),
-                                        POSTURE_COLORS.get(postures[pid], C["grey"]))
+                        if person["posture"]:
+                            _draw_badge(frame, px1, py2 + 4, person["posture"].upper(),
+                                        POSTURE_COLORS.get(person["posture"], C["grey"]))
+
+                    if person["track_id"] is not None:
+                        # Track ID in the box's top-right corner
+                        _draw_badge(frame, max(px1, px2 - 40), py1 + 4, f"#{person['track_id']}", C["white"], 0.45)
 
                 # ── HUD ──────────────────────────────────────────────────
-                _draw_hud(frame, mode, fps, n_persons, alert_msg)
+                _draw_hud(frame, mode, fps, n_persons, alert_msg,
+                          stage_ms=times.snapshot(), dropped=frames_buf.dropped,
+                          resolution=resolution)
+                display = frame
 
-            # Display
-            display = frame if not paused else (last_frame if last_frame is not None else frame)
-            win_title = f"YOLOv8 — Saúde da Mulher | {_MODE_LABELS.get(mode, mode)}"
-            cv2.imshow(win_title, display)
+                cv2.imshow(win_title, display)
+                times.add("render", (time.perf_counter() - t_render) * 1000)
+                times.add("latency", (time.perf_counter() - captured_at) * 1000)
 
             key = cv2.waitKey(1) & 0xFF
             if key in (ord('q'), 27):
                 break
             elif key == ord('p'):
                 paused = not paused
+                if paused:
+                    running.clear()
+                else:
+                    running.set()
                 print(f"[realtime] {'PAUSADO' if paused else 'RETOMADO'}")
             elif key == ord('m'):
                 idx  = _MODES_CYCLE.index(mode) if mode in _MODES_CYCLE else 0
@@ -910,6 +1079,10 @@ def run(source, conf_threshold: float = 0.35,
     except KeyboardInterrupt:
         print("\n[realtime] Interrompido pelo usuário.")
     finally:
+        stop.set()
+        running.set()
+        for thread in threads:
+            thread.join(timeout=2.0)
         cap.release()
         cv2.destroyAllWindows()
         print("[realtime] Encerrado.")
@@ -943,15 +1116,61 @@ Teclas durante execução:
         help="Limiar de confiança YOLOv8 (0–1). Padrão: 0.35")
     parser.add_argument("--no-pose", action="store_true",
         help="Desativa estimação de pose (mais rápido em CPU)")
-    return parser.parse_args()
+    parser.add_argument("--inference-mode", default="dual", choices=["dual", "unified", "crops"],
+        help="dual: detecção + pose em todo frame; unified: pessoas vindas do modelo "
+             "de pose e detecção de objetos a cada --object-every frames; crops: pose "
+             "só nos recortes das pessoas detectadas (nenhuma sem pessoas). Padrão: dual")
+    parser.add_argument("--object-every", type=int, default=3,
+        help="No modo unified, roda o detector de objetos 1 a cada N detecções. Padrão: 3")
+    parser.add_argument("--backend", default="torch", choices=INFERENCE_BACKENDS,
+        help="Runtime dos modelos: torch, onnx (ONNX Runtime) ou openvino. "
+             "A exportação é feita uma vez e reaproveitada. Padrão: torch")
+    parser.add_argument("--threads", type=int, default=0,
+        help="Threads por inferência nos backends onnx/openvino (0 = todos os núcleos)")
+    parser.add_argument("--precision", default="fp32", choices=PRECISIONS,
+        help="int8 usa os modelos quantizados por scripts/quantize_models.py "
+             "(requer --backend onnx ou openvino). Padrão: fp32")
+    parser.add_argument("--track", action="store_true",
+        help="Rastreia pessoas/objetos entre detecções (IDs estáveis, menos inferência)")
+    parser.add_argument("--detect-every", type=int, default=5,
+        help="Com --track, detecção completa a cada N frames (antes, se o rastreador "
+             "estiver incerto). Padrão: 5")
+    parser.add_argument("--imgsz", type=int, default=640,
+        help="Resolução de entrada dos modelos (lado maior, múltiplo de 32). Padrão: 640")
+    parser.add_argument("--min-imgsz", type=int, default=0,
+        help="Ativa resolução adaptativa: reduz a entrada até este valor enquanto as "
+             "pessoas em cena são grandes (0 = fixa em --imgsz)")
+    parser.add_argument("--roi", action="store_true",
+        help="Roda a pose num recorte ao redor das pessoas já detectadas "
+             "(mais pixels por pessoa distante; frame inteiro periodicamente)")
+    parser.add_argument("--capture-size", default="1280x720",
+        help="Resolução pedida à câmera (LxA) ou 'native' para manter a da câmera. Padrão: 1280x720")
+    args = parser.parse_args()
+    if args.precision == "int8" and args.backend == "torch":
+        parser.error("--precision int8 requer --backend onnx ou openvino")
+    if args.capture_size == "native":
+        args.capture_size = None
+    else:
+        try:
+            args.capture_size = tuple(int(v) for v in args.capture_size.lower().split("x"))
+        except ValueError:
+            args.capture_size = ()
+        if len(args.capture_size) != 2:
+            parser.error("--capture-size deve ser LxA (ex.: 1280x720) ou 'native'")
+    return args
 
 
 if __name__ == "__main__":
     args = _parse_args()
+    configure_backend(args.backend, intra_op_threads=args.threads or None, precision=args.precision)
     source = args.source
     try:
         source = int(source)
     except (ValueError, TypeError):
         pass
     run(source=source, conf_threshold=args.conf,
-        enable_pose=not args.no_pose, initial_mode=args.mode)
+        enable_pose=not args.no_pose, initial_mode=args.mode,
+        inference_mode=args.inference_mode, object_every=args.object_every,
+        tracking=args.track, detect_every=args.detect_every,
+        imgsz=args.imgsz, min_imgsz=args.min_imgsz or None, pose_roi=args.roi,
+        capture_size=args.capture_size)
@@ -47,13 +47,42 @@ class ClinicalAnalysis(BaseModel):
     summary: str
 
 
+class SamplingStats(BaseModel):
+    strategy: str  # scan | seek
+    total_frames: int
+    frames_requested: int
+    frames_decoded: int
+    frames_grabbed: int
+    seeks: int
+    keyframe_interval: int
+    decode_ms: float
+    total_ms: float
+    cached: bool = False  # served from the video cache: timings are from the original decode
+
+
 class DetectionResponse(BaseModel):
     frames_processed: int
     frame_detections: List[FrameDetection]
     clinical_analysis: ClinicalAnalysis
     model_version: str = "yolov8n"
+    sampling: Optional[SamplingStats] = None  # only for video uploads (/detect)
 
 
 class FramesInput(BaseModel):
     frames: List[str]  # base64-encoded JPEG frames
     analysis_type: Optional[str] = None  # surgery | physiotherapy | violence_screening | consultation
+
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: str  # queued | running | done | failed
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    queue_position: Optional[int] = None
+    total_frames: Optional[int] = None
+    frames_processed: int = 0
+    progress: Optional[float] = None  # 0–1, fraction of the video already scanned
+    eta_seconds: Optional[float] = None
+    frame_detections: List[FrameDetection] = []  # partial results while running
+    error: Optional[str] = None
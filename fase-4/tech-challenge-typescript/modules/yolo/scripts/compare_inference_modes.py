@@ -0,0 +1,233 @@
+"""
+Compara os modos de inferência "dual" e "unified" do YOLODetector.
+
+dual    → yolov8n + yolov8n-pose em todo frame
+unified → só yolov8n-pose em todo frame (pessoas vêm das caixas de pose);
+          yolov8n roda 1 a cada --object-every frames
+
+Os dois modos processam exatamente os mesmos frames e o relatório mostra,
+tomando o modo dual como referência:
+
+  - latência média por frame e speedup
+  - pessoas: concordância da contagem por frame e recall/precisão das caixas (IoU >= 0.5)
+  - objetos não-pessoa: recall geral e recall só nos frames em que o detector rodou
+  - análise clínica: concordância do video_type por vídeo
+
+Uso:
+  cd modules/yolo
+  source .venv/bin/activate
+  python scripts/compare_inference_modes.py --source video1.mp4 video2.mp4
+  python scripts/compare_inference_modes.py --images assets/images --max-frames 200
+  python scripts/compare_inference_modes.py --source video.mp4 --object-every 5 --json report.json
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# ── Paths ─────────────────────────────────────────────────────────────────────
+YOLO_DIR = Path(__file__).parent.parent           # modules/yolo/
+sys.path.insert(0, str(YOLO_DIR))
+
+from services.analyzer import analyze_clinical_context   # noqa: E402
+from services.detector import YOLODetector               # noqa: E402
+
+IOU_MATCH = 0.5
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+
+# ── Frame sources ─────────────────────────────────────────────────────────────
+
+def load_video_frames(path: Path, stride: int, max_frames: int) -> list[np.ndarray]:
+    detector = YOLODetector()
+    frames = []
+    for _, frame, _ in detector.iter_frames(str(path), stride=stride):
+        frames.append(frame)
+        if len(frames) >= max_frames:
+            break
+    return frames
+
+
+def load_image_frames(images_dir: Path, max_frames: int) -> list[np.ndarray]:
+    frames = []
+    for img_path in sorted(images_dir.iterdir()):
+        if img_path.suffix.lower() not in IMAGE_SUFFIXES:
+            continue
+        frame = cv2.imread(str(img_path))
+        if frame is not None:
+            frames.append(frame)
+        if len(frames) >= max_frames:
+            break
+    return frames
+
+
+# ── Metrics ───────────────────────────────────────────────────────────────────
+
+def _iou(a: dict, b: dict) -> float:
+    ix1, iy1 = max(a["x1"], b["x1"]), max(a["y1"], b["y1"])
+    ix2, iy2 = min(a["x2"], b["x2"]), min(a["y2"], b["y2"])
+    inter = max(0.0, ix2 - ix1) * max(0.0, iy2 - iy1)
+    union = (a["x2"] - a["x1"]) * (a["y2"] - a["y1"]) + (b["x2"] - b["x1"]) * (b["y2"] - b["y1"]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _matched(reference: list[dict], candidates: list[dict]) -> int:
+    """Greedy one-to-one matches of same-class boxes with IoU >= IOU_MATCH."""
+    used: set[int] = set()
+    matches = 0
+    for ref in sorted(reference, key=lambda d: -d["confidence"]):
+        best, best_iou = None, IOU_MATCH
+        for j, cand in enumerate(candidates):
+            if j in used or cand["class_id"] != ref["class_id"]:
+                continue
+            iou = _iou(ref, cand)
+            if iou >= best_iou:
+                best, best_iou = j, iou
+        if best is not None:
+            used.add(best)
+            matches += 1
+    return matches
+
+
+def run_mode(mode: str, frames: list[np.ndarray], object_every: int, batch: int):
+    """(per-frame (detections, poses), seconds) for one mode; fresh detector so the object cadence starts at 0."""
+    detector = YOLODetector(max_batch_size=batch, inference_mode=mode, object_every=object_every)
+    # Load both models outside the timed loop (need_objects does not advance the cadence)
+    detector.detect_batch(frames[:1], need_objects=True)
+
+    results = []
+    t0 = time.perf_counter()
+    for start in range(0, len(frames), batch):
+        results.extend(detector.detect_batch(frames[start:start + batch]))
+    return results, time.perf_counter() - t0
+
+
+def compare(sources: dict[str, list[np.ndarray]], object_every: int, batch: int) -> dict:
+    totals = {
+        "frames": 0, "dual_s": 0.0, "unified_s": 0.0,
+        "person_count_equal": 0, "person_count_abs_diff": 0,
+        "persons_dual": 0, "persons_unified": 0, "persons_matched": 0,
+        "objects_dual": 0, "objects_matched": 0,
+        "objects_dual_on_object_frames": 0, "objects_matched_on_object_frames": 0,
+    }
+    videos = []
+
+    for name, frames in sources.items():
+        if not frames:
+            print(f"  [WARN] Nenhum frame em {name}, ignorado.")
+            continue
+        dual, dual_s = run_mode("dual", frames, object_every, batch)
+        unified, unified_s = run_mode("unified", frames, object_every, batch)
+
+        totals["frames"] += len(frames)
+        totals["dual_s"] += dual_s
+        totals["unified_s"] += unified_s
+
+        for i, ((d_det, _), (u_det, _)) in enumerate(zip(dual, unified)):
+            d_persons = [d for d in d_det if d["class_id"] == 0]
+            u_persons = [d for d in u_det if d["class_id"] == 0]
+            d_objects = [d for d in d_det if d["class_id"] != 0]
+            u_objects = [d for d in u_det if d["class_id"] != 0]
+
+            totals["person_count_equal"] += len(d_persons) == len(u_persons)
+            totals["person_count_abs_diff"] += abs(len(d_persons) - len(u_persons))
+            totals["persons_dual"] += len(d_persons)
+            totals["persons_unified"] += len(u_persons)
+            totals["persons_matched"] += _matched(d_persons, u_persons)
+
+            objects_matched = _matched(d_objects, u_objects)
+            totals["objects_dual"] += len(d_objects)
+            totals["objects_matched"] += objects_matched
+            if i % object_every == 0:
+                totals["objects_dual_on_object_frames"] += len(d_objects)
+                totals["objects_matched_on_object_frames"] += objects_matched
+
+        dual_type = analyze_clinical_context([d for d, _ in dual], [p for _, p in dual])["video_type"]
+        unified_type = analyze_clinical_context([d for d, _ in unified], [p for _, p in unified])["video_type"]
+        videos.append({
+            "source": name,
+            "frames": len(frames),
+            "video_type_dual": dual_type,
+            "video_type_unified": unified_type,
+            "agree": dual_type == unified_type,
+        })
+
+    n = max(totals["frames"], 1)
+    return {
+        "object_every": object_every,
+        "frames": totals["frames"],
+        "ms_per_frame_dual": round(totals["dual_s"] * 1000 / n, 2),
+        "ms_per_frame_unified": round(totals["unified_s"] * 1000 / n, 2),
+        "speedup": round(totals["dual_s"] / totals["unified_s"], 2) if totals["unified_s"] else None,
+        "person_count_agreement": round(totals["person_count_equal"] / n, 4),
+        "person_count_mean_abs_diff": round(totals["person_count_abs_diff"] / n, 4),
+        "person_box_recall": _ratio(totals["persons_matched"], totals["persons_dual"]),
+        "person_box_precision": _ratio(totals["persons_matched"], totals["persons_unified"]),
+        "object_recall": _ratio(totals["objects_matched"], totals["objects_dual"]),
+        "object_recall_on_object_frames": _ratio(
+            totals["objects_matched_on_object_frames"], totals["objects_dual_on_object_frames"]
+        ),
+        "video_type_agreement": _ratio(sum(v["agree"] for v in videos), len(videos)),
+        "videos": videos,
+    }
+
+
+def _ratio(num: int, den: int) -> float | None:
+    return round(num / den, 4) if den else None
+
+
+# ── Report ────────────────────────────────────────────────────────────────────
+
+def print_report(report: dict):
+    print(f"\n[compare] {report['frames']} frame(s), object_every={report['object_every']}\n")
+    print(f"  {'ms/frame dual':<34} {report['ms_per_frame_dual']}")
+    print(f"  {'ms/frame unified':<34} {report['ms_per_frame_unified']}")
+    print(f"  {'speedup':<34} {report['speedup']}")
+    print(f"  {'concordância nº de pessoas':<34} {report['person_count_agreement']}")
+    print(f"  {'erro médio nº de pessoas':<34} {report['person_count_mean_abs_diff']}")
+    print(f"  {'recall caixas de pessoa':<34} {report['person_box_recall']}")
+    print(f"  {'precisão caixas de pessoa':<34} {report['person_box_precision']}")
+    print(f"  {'recall objetos (todos os frames)':<34} {report['object_recall']}")
+    print(f"  {'recall objetos (frames c/ detector)':<34} {report['object_recall_on_object_frames']}")
+    print(f"  {'concordância video_type':<34} {report['video_type_agreement']}")
+    for video in report["videos"]:
+        status = "✓" if video["agree"] else "✗"
+        print(f"    {status} {video['source']:<40} dual={video['video_type_dual']:<20} "
+              f"unified={video['video_type_unified']}")
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Relatório de precisão/latência: dual vs unified")
+    parser.add_argument("--source", nargs="*", default=[], help="Arquivos de vídeo")
+    parser.add_argument("--images", type=Path, help="Diretório de imagens (cada imagem é um frame)")
+    parser.add_argument("--stride", type=int, default=15, help="Stride de amostragem dos vídeos (padrão: 15)")
+    parser.add_argument("--max-frames", type=int, default=300, help="Máximo de frames por fonte (padrão: 300)")
+    parser.add_argument("--object-every", type=int, default=3, help="Cadência do detector no modo unified (padrão: 3)")
+    parser.add_argument("--batch", type=int, default=8, help="Frames por forward pass (padrão: 8)")
+    parser.add_argument("--json", type=Path, help="Salva o relatório em JSON")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    if not args.source and not args.images:
+        print("[ERROR] Informe --source e/ou --images.")
+        sys.exit(1)
+
+    sources: dict[str, list[np.ndarray]] = {}
+    for video in args.source:
+        sources[video] = load_video_frames(Path(video), args.stride, args.max_frames)
+    if args.images:
+        sources[str(args.images)] = load_image_frames(args.images, args.max_frames)
+
+    report = compare(sources, max(1, args.object_every), max(1, args.batch))
+    print_report(report)
+
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+        print(f"\n[compare] Relatório salvo em: {args.json}")
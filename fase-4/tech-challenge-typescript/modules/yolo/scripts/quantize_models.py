@@ -0,0 +1,281 @@
+"""
+Quantização INT8 pós-treinamento dos modelos COCO (yolov8n e yolov8n-pose).
+
+1. Monta um conjunto de calibração com uma amostra de assets/images/ e de
+   frames de vídeos locais (--source); parte dos frames fica de fora para a
+   avaliação.
+2. Exporta cada modelo em INT8 (OpenVINO/NNCF ou ONNX Runtime static
+   quantization) calibrado nesse conjunto. O artefato vai para o cache de
+   services/backends.py, e o servidor passa a usá-lo com
+   YOLO_BACKEND=<backend> YOLO_PRECISION=int8 (realtime.py: --precision int8).
+3. Relatório precisão × latência nos frames separados, tomando o modelo
+   PyTorch FP32 como referência:
+
+  - ms/frame (batch 1, como no realtime) e tamanho do modelo
+  - recall/precisão das caixas (mesma classe, IoU >= 0.5)
+  - pose: erro médio dos keypoints, normalizado pela diagonal da caixa
+
+O classificador cirúrgico é quantizado por
+scripts/train_surgical_classifier.py --quantize.
+
+Uso:
+  cd modules/yolo
+  source .venv/bin/activate
+  python scripts/quantize_models.py --source video1.mp4 video2.mp4
+  python scripts/quantize_models.py --backend onnx --calib-size 300 --json quant_report.json
+  python scripts/quantize_models.py --report-only     # só avalia os INT8 já exportados
+"""
+
+import argparse
+import json
+import random
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# ── Paths ─────────────────────────────────────────────────────────────────────
+YOLO_DIR        = Path(__file__).parent.parent           # modules/yolo/
+ASSETS_DIR      = YOLO_DIR / "assets"
+IMAGES_DIR      = ASSETS_DIR / "images"
+CALIBRATION_DIR = ASSETS_DIR / "calibration"
+sys.path.insert(0, str(YOLO_DIR))
+
+from services.backends import ModelLoader               # noqa: E402
+from services.sampler import FrameSampler               # noqa: E402
+from services.tracker import iou_matrix, match_boxes    # noqa: E402
+
+COCO_MODELS = {
+    "detect": "yolov8n.pt",
+    "pose":   "yolov8n-pose.pt",
+}
+
+IOU_MATCH = 0.5
+KEYPOINT_CONF = 0.5
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+
+# ── Calibration set ───────────────────────────────────────────────────────────
+
+def collect_frames(images_dir: Path, videos: list[str], max_images: int,
+                   frames_per_video: int, seed: int = 42) -> list[np.ndarray]:
+    """Random sample of images_dir plus evenly spaced frames of each video."""
+    frames: list[np.ndarray] = []
+
+    if images_dir.exists():
+        paths = sorted(p for p in images_dir.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+        random.Random(seed).shuffle(paths)
+        for path in paths[:max_images]:
+            image = cv2.imread(str(path))
+            if image is not None:
+                frames.append(image)
+    else:
+        print(f"  [WARN] Diretório de imagens não encontrado: {images_dir}")
+
+    sampler = FrameSampler()
+    for video in videos:
+        try:
+            video_frames, _ = sampler.sample(video, num_frames=frames_per_video)
+        except ValueError as exc:
+            print(f"  [WARN] {exc}")
+            continue
+        frames.extend(video_frames)
+
+    random.Random(seed).shuffle(frames)
+    return frames
+
+
+def write_calibration_set(frames: list[np.ndarray], calib_dir: Path) -> Path:
+    """
+    Write the calibration frames as an unlabeled ultralytics dataset.
+
+    Calibration only runs images through the network, so no label files are
+    needed. Returns calib_dir/images (the per-task data.yaml lives beside it).
+    """
+    if calib_dir.exists():
+        shutil.rmtree(calib_dir)
+    images = calib_dir / "images"
+    images.mkdir(parents=True)
+    for i, frame in enumerate(frames):
+        cv2.imwrite(str(images / f"{i:05d}.jpg"), frame)
+    return images
+
+
+def write_data_yaml(calib_dir: Path, task: str, names: dict[int, str]) -> Path:
+    """data.yaml pointing train/val at the calibration images."""
+    lines = [f"path: {calib_dir.resolve()}", "train: images", "val: images"]
+    if task == "pose":
+        lines.append("kpt_shape: [17, 3]")
+    lines.append("names:")
+    lines += [f"  {i}: {json.dumps(name)}" for i, name in sorted(names.items())]
+    data_yaml = calib_dir / f"data-{task}.yaml"
+    data_yaml.write_text("\n".join(lines) + "\n")
+    return data_yaml
+
+
+# ── Evaluation ────────────────────────────────────────────────────────────────
+
+def model_size_mb(path: Path) -> float:
+    path = Path(path)
+    files = path.rglob("*") if path.is_dir() else [path]
+    return round(sum(f.stat().st_size for f in files if f.is_file()) / 1e6, 2)
+
+
+def timed_predict(model, frames: list, warmup: int = 3, **kwargs) -> tuple[list, float]:
+    """(results, ms per frame) predicting one frame at a time."""
+    for frame in frames[:warmup]:
+        model(frame, verbose=False, **kwargs)
+    results = []
+    t0 = time.perf_counter()
+    for frame in frames:
+        results.extend(model(frame, verbose=False, **kwargs))
+    return results, (time.perf_counter() - t0) * 1000 / max(len(frames), 1)
+
+
+def compare_detections(reference: list, candidate: list) -> dict:
+    """Box recall/precision (and keypoint error for pose) of candidate vs reference results."""
+    n_ref = n_cand = n_matched = 0
+    kpt_errors: list[float] = []
+
+    for ref, cand in zip(reference, candidate):
+        ref_boxes = ref.boxes.xyxy.cpu().numpy()
+        cand_boxes = cand.boxes.xyxy.cpu().numpy()
+        n_ref += len(ref_boxes)
+        n_cand += len(cand_boxes)
+        if not len(ref_boxes) or not len(cand_boxes):
+            continue
+
+        ious = iou_matrix(ref_boxes, cand_boxes)
+        same_cls = ref.boxes.cls.cpu().numpy()[:, None] == cand.boxes.cls.cpu().numpy()[None, :]
+        ious[~same_cls] = 0.0
+        pairs = match_boxes(ious, IOU_MATCH)
+        n_matched += len(pairs)
+
+        if ref.keypoints is None or cand.keypoints is None:
+            continue
+        ref_kps = ref.keypoints.data.cpu().numpy()
+        cand_kps = cand.keypoints.data.cpu().numpy()
+        for ri, ci in pairs:
+            x1, y1, x2, y2 = ref_boxes[ri]
+            diagonal = max(float(np.hypot(x2 - x1, y2 - y1)), 1.0)
+            visible = (ref_kps[ri, :, 2] >= KEYPOINT_CONF) & (cand_kps[ci, :, 2] >= KEYPOINT_CONF)
+            if visible.any():
+                dist = np.linalg.norm(ref_kps[ri, visible, :2] - cand_kps[ci, visible, :2], axis=1)
+                kpt_errors.append(float(dist.mean()) / diagonal)
+
+    metrics = {
+        "box_recall": _ratio(n_matched, n_ref),
+        "box_precision": _ratio(n_matched, n_cand),
+    }
+    if reference and reference[0].keypoints is not None:
+        metrics["keypoint_error"] = round(float(np.mean(kpt_errors)), 4) if kpt_errors else None
+    return metrics
+
+
+def evaluate_model(weights: str, task: str, backend: str, frames: list[np.ndarray], imgsz: int) -> dict:
+    """Latency and agreement with PyTorch FP32 of: PyTorch FP32, <backend> FP32, <backend> INT8."""
+    from ultralytics import YOLO
+
+    fp32_artifact = ModelLoader(backend).export(weights, imgsz)
+    int8_artifact = ModelLoader(backend, precision="int8").export(weights, imgsz)   # raises if not quantized yet
+
+    reference_model = YOLO(weights, task=task)
+    variants = [
+        ("pytorch fp32", reference_model, Path(reference_model.ckpt_path or weights)),
+        (f"{backend} fp32", YOLO(str(fp32_artifact), task=task), fp32_artifact),
+        (f"{backend} int8", YOLO(str(int8_artifact), task=task), int8_artifact),
+    ]
+
+    rows = []
+    reference = None
+    for name, model, artifact in variants:
+        results, ms = timed_predict(model, frames, imgsz=imgsz)
+        if reference is None:
+            reference = results
+        rows.append({
+            "variant": name,
+            "ms_per_frame": round(ms, 2),
+            "size_mb": model_size_mb(artifact),
+            **compare_detections(reference, results),
+        })
+
+    base_ms = rows[0]["ms_per_frame"]
+    for row in rows:
+        row["speedup"] = round(base_ms / row["ms_per_frame"], 2) if row["ms_per_frame"] else None
+    return {"model": weights, "task": task, "frames": len(frames), "variants": rows}
+
+
+def _ratio(num: int, den: int) -> float | None:
+    return round(num / den, 4) if den else None
+
+
+# ── Report ────────────────────────────────────────────────────────────────────
+
+def print_report(report: dict):
+    """Table of variants per model; metric columns are whatever the rows carry."""
+    print(f"\n[quantize] {report['model']} ({report['task']}), {report['frames']} amostra(s) de avaliação\n")
+    columns = [k for k in report["variants"][0] if k != "variant"]
+    print(f"  {'variante':<16}" + "".join(f"{c:>16}" for c in columns))
+    for row in report["variants"]:
+        cells = "".join(f"{'-' if row[c] is None else row[c]!s:>16}" for c in columns)
+        print(f"  {row['variant']:<16}{cells}")
+
+
+# ── CLI ───────────────────────────────────────────────────────────────────────
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Quantização INT8 e relatório precisão/latência dos modelos COCO")
+    parser.add_argument("--source", nargs="*", default=[], help="Vídeos locais para calibração/avaliação")
+    parser.add_argument("--images", type=Path, default=IMAGES_DIR, help=f"Diretório de imagens (padrão: {IMAGES_DIR})")
+    parser.add_argument("--backend", default="openvino", choices=("openvino", "onnx"),
+                        help="Formato INT8: openvino (NNCF) ou onnx (ONNX Runtime). Padrão: openvino")
+    parser.add_argument("--models", nargs="*", default=list(COCO_MODELS), choices=list(COCO_MODELS),
+                        help="Modelos a quantizar (padrão: detect pose)")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--calib-size", type=int, default=300, help="Imagens de assets/images na amostra (padrão: 300)")
+    parser.add_argument("--frames-per-video", type=int, default=60, help="Frames por vídeo na amostra (padrão: 60)")
+    parser.add_argument("--eval-fraction", type=float, default=0.2,
+                        help="Fração da amostra reservada para avaliação (padrão: 0.2)")
+    parser.add_argument("--report-only", action="store_true", help="Não quantiza; avalia os INT8 já exportados")
+    parser.add_argument("--json", type=Path, help="Salva o relatório em JSON")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    from ultralytics import YOLO
+
+    args = _parse_args()
+
+    print("[1/3] Coletando frames de calibração...")
+    frames = collect_frames(args.images, args.source, args.calib_size, args.frames_per_video, args.seed)
+    n_eval = max(1, int(len(frames) * args.eval_fraction))
+    eval_frames, calib_frames = frames[:n_eval], frames[n_eval:]
+    if not calib_frames:
+        print("[ERROR] Nenhum frame de calibração. Informe --images e/ou --source.")
+        sys.exit(1)
+    print(f"  calibração={len(calib_frames)}  avaliação={len(eval_frames)}")
+
+    if not args.report_only:
+        print(f"\n[2/3] Quantizando ({args.backend} int8)...")
+        write_calibration_set(calib_frames, CALIBRATION_DIR)
+        loader = ModelLoader(args.backend, precision="int8")
+        for task in args.models:
+            weights = COCO_MODELS[task]
+            data_yaml = write_data_yaml(CALIBRATION_DIR, task, YOLO(weights).names)
+            artifact = loader.export(weights, args.imgsz, data=data_yaml)
+            print(f"  {weights:<18} → {artifact}")
+    else:
+        print("\n[2/3] Pulando quantização (--report-only)")
+
+    print("\n[3/3] Avaliando...")
+    reports = [evaluate_model(COCO_MODELS[task], task, args.backend, eval_frames, args.imgsz) for task in args.models]
+    for report in reports:
+        print_report(report)
+
+    if args.json:
+        args.json.write_text(json.dumps(reports, indent=2, ensure_ascii=False))
+        print(f"\n[quantize] Relatório salvo em: {args.json}")
@@ -17,9 +17,12 @@ Uso:
   python scripts/train_surgical_classifier.py
   python scripts/train_surgical_classifier.py --epochs 50 --imgsz 224
   python scripts/train_surgical_classifier.py --validate-only   # valida modelo existente
+  python scripts/train_surgical_classifier.py --quantize        # INT8 + relatório precisão × latência
+  python scripts/train_surgical_classifier.py --quantize --quant-backend onnx --json quant_cls.json
 """
 
 import argparse
+import json
 import random
 import re
 import shutil
@@ -190,6 +193,80 @@ def validate():
     return results
 
 
+# ── INT8 quantization ─────────────────────────────────────────────────────────
+
+def quantize(backend: str = "openvino", imgsz: int = 224, json_path: Path | None = None) -> dict:
+    """
+    Post-training INT8 quantization of the trained classifier, calibrated on
+    the dataset's val split (a sample of assets/images). The artifact goes to
+    the services/backends.py cache, where the server picks it up with
+    YOLO_BACKEND=<backend> YOLO_PRECISION=int8.
+
+    Then compares PyTorch FP32, <backend> FP32 and <backend> INT8 on the val
+    split: top-1 accuracy, top-1 agreement with PyTorch, ms/image and size.
+    """
+    try:
+        from ultralytics import YOLO
+    except ImportError:
+        print("[ERROR] ultralytics não instalado.")
+        sys.exit(1)
+
+    sys.path.insert(0, str(YOLO_DIR))
+    from services.backends import ModelLoader
+    from quantize_models import model_size_mb, print_report, timed_predict
+
+    if not OUTPUT_MODEL.exists():
+        print(f"[ERROR] Modelo não encontrado: {OUTPUT_MODEL}")
+        print("Execute o treinamento primeiro: python scripts/train_surgical_classifier.py")
+        sys.exit(1)
+
+    samples = [
+        (img, cls)
+        for cls in CLASS_PREFIXES.values()
+        for img in sorted((DATASET_DIR / "val" / cls).glob("*.jpg"))
+    ]
+    if not samples:
+        print(f"[ERROR] Split de validação vazio: {DATASET_DIR / 'val'}")
+        print("Prepare o dataset primeiro (rode o treinamento sem --skip-dataset).")
+        sys.exit(1)
+
+    print(f"[quantize] Calibrando {OUTPUT_MODEL.name} → {backend} int8 em {DATASET_DIR}")
+    fp32_artifact = ModelLoader(backend).export(OUTPUT_MODEL, imgsz)
+    int8_artifact = ModelLoader(backend, precision="int8").export(OUTPUT_MODEL, imgsz, data=DATASET_DIR)
+
+    images = [str(img) for img, _ in samples]
+    labels = [cls for _, cls in samples]
+    variants = [
+        ("pytorch fp32", YOLO(str(OUTPUT_MODEL)), OUTPUT_MODEL),
+        (f"{backend} fp32", YOLO(str(fp32_artifact), task="classify"), fp32_artifact),
+        (f"{backend} int8", YOLO(str(int8_artifact), task="classify"), int8_artifact),
+    ]
+
+    rows = []
+    reference = None
+    for name, model, artifact in variants:
+        results, ms = timed_predict(model, images, imgsz=imgsz)
+        predicted = [r.names[r.probs.top1] for r in results]
+        if reference is None:
+            reference = predicted
+        rows.append({
+            "variant": name,
+            "ms_per_image": round(ms, 2),
+            "size_mb": model_size_mb(artifact),
+            "top1_acc": round(sum(p == y for p, y in zip(predicted, labels)) / len(labels), 4),
+            "top1_agreement": round(sum(p == r for p, r in zip(predicted, reference)) / len(labels), 4),
+        })
+    for row in rows:
+        row["speedup"] = round(rows[0]["ms_per_image"] / row["ms_per_image"], 2) if row["ms_per_image"] else None
+
+    report = {"model": OUTPUT_MODEL.name, "task": "classify", "frames": len(samples), "variants": rows}
+    print_report(report)
+    if json_path:
+        json_path.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+        print(f"\n[quantize] Relatório salvo em: {json_path}")
+    return report
+
+
 # ── Quick inference test ──────────────────────────────────────────────────────
 
 def test_inference(n_samples: int = 3):
@@ -232,6 +309,12 @@ def _parse_args():
                         help="Pula a preparação do dataset (usa dataset existente)")
     parser.add_argument("--validate-only", action="store_true",
                         help="Apenas valida modelo já treinado")
+    parser.add_argument("--quantize",      action="store_true",
+                        help="Quantiza (INT8) o modelo treinado e gera relatório precisão × latência")
+    parser.add_argument("--quant-backend", type=str,   default="openvino", choices=("openvino", "onnx"),
+                        help="Formato INT8 do --quantize (padrão: openvino)")
+    parser.add_argument("--json",          type=Path,  default=None,
+                        help="Salva o relatório do --quantize em JSON")
     parser.add_argument("--seed",          type=int,   default=42)
     return parser.parse_args()
 
@@ -247,6 +330,10 @@ if __name__ == "__main__":
         validate()
         sys.exit(0)
 
+    if args.quantize:
+        quantize(backend=args.quant_backend, imgsz=args.imgsz, json_path=args.json)
+        sys.exit(0)
+
     if not IMAGES_DIR.exists():
         print(f"[ERROR] Diretório de imagens não encontrado: {IMAGES_DIR}")
         sys.exit(1)
@@ -3,8 +3,11 @@ Clinical context analyzer.
 Takes raw YOLOv8 detections + pose data and produces structured clinical analysis
 for women's health domains: surgery, physiotherapy, violence screening, consultation.
 """
+from itertools import zip_longest
 from typing import Any
 
+from services.poses import PoseArray
+
 # COCO class IDs
 PERSON_CLASS = 0
 SURGICAL_INSTRUMENT_CLASSES = {43, 76}  # knife, scissors
@@ -16,9 +19,60 @@ DEFENSIVE_LABELS = {"defensive", "distress"}
 EXERCISE_LABELS = {"exercise"}
 
 
+class ClinicalContextAccumulator:
+    """
+    Running aggregate of per-frame detections and poses.
+
+    Keeps only counters, so whole videos can be analyzed frame by frame with
+    flat memory (dense /detect mode); analyze_clinical_context() is the
+    list-based convenience wrapper around it.
+    """
+
+    def __init__(self):
+        self.total_frames = 0
+        self.person_total = 0
+        self.surgical_tool_total = 0
+        self.exercise_equipment_total = 0
+        self.furniture_total = 0
+        self.defensive_frames = 0
+        self.exercise_frames = 0
+        self.distress_frames = 0
+
+    def update(self, detections: list[dict], poses: PoseArray):
+        """Add one frame's detections and poses."""
+        self.total_frames += 1
+        self.person_total += sum(1 for d in detections if d["class_id"] == PERSON_CLASS)
+        self.surgical_tool_total += sum(1 for d in detections if d["class_id"] in SURGICAL_INSTRUMENT_CLASSES)
+        self.exercise_equipment_total += sum(1 for d in detections if d["class_id"] in EXERCISE_EQUIPMENT_CLASSES)
+        self.furniture_total += sum(1 for d in detections if d["class_id"] in FURNITURE_CLASSES)
+
+        postures = set(poses.postures)
+        if postures & DEFENSIVE_LABELS:
+            self.defensive_frames += 1
+        if postures & EXERCISE_LABELS:
+            self.exercise_frames += 1
+        if "distress" in postures:
+            self.distress_frames += 1
+
+    def analyze(self, hint: str | None = None) -> dict[str, Any]:
+        """ClinicalAnalysis-compatible dict for the frames added so far."""
+        return _analyze_aggregates(self, hint)
+
+    def to_dict(self) -> dict[str, int]:
+        """The counters, e.g. to persist them and analyze() again with another hint."""
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, counters: dict[str, int]) -> "ClinicalContextAccumulator":
+        acc = cls()
+        for name in vars(acc):
+            setattr(acc, name, counters[name])
+        return acc
+
+
 def analyze_clinical_context(
     frame_detections: list[list[dict]],
-    frame_poses: list[list[dict]],
+    frame_poses: list[PoseArray],
     hint: str | None = None,
 ) -> dict[str, Any]:
     """
@@ -26,43 +80,28 @@ def analyze_clinical_context(
 
     Args:
         frame_detections: List of detection lists, one per frame.
-        frame_poses:       List of pose lists, one per frame.
+        frame_poses:       List of PoseArrays, one per frame.
         hint:              Optional user-supplied hint ('surgery', 'physiotherapy', etc.)
 
     Returns:
         ClinicalAnalysis-compatible dict.
     """
-    # ── Aggregate metrics ─────────────────────────────────────────────────
-    total_frames = len(frame_detections)
-    person_counts: list[int] = []
-    surgical_tool_total = 0
-    exercise_equipment_total = 0
-    furniture_total = 0
-
-    for dets in frame_detections:
-        persons = [d for d in dets if d["class_id"] == PERSON_CLASS]
-        person_counts.append(len(persons))
-        surgical_tool_total += sum(1 for d in dets if d["class_id"] in SURGICAL_INSTRUMENT_CLASSES)
-        exercise_equipment_total += sum(1 for d in dets if d["class_id"] in EXERCISE_EQUIPMENT_CLASSES)
-        furniture_total += sum(1 for d in dets if d["class_id"] in FURNITURE_CLASSES)
-
-    avg_persons = sum(person_counts) / max(total_frames, 1)
-
-    # Pose aggregation
-    defensive_frames = 0
-    exercise_frames = 0
-    distress_frames = 0
-
-    for poses in frame_poses:
-        has_defensive = any(p["posture_label"] in DEFENSIVE_LABELS for p in poses)
-        has_exercise = any(p["posture_label"] in EXERCISE_LABELS for p in poses)
-        has_distress = any(p["posture_label"] == "distress" for p in poses)
-        if has_defensive:
-            defensive_frames += 1
-        if has_exercise:
-            exercise_frames += 1
-        if has_distress:
-            distress_frames += 1
+    acc = ClinicalContextAccumulator()
+    for detections, poses in zip_longest(frame_detections, frame_poses, fillvalue=None):
+        acc.update(detections or [], poses if poses is not None else PoseArray())
+    return acc.analyze(hint)
+
+
+def _analyze_aggregates(acc: ClinicalContextAccumulator, hint: str | None) -> dict[str, Any]:
+    total_frames = acc.total_frames
+    surgical_tool_total = acc.surgical_tool_total
+    exercise_equipment_total = acc.exercise_equipment_total
+    furniture_total = acc.furniture_total
+    defensive_frames = acc.defensive_frames
+    exercise_frames = acc.exercise_frames
+    distress_frames = acc.distress_frames
+
+    avg_persons = acc.person_total / max(total_frames, 1)
 
     # ── Apply user hint if present ────────────────────────────────────────
     if hint:
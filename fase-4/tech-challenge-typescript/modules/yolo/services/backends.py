@@ -0,0 +1,244 @@
+"""
+Pluggable inference backends for the YOLO models.
+
+By default models are loaded from their PyTorch .pt weights (eager mode).
+For CPU deployments the same weights can be exported once to ONNX (run by
+ONNX Runtime) or OpenVINO IR and loaded from there instead, which starts
+faster and runs faster on CPU:
+
+  torch     → YOLO("yolov8n.pt")                           (default)
+  onnx      → assets/models/exported/yolov8n-640-<hash>.onnx
+  openvino  → assets/models/exported/yolov8n-640-<hash>_openvino_model/
+
+Exported artifacts are keyed by a hash of the source weights, so a retrained
+surgical_classifier.pt gets a fresh export automatically. Runtime thread
+counts (ONNX Runtime intra/inter-op, OpenVINO inference threads) are
+configurable so that several executor workers don't oversubscribe the CPU.
+
+With precision="int8" the loader serves post-training quantized exports
+(ONNX Runtime static quantization / OpenVINO NNCF). Quantization needs
+calibration images, so INT8 artifacts are produced offline by
+scripts/quantize_models.py and train_surgical_classifier.py --quantize; at
+serving time they are only looked up in the cache:
+
+  onnx      → assets/models/exported/yolov8n-640-<hash>-int8.onnx
+  openvino  → assets/models/exported/yolov8n-640-<hash>-int8_openvino_model/
+
+If the export or the runtime is unavailable, loading falls back to the .pt
+weights with a warning instead of failing (a missing INT8 artifact falls back
+to the FP32 export of the same backend).
+"""
+import hashlib
+import os
+import shutil
+import threading
+from pathlib import Path
+
+import numpy as np
+from ultralytics import YOLO
+
+INFERENCE_BACKENDS = ("torch", "onnx", "openvino")
+PRECISIONS = ("fp32", "int8")
+
+# Relative to modules/yolo/
+EXPORT_DIR = Path(__file__).parent.parent / "assets" / "models" / "exported"
+
+# One export at a time: models load lazily per thread, and the first threads
+# to ask for a model must not all export it concurrently.
+_export_lock = threading.Lock()
+
+
+class ModelLoader:
+    """
+    Usage:
+        loader = ModelLoader("onnx", intra_op_threads=2)
+        model = loader.load("yolov8n.pt", task="detect")
+        model(frame)
+
+        # offline: calibrate and cache an INT8 export
+        ModelLoader("openvino", precision="int8").export("yolov8n.pt", data="calib/data.yaml")
+    """
+
+    def __init__(
+        self,
+        backend: str = "torch",
+        intra_op_threads: int | None = None,
+        inter_op_threads: int | None = None,
+        export_dir: Path = EXPORT_DIR,
+        precision: str = "fp32",
+    ):
+        """
+        Args:
+            backend:          torch | onnx | openvino
+            intra_op_threads: Threads per forward pass (ONNX Runtime intra-op,
+                              OpenVINO INFERENCE_NUM_THREADS). None = runtime default.
+            inter_op_threads: ONNX Runtime inter-op threads. None = runtime default.
+            export_dir:       Where exported artifacts are cached.
+            precision:        fp32 | int8 (int8 requires onnx or openvino).
+        """
+        if backend not in INFERENCE_BACKENDS:
+            raise ValueError(f"backend deve ser um de {INFERENCE_BACKENDS}: {backend!r}")
+        if precision not in PRECISIONS:
+            raise ValueError(f"precision deve ser um de {PRECISIONS}: {precision!r}")
+        if precision == "int8" and backend == "torch":
+            raise ValueError("precision='int8' requer backend onnx ou openvino")
+        self.backend = backend
+        self.precision = precision
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.export_dir = Path(export_dir)
+
+    def load(self, weights: str | Path, task: str | None = None, imgsz: int = 640) -> YOLO:
+        """Load `weights` with this loader's backend (exporting it on first use)."""
+        if self.backend == "torch":
+            return YOLO(str(weights), task=task)
+
+        try:
+            artifact = self.export(weights, imgsz)
+            model = YOLO(str(artifact), task=task)
+            self._configure_runtime(model, imgsz)
+        except Exception as exc:
+            if self.precision == "int8":
+                print(f"[backends] INT8 indisponível para {Path(weights).name} ({exc}); usando {self.backend} FP32.")
+                return self.with_precision("fp32").load(weights, task=task, imgsz=imgsz)
+            print(f"[backends] {self.backend} indisponível para {Path(weights).name} ({exc}); usando PyTorch.")
+            return YOLO(str(weights), task=task)
+        return model
+
+    def with_precision(self, precision: str) -> "ModelLoader":
+        """Same backend, threads and cache with another precision."""
+        return ModelLoader(self.backend, self.intra_op_threads, self.inter_op_threads, self.export_dir, precision)
+
+    def export(self, weights: str | Path, imgsz: int = 640, data: str | Path | None = None) -> Path:
+        """
+        Path of the cached ONNX/OpenVINO artifact for `weights`, exporting it if missing.
+
+        INT8 exports are calibrated on `data` (an ultralytics dataset: data.yaml
+        for detect/pose, a train/val class-folder directory for classify) and
+        cannot be produced without it.
+        """
+        with _export_lock:
+            weights = Path(weights)
+            if weights.exists():
+                cached = self._artifact_path(weights, imgsz)
+                if cached.exists():
+                    return cached
+
+            # Not cached (or .pt not downloaded yet): load the PyTorch model,
+            # which also downloads stock weights such as yolov8n.pt.
+            model = YOLO(str(weights))
+            source = Path(getattr(model, "ckpt_path", None) or weights)
+            cached = self._artifact_path(source, imgsz)
+            if cached.exists():
+                return cached
+
+            quantize = {}
+            if self.precision == "int8":
+                if data is None:
+                    raise FileNotFoundError(
+                        f"{cached.name} não encontrado; gere com scripts/quantize_models.py "
+                        "(classificador: train_surgical_classifier.py --quantize)"
+                    )
+                quantize = {"int8": True, "data": str(data)}
+
+            print(f"[backends] Exportando {source.name} → {self.backend} {self.precision} (imgsz={imgsz})...")
+            exported = Path(model.export(
+                format=self.backend,
+                imgsz=imgsz,
+                dynamic=True,       # variable batch size for batched inference
+                verbose=False,
+                **quantize,
+            ))
+            self.export_dir.mkdir(parents=True, exist_ok=True)
+            if cached.is_dir():
+                shutil.rmtree(cached)
+            shutil.move(str(exported), cached)
+            print(f"[backends] Exportado: {cached}")
+            return cached
+
+    def _artifact_path(self, weights: Path, imgsz: int) -> Path:
+        stem = f"{weights.stem}-{imgsz}-{_file_digest(weights)}"
+        if self.precision == "int8":
+            stem += "-int8"
+        if self.backend == "onnx":
+            return self.export_dir / f"{stem}.onnx"
+        # ultralytics recognises OpenVINO models by the directory suffix
+        return self.export_dir / f"{stem}_openvino_model"
+
+    def _configure_runtime(self, model: YOLO, imgsz: int):
+        """
+        ultralytics creates the runtime session with default threading (all
+        cores per session). Build the predictor with a dummy frame and, if
+        thread counts are configured, replace its session/compiled model.
+        """
+        model(np.zeros((imgsz, imgsz, 3), dtype=np.uint8), verbose=False)
+        if self.intra_op_threads is None and self.inter_op_threads is None:
+            return
+
+        autobackend = model.predictor.model
+        # ultralytics >= 8.4 wraps the runtime in autobackend.backend
+        runtime = getattr(autobackend, "backend", autobackend)
+        weights = model.ckpt_path or model.model_name
+
+        if self.backend == "onnx":
+            import onnxruntime
+
+            options = onnxruntime.SessionOptions()
+            if self.intra_op_threads:
+                options.intra_op_num_threads = self.intra_op_threads
+            if self.inter_op_threads:
+                options.inter_op_num_threads = self.inter_op_threads
+            runtime.session = onnxruntime.InferenceSession(
+                str(weights), options, providers=["CPUExecutionProvider"],
+            )
+        else:
+            import openvino as ov
+
+            xml = next(Path(weights).glob("*.xml"))
+            config = {"PERFORMANCE_HINT": "LATENCY"}
+            if self.intra_op_threads:
+                config["INFERENCE_NUM_THREADS"] = self.intra_op_threads
+            core = ov.Core()
+            runtime.ov_compiled_model = core.compile_model(core.read_model(xml), "CPU", config)
+
+
+def _file_digest(path: Path) -> str:
+    """Short content hash: exports are invalidated when the weights change."""
+    digest = hashlib.blake2b(digest_size=4)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# ── Process-wide default ──────────────────────────────────────────────────────
+# YOLODetector and SurgicalClassifier load their models through this loader;
+# main.py / realtime.py configure it at startup.
+
+_default_loader = ModelLoader()
+
+
+def configure_backend(
+    backend: str = "torch",
+    intra_op_threads: int | None = None,
+    inter_op_threads: int | None = None,
+    precision: str = "fp32",
+) -> ModelLoader:
+    """Set the backend used by load_model() for models loaded from now on."""
+    global _default_loader
+    _default_loader = ModelLoader(backend, intra_op_threads, inter_op_threads, precision=precision)
+    return _default_loader
+
+
+def get_loader() -> ModelLoader:
+    return _default_loader
+
+
+def load_model(weights: str | Path, task: str | None = None, imgsz: int = 640) -> YOLO:
+    """Load weights through the configured default backend."""
+    return _default_loader.load(weights, task=task, imgsz=imgsz)
+
+
+def default_intra_op_threads(workers: int) -> int:
+    """Fair share of cores per concurrent inference worker (same split as torch)."""
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
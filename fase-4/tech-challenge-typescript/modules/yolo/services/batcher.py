@@ -0,0 +1,124 @@
+"""
+Dynamic micro-batching for single-frame requests.
+
+Realtime clients poll /detect/frame at ~10 fps each; running one forward pass
+per request wastes most of the model's batch throughput. MicroBatcher queues
+incoming frames, closes a batch when it reaches max_batch_size or when the
+oldest frame has waited max_wait_ms, runs the batch once on the inference
+executor and fans the per-frame results back out to the awaiting requests.
+"""
+import asyncio
+from typing import Any, Callable
+
+import numpy as np
+
+from services.executor import InferenceExecutor
+
+
+class MicroBatcher:
+    """
+    Usage:
+        batcher = MicroBatcher(run_batch, executor, max_batch_size=8, max_wait_ms=10)
+        result = await batcher.submit(frame, 3)   # result = run_batch([... frame ...], [... 3 ...])[i]
+
+    run_batch receives a list of frames and the position of each frame in its
+    own stream (frames of a batch come from unrelated requests), and must
+    return one result per frame, in order. It runs on an executor thread.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[list[np.ndarray], list[int]], list[Any]],
+        executor: InferenceExecutor,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+    ):
+        self._run_batch = run_batch
+        self._executor = executor
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue: asyncio.Queue | None = None
+        self._collector: asyncio.Task | None = None
+        self._inflight: set[asyncio.Task] = set()
+
+        self.batches_run = 0
+        self.frames_run = 0
+
+    async def submit(self, frame: np.ndarray, frame_index: int = 0) -> Any:
+        """Queue a frame (at position frame_index of its stream) for the next batch and wait for its result."""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((frame, frame_index, future))
+        return await future
+
+    def stats(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "batches_run": self.batches_run,
+            "avg_batch_size": round(self.frames_run / self.batches_run, 2) if self.batches_run else 0.0,
+        }
+
+    async def close(self):
+        """Stop collecting and wait for in-flight batches to finish."""
+        if self._collector is not None:
+            self._collector.cancel()
+            try:
+                await self._collector
+            except asyncio.CancelledError:
+                pass
+            self._collector = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    # ── Internals ─────────────────────────────────────────────────────────
+
+    def _ensure_started(self):
+        # Created lazily so the queue and task bind to the server's running loop
+        if self._collector is None:
+            self._queue = asyncio.Queue()
+            self._collector = asyncio.create_task(self._collect())
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Dispatch without waiting, so the next batch can be collected while
+            # this one runs on another executor worker.
+            task = asyncio.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch: list[tuple[np.ndarray, int, asyncio.Future]]):
+        # Requests whose client already went away don't need inference
+        batch = [(frame, index, fut) for frame, index, fut in batch if not fut.done()]
+        if not batch:
+            return
+
+        try:
+            results = await self._executor.run(
+                self._run_batch, [frame for frame, _, _ in batch], [index for _, index, _ in batch],
+            )
+        except Exception as exc:
+            for _, _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(exc)
+            return
+
+        self.batches_run += 1
+        self.frames_run += len(batch)
+        for (_, _, fut), result in zip(batch, results):
+            if not fut.done():
+                fut.set_result(result)
@@ -1,8 +1,13 @@
 """
 Clinical signal analyzers — context-specific posture analysis.
 
-Accepts keypoints in the API dict format: [{name, x, y, confidence}]
-Returns serializable dicts consumed by both realtime.py and the web frontend.
+The signal engine works on keypoint tensors: every *_signals() function takes
+a (..., 17, 3) x, y, confidence array — one person (17, 3), the people of a
+frame (N, 17, 3, e.g. PoseArray.data) or several frames (F, N, 17, 3) — and
+computes each indicator for all of them at once, returning arrays shaped like
+the leading dimensions. realtime.py builds its overlays from those arrays;
+analyze_*() turn them into the serializable per-person dicts consumed by the
+web frontend.
 
 Contexts:
   consultation   → non-verbal discomfort / fear signals
@@ -10,29 +15,80 @@ Contexts:
   violence       → body language indicators of abuse / violence
 """
 
-import math
-from typing import TypeAlias
+import numpy as np
 
-KeypointDict: TypeAlias = dict  # {name: str, x: float, y: float, confidence: float}
+from services.poses import KEYPOINT_INDEX, VISIBLE_CONFIDENCE
+
+CONSULTATION_LEVELS = ("Neutro", "Observação", "Atenção", "Desconforto", "Alerta")
+RECOVERY_LABELS = ("Adequado", "Observar", "Compensação", "Limitado")
+VIOLENCE_RISK_LABELS = ("Neutro", "Observação", "Atenção", "Suspeita moderada", "Suspeita alta")
 
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
 
-def _visible(kp: KeypointDict | None) -> bool:
-    return kp is not None and kp["confidence"] > 0.30 and (kp["x"] > 0 or kp["y"] > 0)
+class _Joints:
+    """Per-keypoint x, y and visibility arrays of a (..., 17, 3) tensor, by name."""
+
+    def __init__(self, keypoints: np.ndarray):
+        kps = np.asarray(keypoints, dtype=np.float64)
+        self.x = kps[..., 0]
+        self.y = kps[..., 1]
+        self.visible = (kps[..., 2] > VISIBLE_CONFIDENCE) & ((self.x > 0) | (self.y > 0))
+
+    def __call__(self, name: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        i = KEYPOINT_INDEX[name]
+        return self.x[..., i], self.y[..., i], self.visible[..., i]
+
+
+def _arms_crossed(j: _Joints) -> np.ndarray:
+    """Elbows horizontally close (<12% of the larger elbow x)."""
+    lex, _, le = j("left_elbow")
+    rex, _, re = j("right_elbow")
+    return le & re & (np.abs(lex - rex) / np.maximum(np.maximum(lex, rex), 1) < 0.12)
+
+
+def _wrist_near_face(j: _Joints) -> np.ndarray:
+    """Either wrist within 80 px of the nose."""
+    nx, ny, nose = j("nose")
+    near = np.zeros_like(nose)
+    for side in ("left_wrist", "right_wrist"):
+        wx, wy, w = j(side)
+        near |= w & (np.hypot(wx - nx, wy - ny) < 80)
+    return near & nose
+
+
+def _shoulder_raised(j: _Joints) -> np.ndarray:
+    """Shoulder average y above the nose line (tension / cowering)."""
+    _, lsy, ls = j("left_shoulder")
+    _, rsy, rs = j("right_shoulder")
+    _, ny, nose = j("nose")
+    return ls & rs & nose & ((lsy + rsy) / 2 < ny * 0.93)
 
 
-def _kp_map(keypoints: list[KeypointDict]) -> dict[str, KeypointDict]:
-    return {kp["name"]: kp for kp in keypoints if _visible(kp)}
+def _head_offset(j: _Joints) -> tuple[np.ndarray, np.ndarray]:
+    """(|nose x − shoulder midpoint x|, valid mask)."""
+    lsx, _, ls = j("left_shoulder")
+    rsx, _, rs = j("right_shoulder")
+    nx, _, nose = j("nose")
+    return np.abs(nx - (lsx + rsx) / 2), ls & rs & nose
 
 
-def _dist(a: KeypointDict, b: KeypointDict) -> float:
-    return math.hypot(a["x"] - b["x"], a["y"] - b["y"])
+def _tilt_deg(j: _Joints, left: str, right: str) -> np.ndarray:
+    """|angle| of the left→right segment in degrees (0 = horizontal), 0 when not visible."""
+    lx, ly, lv = j(left)
+    rx, ry, rv = j(right)
+    return np.where(lv & rv, np.abs(np.degrees(np.arctan2(ry - ly, rx - lx))), 0.0)
+
+
+def _records(fields: dict[str, np.ndarray]) -> list[dict]:
+    """Per-person dicts from same-shaped field arrays (leading dimensions flattened)."""
+    columns = [np.asarray(values).reshape(-1).tolist() for values in fields.values()]
+    return [dict(zip(fields, row)) for row in zip(*columns)]
 
 
 # ── Consultation ──────────────────────────────────────────────────────────────
 
-def analyze_consultation(keypoints: list[KeypointDict]) -> dict:
+def consultation_signals(keypoints: np.ndarray) -> dict[str, np.ndarray]:
     """
     Identifies non-verbal discomfort/fear signals in a medical consultation.
 
@@ -43,46 +99,23 @@ def analyze_consultation(keypoints: list[KeypointDict]) -> dict:
     - Shoulders raised: shoulder avg y above nose line (tension)
     - Body contracted: torso height shorter than shoulder width * 0.9
     """
-    m = _kp_map(keypoints)
-    nose = m.get("nose")
-    ls   = m.get("left_shoulder");  rs = m.get("right_shoulder")
-    le   = m.get("left_elbow");     re = m.get("right_elbow")
-    lw   = m.get("left_wrist");     rw = m.get("right_wrist")
-    lh   = m.get("left_hip");       rh = m.get("right_hip")
-
-    eye_avoidance = bool(
-        nose and ls and rs
-        and abs(nose["x"] - (ls["x"] + rs["x"]) / 2) > 70
-    )
-    arms_crossed = bool(
-        le and re
-        and abs(le["x"] - re["x"]) / max(le["x"], re["x"], 1) < 0.12
-    )
-    wrist_near_face = any(
-        _visible(w) and nose and _dist(w, nose) < 80
-        for w in [lw, rw] if w
-    )
-    shoulder_raised = bool(
-        ls and rs and nose
-        and (ls["y"] + rs["y"]) / 2 < nose["y"] * 0.93
-    )
-    body_contracted = False
-    if ls and rs and lh and rh:
-        sh_w  = abs(ls["x"] - rs["x"])
-        torso = ((lh["y"] + rh["y"]) / 2) - ((ls["y"] + rs["y"]) / 2)
-        body_contracted = sh_w > 0 and torso < sh_w * 0.9
-
-    score = sum([eye_avoidance, arms_crossed, wrist_near_face,
-                 shoulder_raised, body_contracted])
-
-    level = (
-        "Neutro"      if score == 0 else
-        "Observação"  if score == 1 else
-        "Atenção"     if score == 2 else
-        "Desconforto" if score == 3 else
-        "Alerta"
-    )
-
+    j = _Joints(keypoints)
+    offset, head_valid = _head_offset(j)
+    eye_avoidance = head_valid & (offset > 70)
+    arms_crossed = _arms_crossed(j)
+    wrist_near_face = _wrist_near_face(j)
+    shoulder_raised = _shoulder_raised(j)
+
+    lsx, lsy, ls = j("left_shoulder")
+    rsx, rsy, rs = j("right_shoulder")
+    _, lhy, lh = j("left_hip")
+    _, rhy, rh = j("right_hip")
+    sh_w = np.abs(lsx - rsx)
+    torso = (lhy + rhy) / 2 - (lsy + rsy) / 2
+    body_contracted = ls & rs & lh & rh & (sh_w > 0) & (torso < sh_w * 0.9)
+
+    score = (eye_avoidance.astype(np.int64) + arms_crossed + wrist_near_face
+             + shoulder_raised + body_contracted)
     return {
         "eye_avoidance":    eye_avoidance,
         "arms_crossed":     arms_crossed,
@@ -90,13 +123,21 @@ def analyze_consultation(keypoints: list[KeypointDict]) -> dict:
         "shoulder_raised":  shoulder_raised,
         "body_contracted":  body_contracted,
         "discomfort_score": score,
-        "level":            level,
     }
 
 
+def analyze_consultation(keypoints: np.ndarray) -> list[dict]:
+    """consultation_signals() as one serializable dict per person."""
+    sig = consultation_signals(keypoints)
+    return _records({
+        **sig,
+        "level": np.asarray(CONSULTATION_LEVELS)[np.minimum(sig["discomfort_score"], 4)],
+    })
+
+
 # ── Physiotherapy ─────────────────────────────────────────────────────────────
 
-def analyze_physiotherapy(keypoints: list[KeypointDict]) -> dict:
+def physiotherapy_signals(keypoints: np.ndarray) -> dict[str, np.ndarray]:
     """
     Evaluates movement quality for post-partum physiotherapy rehabilitation.
 
@@ -107,72 +148,80 @@ def analyze_physiotherapy(keypoints: list[KeypointDict]) -> dict:
     - Trunk lean (degrees from vertical)
     - Lower limb activity: knee or ankle visible and elevated
     """
-    m  = _kp_map(keypoints)
-    ls = m.get("left_shoulder");  rs = m.get("right_shoulder")
-    lw = m.get("left_wrist");     rw = m.get("right_wrist")
-    lh = m.get("left_hip");       rh = m.get("right_hip")
-    lk = m.get("left_knee");      rk = m.get("right_knee")
-    la = m.get("left_ankle");     ra = m.get("right_ankle")
-
-    left_rom  = (
-        min(1.0, max(0.0, ls["y"] - lw["y"]) / max(ls["y"], 1))
-        if lw and ls and ls["y"] > 0 else 0.0
-    )
-    right_rom = (
-        min(1.0, max(0.0, rs["y"] - rw["y"]) / max(rs["y"], 1))
-        if rw and rs and rs["y"] > 0 else 0.0
+    j = _Joints(keypoints)
+    lsx, lsy, ls = j("left_shoulder")
+    rsx, rsy, rs = j("right_shoulder")
+    _, lwy, lw = j("left_wrist")
+    _, rwy, rw = j("right_wrist")
+    lhx, lhy, lh = j("left_hip")
+    rhx, rhy, rh = j("right_hip")
+
+    def rom(wrist_y, wrist, shoulder_y, shoulder):
+        elevation = np.minimum(1.0, np.maximum(0.0, shoulder_y - wrist_y) / np.maximum(shoulder_y, 1))
+        return np.where(wrist & shoulder & (shoulder_y > 0), elevation, 0.0)
+
+    left_rom = rom(lwy, lw, lsy, ls)
+    right_rom = rom(rwy, rw, rsy, rs)
+
+    both_arms = lw & rw & (ls | rs)
+    diff = np.abs(left_rom - right_rom)
+    arm_symmetry = np.where(
+        both_arms,
+        np.maximum(0.0, 1.0 - diff / np.maximum(np.maximum(left_rom, right_rom), 0.01)),
+        1.0,
     )
+    compensation = both_arms & (diff > 0.30)
+
+    shoulder_tilt = _tilt_deg(j, "left_shoulder", "right_shoulder")
+    hip_tilt = _tilt_deg(j, "left_hip", "right_hip")
 
-    arm_symmetry = 1.0
-    compensation = False
-    if lw and rw and (ls or rs):
-        diff = abs(left_rom - right_rom)
-        arm_symmetry = max(0.0, 1.0 - diff / max(max(left_rom, right_rom), 0.01))
-        compensation = diff > 0.30
-
-    shoulder_tilt = 0.0
-    if ls and rs:
-        shoulder_tilt = abs(math.degrees(math.atan2(rs["y"] - ls["y"], rs["x"] - ls["x"])))
-
-    hip_tilt = 0.0
-    if lh and rh:
-        hip_tilt = abs(math.degrees(math.atan2(rh["y"] - lh["y"], rh["x"] - lh["x"])))
-
-    trunk_lean = 0.0
-    if ls and rs and lh and rh:
-        ms_x = (ls["x"] + rs["x"]) / 2; ms_y = (ls["y"] + rs["y"]) / 2
-        mh_x = (lh["x"] + rh["x"]) / 2; mh_y = (lh["y"] + rh["y"]) / 2
-        trunk_lean = abs(math.degrees(math.atan2(ms_x - mh_x, max(mh_y - ms_y, 1))))
-
-    lower_limb_active = any(_visible(j) for j in [lk, rk, la, ra] if j)
-
-    issues = sum([compensation, shoulder_tilt > 10, hip_tilt > 10, trunk_lean > 15])
-    no_data = not (ls or rs or lw or rw)
-
-    recovery_label = (
-        "Sem dados"   if no_data   else
-        "Adequado"    if issues == 0 else
-        "Observar"    if issues == 1 else
-        "Compensação" if issues == 2 else
-        "Limitado"
+    torso_dx = (lsx + rsx) / 2 - (lhx + rhx) / 2
+    torso_dy = (lhy + rhy) / 2 - (lsy + rsy) / 2
+    trunk_lean = np.where(
+        ls & rs & lh & rh,
+        np.abs(np.degrees(np.arctan2(torso_dx, np.maximum(torso_dy, 1)))),
+        0.0,
     )
 
+    lower_limb_active = j.visible[..., [KEYPOINT_INDEX[name] for name in (
+        "left_knee", "right_knee", "left_ankle", "right_ankle")]].any(axis=-1)
+
+    issues = (compensation.astype(np.int64) + (shoulder_tilt > 10)
+              + (hip_tilt > 10) + (trunk_lean > 15))
     return {
-        "left_rom":          round(left_rom, 3),
-        "right_rom":         round(right_rom, 3),
-        "arm_symmetry":      round(arm_symmetry, 3),
-        "shoulder_tilt_deg": round(shoulder_tilt, 1),
-        "hip_tilt_deg":      round(hip_tilt, 1),
-        "trunk_lean_deg":    round(trunk_lean, 1),
+        "left_rom":          left_rom,
+        "right_rom":         right_rom,
+        "arm_symmetry":      arm_symmetry,
+        "shoulder_tilt_deg": shoulder_tilt,
+        "hip_tilt_deg":      hip_tilt,
+        "trunk_lean_deg":    trunk_lean,
         "lower_limb_active": lower_limb_active,
         "compensation":      compensation,
-        "recovery_label":    recovery_label,
+        "issues":            issues,
+        "no_data":           ~(ls | rs | lw | rw),
     }
 
 
+def analyze_physiotherapy(keypoints: np.ndarray) -> list[dict]:
+    """physiotherapy_signals() as one serializable dict per person."""
+    sig = physiotherapy_signals(keypoints)
+    labels = np.asarray(RECOVERY_LABELS)[np.minimum(sig["issues"], 3)]
+    return _records({
+        "left_rom":          np.round(sig["left_rom"], 3),
+        "right_rom":         np.round(sig["right_rom"], 3),
+        "arm_symmetry":      np.round(sig["arm_symmetry"], 3),
+        "shoulder_tilt_deg": np.round(sig["shoulder_tilt_deg"], 1),
+        "hip_tilt_deg":      np.round(sig["hip_tilt_deg"], 1),
+        "trunk_lean_deg":    np.round(sig["trunk_lean_deg"], 1),
+        "lower_limb_active": sig["lower_limb_active"],
+        "compensation":      sig["compensation"],
+        "recovery_label":    np.where(sig["no_data"], "Sem dados", labels),
+    })
+
+
 # ── Violence screening ────────────────────────────────────────────────────────
 
-def analyze_violence(keypoints: list[KeypointDict]) -> dict:
+def violence_signals(keypoints: np.ndarray) -> dict[str, np.ndarray]:
     """
     Detects body language indicators associated with domestic abuse / violence.
 
@@ -183,49 +232,27 @@ def analyze_violence(keypoints: list[KeypointDict]) -> dict:
     - Body contracted / collapsed
     - Head avoidance: nose strongly offset from shoulder midpoint (>80 px)
     """
-    m    = _kp_map(keypoints)
-    nose = m.get("nose")
-    ls   = m.get("left_shoulder");  rs = m.get("right_shoulder")
-    le   = m.get("left_elbow");     re = m.get("right_elbow")
-    lw   = m.get("left_wrist");     rw = m.get("right_wrist")
-    lh   = m.get("left_hip");       rh = m.get("right_hip")
-
-    arms_crossed = bool(
-        le and re
-        and abs(le["x"] - re["x"]) / max(le["x"], re["x"], 1) < 0.12
-    )
-    wrist_near_face = any(
-        _visible(w) and nose and _dist(w, nose) < 80
-        for w in [lw, rw] if w
-    )
-    shoulder_raised = bool(
-        ls and rs and nose
-        and (ls["y"] + rs["y"]) / 2 < nose["y"] * 0.93
-    )
-    body_contracted = False
-    if ls and rs and lh and rh:
-        sh_w  = abs(ls["x"] - rs["x"])
-        hip_w = abs(lh["x"] - rh["x"])
-        torso = abs(((lh["y"] + rh["y"]) / 2) - ((ls["y"] + rs["y"]) / 2))
-        body_contracted = sh_w > 0 and (
-            hip_w / max(sh_w, 1) < 0.65 or torso < sh_w * 0.80
-        )
-    head_avoidance = bool(
-        nose and ls and rs
-        and abs(nose["x"] - (ls["x"] + rs["x"]) / 2) > 80
+    j = _Joints(keypoints)
+    arms_crossed = _arms_crossed(j)
+    wrist_near_face = _wrist_near_face(j)
+    shoulder_raised = _shoulder_raised(j)
+
+    lsx, lsy, ls = j("left_shoulder")
+    rsx, rsy, rs = j("right_shoulder")
+    lhx, lhy, lh = j("left_hip")
+    rhx, rhy, rh = j("right_hip")
+    sh_w = np.abs(lsx - rsx)
+    hip_w = np.abs(lhx - rhx)
+    torso = np.abs((lhy + rhy) / 2 - (lsy + rsy) / 2)
+    body_contracted = ls & rs & lh & rh & (sh_w > 0) & (
+        (hip_w / np.maximum(sh_w, 1) < 0.65) | (torso < sh_w * 0.80)
     )
 
-    score = sum([arms_crossed, wrist_near_face, shoulder_raised,
-                 body_contracted, head_avoidance])
-
-    risk_label = (
-        "Neutro"            if score == 0 else
-        "Observação"        if score == 1 else
-        "Atenção"           if score == 2 else
-        "Suspeita moderada" if score == 3 else
-        "Suspeita alta"
-    )
+    offset, head_valid = _head_offset(j)
+    head_avoidance = head_valid & (offset > 80)
 
+    score = (arms_crossed.astype(np.int64) + wrist_near_face + shoulder_raised
+             + body_contracted + head_avoidance)
     return {
         "arms_crossed":     arms_crossed,
         "wrist_near_face":  wrist_near_face,
@@ -233,18 +260,35 @@ def analyze_violence(keypoints: list[KeypointDict]) -> dict:
         "body_contracted":  body_contracted,
         "head_avoidance":   head_avoidance,
         "risk_score":       score,
-        "risk_label":       risk_label,
     }
 
 
+def analyze_violence(keypoints: np.ndarray) -> list[dict]:
+    """violence_signals() as one serializable dict per person."""
+    sig = violence_signals(keypoints)
+    return _records({
+        **sig,
+        "risk_label": np.asarray(VIOLENCE_RISK_LABELS)[np.minimum(sig["risk_score"], 4)],
+    })
+
+
 # ── Dispatcher ────────────────────────────────────────────────────────────────
 
-def analyze_for_context(keypoints: list[KeypointDict], context: str) -> dict | None:
-    """Return the appropriate clinical signals dict for the given context, or None."""
-    if context == "consultation":
-        return analyze_consultation(keypoints)
-    if context == "physiotherapy":
-        return analyze_physiotherapy(keypoints)
-    if context in ("violence", "violence_screening"):
-        return analyze_violence(keypoints)
-    return None
+_ANALYZERS = {
+    "consultation":       analyze_consultation,
+    "physiotherapy":      analyze_physiotherapy,
+    "violence":           analyze_violence,
+    "violence_screening": analyze_violence,
+}
+
+
+def analyze_for_context(keypoints: np.ndarray, context: str) -> list[dict | None]:
+    """
+    Clinical signals dict of every person in `keypoints` ((..., 17, 3), leading
+    dimensions flattened) for the given context; None per person when the
+    context has no pose-based signals (e.g. surgery).
+    """
+    analyzer = _ANALYZERS.get(context)
+    if analyzer is None:
+        return [None] * int(np.prod(np.shape(keypoints)[:-2]))
+    return analyzer(keypoints)
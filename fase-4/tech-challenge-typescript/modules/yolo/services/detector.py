@@ -6,20 +6,43 @@ When the custom surgical classifier is available (assets/models/surgical_classif
 detections of COCO classes that may correspond to surgical instruments (knife, scissors)
 are enriched with the specific instrument label from the custom model.
 Full-frame classification is also run on every frame to catch instruments that COCO misses.
+
+Models are loaded once per thread: ultralytics predictors keep per-call state
+and must not be shared by concurrent inference threads (see services/executor.py).
+They are loaded through services/backends.py (PyTorch, ONNX Runtime or OpenVINO).
+
+Inference modes (detect_batch):
+  dual     → both models on every frame (person boxes from the object model)
+  unified  → pose model on every frame; person detections are taken from its
+             boxes, and the object model only runs on every `object_every`-th
+             frame of a stream (by the frame's position in its own request,
+             video or session, so concurrent clients don't shift each other's
+             cadence) or when the caller asks for objects (e.g. surgery hint).
+             Roughly halves the per-frame cost on CPU.
+  crops    → object model on every frame; the pose model only runs on a
+             padded crop of each person it found (all crops of a batch in
+             shared forward passes, at the small pose_crop_imgsz), and not at
+             all on frames without people. Poses line up with the person
+             detections by index (a person whose crop yields no pose gets a
+             zero-confidence one). Cheapest when most frames have few or no
+             people (surgical close-ups, empty rooms).
+
+Input resolution: every forward pass letterboxes frames to `imgsz` (the
+detector default, or per call). detect_batch() can also run the pose model on
+a crop of each frame (pose_rois, see services/resolution.py); keypoints and
+pose boxes are mapped back to frame coordinates.
 """
 import os
+import threading
+
 import numpy as np
 import cv2
 from ultralytics import YOLO
+from services.backends import load_model
 from services.surgical_classifier import get_classifier
-
-# YOLOv8-pose COCO keypoint names (17 keypoints)
-KEYPOINT_NAMES = [
-    "nose", "left_eye", "right_eye", "left_ear", "right_ear",
-    "left_shoulder", "right_shoulder", "left_elbow", "right_elbow",
-    "left_wrist", "right_wrist", "left_hip", "right_hip",
-    "left_knee", "right_knee", "left_ankle", "right_ankle",
-]
+from services.sampler import FrameSampler, SamplingStats
+from services.poses import KEYPOINT_NAMES, Keypoint, PoseArray
+from services.tracker import iou_matrix
 
 # COCO class IDs relevant for clinical context
 CLINICAL_RELEVANT_CLASSES = {
@@ -36,45 +59,172 @@ CLINICAL_RELEVANT_CLASSES = {
 }
 
 
+INFERENCE_MODES = ("dual", "unified", "crops")
+
+
 class YOLODetector:
-    def __init__(self):
-        self._detection_model: YOLO | None = None
-        self._pose_model: YOLO | None = None
+    def __init__(
+        self,
+        max_batch_size: int = 8,
+        sampler: FrameSampler | None = None,
+        inference_mode: str = "dual",
+        object_every: int = 3,
+        imgsz: int = 640,
+        pose_crop_imgsz: int = 256,
+        pose_crop_padding: float = 0.2,
+    ):
+        if inference_mode not in INFERENCE_MODES:
+            raise ValueError(f"inference_mode deve ser um de {INFERENCE_MODES}: {inference_mode!r}")
+        self._local = threading.local()   # per-thread detection_model / pose_model
+        # Upper bound of frames pushed through a model in a single forward pass
+        self.max_batch_size = max(1, max_batch_size)
+        self.sampler = sampler or FrameSampler()
+        self.inference_mode = inference_mode
+        # unified mode: object model on 1 of every `object_every` frames
+        self.object_every = max(1, object_every)
+        # Model input size when the caller doesn't ask for another one
+        self.imgsz = imgsz
+        # crops mode: pose model input size per person crop, and the margin
+        # added around each person box (fraction of its size)
+        self.pose_crop_imgsz = pose_crop_imgsz
+        self.pose_crop_padding = pose_crop_padding
 
     @property
     def detection_model(self) -> YOLO:
-        if self._detection_model is None:
-            self._detection_model = YOLO("yolov8n.pt")
-        return self._detection_model
+        model = getattr(self._local, "detection_model", None)
+        if model is None:
+            model = self._local.detection_model = load_model("yolov8n.pt", task="detect")
+        return model
 
     @property
     def pose_model(self) -> YOLO:
-        if self._pose_model is None:
-            self._pose_model = YOLO("yolov8n-pose.pt")
-        return self._pose_model
+        model = getattr(self._local, "pose_model", None)
+        if model is None:
+            model = self._local.pose_model = load_model("yolov8n-pose.pt", task="pose")
+        return model
+
+    def warmup(
+        self,
+        frame_size: tuple[int, int] = (1280, 720),
+        batch_sizes: tuple[int, ...] = (1,),
+        imgsizes: tuple[int, ...] = (),
+    ):
+        """
+        Load the calling thread's models (and surgical classifier) and run
+        dummy forward passes at each batch size (and each input size, default
+        self.imgsz), so that the first real request on this thread does not
+        pay for weight loading, runtime initialisation and buffer allocation.
+        frame_size is (width, height).
+        """
+        width, height = frame_size
+        frame = np.full((height, width, 3), 114, dtype=np.uint8)
+        for imgsz in imgsizes or (self.imgsz,):
+            for batch in batch_sizes:
+                # need_objects: every model runs, and the unified cadence is not advanced
+                self.detect_batch([frame] * batch, need_objects=True, imgsz=imgsz)
+        if self.inference_mode == "crops":
+            # The blank frame has no people: warm the pose model on crops directly
+            crop = frame[: height // 2, : width // 4]
+            for batch in batch_sizes:
+                self._predict(self.pose_model, [crop] * batch, self.pose_crop_imgsz)
 
     def extract_frames(self, video_path: str, num_frames: int = 8) -> list[np.ndarray]:
         """Extract evenly-spaced frames from a video file."""
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            raise ValueError(f"Cannot open video: {video_path}")
+        return self.sample_frames(video_path, num_frames)[0]
 
-        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        indices = np.linspace(0, max(total - 1, 0), num_frames, dtype=int)
+    def sample_frames(self, video_path: str, num_frames: int = 8) -> tuple[list[np.ndarray], SamplingStats]:
+        """Like extract_frames(), also returning the sampler strategy and decode timings."""
+        return self.sampler.sample(video_path, num_frames)
 
-        frames: list[np.ndarray] = []
-        for idx in indices:
-            cap.set(cv2.CAP_PROP_POS_FRAMES, int(idx))
-            ret, frame = cap.read()
-            if ret:
-                frames.append(frame)
+    def iter_frames(self, video_path: str, stride: int = 15):
+        """Stream (frame_index, frame, scene_change) over the whole video (see FrameSampler.iter_frames)."""
+        return self.sampler.iter_frames(video_path, stride=stride)
 
-        cap.release()
-        return frames
+    def _predict(self, model: YOLO, frames: list[np.ndarray], imgsz: int | None = None) -> list:
+        """
+        Run a model over a list of frames, at most max_batch_size frames per
+        forward pass, at input size imgsz (default self.imgsz). Returns one
+        ultralytics Result per input frame, in order.
+        """
+        results: list = []
+        for start in range(0, len(frames), self.max_batch_size):
+            chunk = frames[start:start + self.max_batch_size]
+            results.extend(model(chunk, verbose=False, imgsz=imgsz or self.imgsz))
+        return results
 
     # COCO classes that may overlap with surgical instruments
     _SURGICAL_COCO_IDS = {43, 76}  # knife, scissors
 
+    def detect_batch(
+        self,
+        frames: list[np.ndarray],
+        need_objects: bool = False,
+        imgsz: int | None = None,
+        pose_rois: list[tuple[int, int, int, int] | None] | None = None,
+        frame_indices: list[int] | None = None,
+    ) -> list[tuple[list[dict], PoseArray]]:
+        """
+        Detections and poses for a batch of frames, as one (detections, poses)
+        pair per frame, following self.inference_mode.
+
+        In unified mode, person detections come from the pose model (so they
+        line up with the poses by index) and the remaining COCO classes are
+        only present on frames where the object model ran (see runs_objects()).
+        frame_indices gives each frame's position in its stream (request,
+        video, websocket session); default 0, 1, ... within this call.
+
+        In crops mode the pose model only runs on the people found by the
+        object model (see detect_poses_in_boxes()).
+
+        imgsz overrides the model input size for this call. pose_rois gives,
+        per frame, an (x1, y1, x2, y2) crop for the pose model (None = whole
+        frame; ignored in crops mode); the object model always sees the whole
+        frame.
+        """
+        if not frames:
+            return []
+
+        if self.inference_mode == "crops":
+            detections = self.detect_objects_batch(frames, imgsz=imgsz)
+            person_boxes = [
+                [(d["x1"], d["y1"], d["x2"], d["y2"]) for d in frame_dets if d["class_id"] == 0]
+                for frame_dets in detections
+            ]
+            return list(zip(detections, self.detect_poses_in_boxes(frames, person_boxes)))
+
+        if self.inference_mode == "dual":
+            return list(zip(
+                self.detect_objects_batch(frames, imgsz=imgsz),
+                self.detect_poses_batch(frames, imgsz=imgsz, rois=pose_rois),
+            ))
+
+        crops, offsets = _crop_rois(frames, pose_rois)
+        pose_results = self._predict(self.pose_model, crops, imgsz)
+        poses = [self._poses_from_result(result, offset) for result, offset in zip(pose_results, offsets)]
+        persons = [self._persons_from_result(result, offset) for result, offset in zip(pose_results, offsets)]
+
+        if frame_indices is None:
+            frame_indices = range(len(frames))
+        objects: list[list[dict]] = [[] for _ in frames]
+        object_idx = [i for i, index in enumerate(frame_indices) if self.runs_objects(index, need_objects)]
+        if object_idx:
+            object_frames = [frames[i] for i in object_idx]
+            results = self._predict(self.detection_model, object_frames, imgsz)
+            clf = get_classifier()
+            for i, frame, result in zip(object_idx, object_frames, results):
+                objects[i] = self._objects_from_result(frame, result, clf, include_persons=False)
+
+        return [(persons[i] + objects[i], poses[i]) for i in range(len(frames))]
+
+    def runs_objects(self, frame_index: int, need_objects: bool = False) -> bool:
+        """
+        Whether detect_batch() runs the object model on the frame at this
+        position of its stream: always, except in unified mode, where only
+        every object_every-th frame (starting with the first) gets it unless
+        need_objects is set.
+        """
+        return self.inference_mode != "unified" or need_objects or frame_index % self.object_every == 0
+
     def detect_objects(self, frame: np.ndarray) -> list[dict]:
         """
         Run YOLOv8 object detection and enrich surgical detections with
@@ -88,43 +238,48 @@ class YOLODetector:
         Additionally, a full-frame classification is run once per call to
         catch instruments that COCO may have missed entirely.
         """
-        results = self.detection_model(frame, verbose=False)
-        detections: list[dict] = []
+        return self.detect_objects_batch([frame])[0]
+
+    def detect_objects_batch(self, frames: list[np.ndarray], imgsz: int | None = None) -> list[list[dict]]:
+        """
+        Batched variant of detect_objects(): all frames go through the
+        detection model in forward passes of up to max_batch_size frames.
+
+        Returns one detection list per input frame, in order.
+        """
+        if not frames:
+            return []
+
+        results = self._predict(self.detection_model, frames, imgsz)
         clf = get_classifier()
+        return [self._objects_from_result(frame, result, clf) for frame, result in zip(frames, results)]
 
-        for result in results:
-            for box in result.boxes:
-                class_id   = int(box.cls[0])
-                confidence = float(box.conf[0])
-                class_name = result.names[class_id]
-                x1, y1, x2, y2 = [round(v, 2) for v in box.xyxy[0].tolist()]
-
-                det = {
-                    "class_id":   class_id,
-                    "class_name": class_name,
-                    "confidence": confidence,
-                    "x1": x1, "y1": y1, "x2": x2, "y2": y2,
-                    # Custom classifier fields (populated below if available)
-                    "surgical_label":      None,
-                    "surgical_confidence": None,
-                    "surgical_risk":       None,
-                }
-
-                # Enrich knife/scissors detections with custom instrument label
-                if class_id in self._SURGICAL_COCO_IDS and clf.available:
-                    custom = clf.classify_region(frame, int(x1), int(y1), int(x2), int(y2))
-                    if custom:
-                        det["surgical_label"]      = custom["label"]
-                        det["surgical_confidence"] = custom["confidence"]
-                        det["surgical_risk"]        = custom["risk"]
-
-                detections.append(det)
+    def _objects_from_result(self, frame: np.ndarray, result, clf, include_persons: bool = True) -> list[dict]:
+        """
+        Convert one detection Result into detection dicts for its frame.
+        include_persons=False drops class 0 (persons taken from the pose model).
+        """
+        xyxy, conf, cls = _box_arrays(result)
+        if not include_persons:
+            keep = cls != 0
+            xyxy, conf, cls = xyxy[keep], conf[keep], cls[keep]
+        detections = _detection_dicts(xyxy, conf, cls, result.names)
+
+        # Enrich knife/scissors detections with custom instrument label —
+        # all crops of the frame go through the classifier in one batch
+        surgical = [d for d in detections if d["class_id"] in self._SURGICAL_COCO_IDS]
+        if surgical and clf.available:
+            boxes = [(int(d["x1"]), int(d["y1"]), int(d["x2"]), int(d["y2"])) for d in surgical]
+            for det, custom in zip(surgical, clf.classify_regions(frame, boxes)):
+                if custom:
+                    det["surgical_label"]      = custom["label"]
+                    det["surgical_confidence"] = custom["confidence"]
+                    det["surgical_risk"]        = custom["risk"]
 
         # ── Full-frame surgical classification ──────────────────────────────
         # Runs when no surgical COCO object was detected — catches instruments
         # that COCO misses (e.g. pinças, afastadores not in COCO vocabulary).
-        has_coco_surgical = any(d["class_id"] in self._SURGICAL_COCO_IDS for d in detections)
-        if not has_coco_surgical and clf.available:
+        if not surgical and clf.available:
             full_frame = clf.classify(frame)
             if full_frame:
                 # Inject a synthetic detection spanning the full frame
@@ -141,49 +296,199 @@ class YOLODetector:
 
         return detections
 
-    def detect_poses(self, frame: np.ndarray) -> list[dict]:
-        """Run YOLOv8-pose and return per-person keypoint data with posture label."""
-        results = self.pose_model(frame, verbose=False)
-        poses: list[dict] = []
-
-        for result in results:
-            if result.keypoints is None:
-                continue
-
-            kps_xy = result.keypoints.xy  # (N, 17, 2)
-            kps_conf = result.keypoints.conf  # (N, 17) or None
-
-            for person_id in range(len(kps_xy)):
-                xy = kps_xy[person_id].tolist()
-                conf = kps_conf[person_id].tolist() if kps_conf is not None else [1.0] * 17
-
-                keypoints = [
-                    {
-                        "name": KEYPOINT_NAMES[i],
-                        "x": round(xy[i][0], 2),
-                        "y": round(xy[i][1], 2),
-                        "confidence": round(float(conf[i]), 3),
-                    }
-                    for i in range(min(len(xy), 17))
-                ]
-
-                posture = _classify_posture(keypoints)
-                poses.append({
-                    "person_id": person_id,
-                    "keypoints": keypoints,
-                    "posture_label": posture,
-                })
+    def detect_poses(self, frame: np.ndarray) -> PoseArray:
+        """Run YOLOv8-pose and return per-person keypoints with posture labels."""
+        return self.detect_poses_batch([frame])[0]
 
-        return poses
+    def detect_poses_batch(
+        self,
+        frames: list[np.ndarray],
+        imgsz: int | None = None,
+        rois: list[tuple[int, int, int, int] | None] | None = None,
+    ) -> list[PoseArray]:
+        """
+        Batched variant of detect_poses(): all frames go through the pose
+        model in forward passes of up to max_batch_size frames.
 
+        rois optionally crops each frame (x1, y1, x2, y2) before the model;
+        keypoints are returned in frame coordinates.
 
-def _classify_posture(keypoints: list[dict]) -> str:
+        Returns one PoseArray per input frame, in order.
+        """
+        if not frames:
+            return []
+
+        crops, offsets = _crop_rois(frames, rois)
+        results = self._predict(self.pose_model, crops, imgsz)
+        return [self._poses_from_result(result, offset) for result, offset in zip(results, offsets)]
+
+    def detect_poses_in_boxes(
+        self,
+        frames: list[np.ndarray],
+        person_boxes: list[list[tuple[float, float, float, float]]],
+    ) -> list[PoseArray]:
+        """
+        Poses of already localized people: the pose model runs on a padded
+        crop of each (x1, y1, x2, y2) person box (at pose_crop_imgsz, every
+        crop of every frame in forward passes of up to max_batch_size), and
+        not at all for frames without boxes.
+
+        Returns one PoseArray per input frame, in order, with keypoints in
+        frame coordinates and one pose per box, in the order of the boxes (all
+        keypoints at zero confidence when the crop yields no matching pose,
+        so later poses still line up with their boxes).
+        """
+        crops, rois, owners = [], [], []
+        for i, (frame, boxes) in enumerate(zip(frames, person_boxes)):
+            for box, roi in zip(boxes, _person_rois(frame.shape, boxes, self.pose_crop_padding)):
+                crops.append(frame[roi[1]:roi[3], roi[0]:roi[2]])
+                rois.append((roi, box))
+                owners.append(i)
+
+        kps_by_frame: list[list[np.ndarray]] = [[] for _ in frames]
+        results = self._predict(self.pose_model, crops, self.pose_crop_imgsz) if crops else []
+        for result, (roi, box), i in zip(results, rois, owners):
+            kps = _crop_pose(result, roi[:2], box)
+            kps_by_frame[i].append(kps if kps is not None else np.zeros((17, 3), dtype=np.float32))
+        return [
+            PoseArray(np.stack(kps) if kps else None, [_classify_posture(person) for person in kps])
+            for kps in kps_by_frame
+        ]
+
+    @staticmethod
+    def _persons_from_result(result, offset: tuple[int, int] = (0, 0)) -> list[dict]:
+        """Person detection dicts from the boxes of a pose Result (one per pose, same order)."""
+        xyxy, conf, _ = _box_arrays(result)
+        if offset != (0, 0):
+            xyxy = xyxy + np.tile(offset, 2)
+        return _detection_dicts(xyxy, conf, np.zeros(len(conf), dtype=np.int64), {0: "person"})
+
+    @staticmethod
+    def _poses_from_result(result, offset: tuple[int, int] = (0, 0)) -> PoseArray:
+        """Keypoints of one pose Result (of a crop at `offset`), with a posture label per person."""
+        kps = _keypoint_array(result).astype(np.float32)   # (N, 17, 3)
+        if offset != (0, 0):
+            _offset_keypoints(kps, offset)
+        return PoseArray(kps, [_classify_posture(person) for person in kps])
+
+
+# ── Result → arrays ───────────────────────────────────────────────────────
+# Each Result is copied to NumPy once, and filtering/rounding run on whole
+# arrays; per-box tensor indexing (box.cls[0], box.xyxy[0].tolist(), ...)
+# costs more than the forward pass in crowded frames.
+
+def _box_arrays(result) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(xyxy (N, 4) float64, confidence (N,) float64, class id (N,) int64) of a Result's boxes."""
+    boxes = result.boxes
+    if boxes is None or not len(boxes):
+        return np.zeros((0, 4)), np.zeros(0), np.zeros(0, dtype=np.int64)
+    data = boxes.data.cpu().numpy().astype(np.float64)   # x1, y1, x2, y2, [track id,] conf, cls
+    return data[:, :4], data[:, -2], data[:, -1].astype(np.int64)
+
+
+def _keypoint_array(result) -> np.ndarray:
+    """(N, 17, 3) float64 x, y, confidence of a pose Result (confidence 1 when the model has none)."""
+    keypoints = result.keypoints
+    if keypoints is None or not len(keypoints):
+        return np.zeros((0, 17, 3))
+    data = keypoints.data.cpu().numpy().astype(np.float64)[:, :17]
+    if data.shape[-1] == 2:
+        data = np.concatenate([data, np.ones((*data.shape[:2], 1))], axis=-1)
+    return data
+
+
+def _offset_keypoints(kps: np.ndarray, offset: tuple[int, int]) -> np.ndarray:
+    """
+    Map (..., 17, 3) keypoints of a crop whose top-left corner is `offset`
+    back to frame coordinates, in place. Undetected keypoints stay at (0, 0).
+    """
+    detected = (kps[..., 0] > 0) | (kps[..., 1] > 0)
+    kps[..., :2] += np.where(detected[..., None], np.asarray(offset, dtype=kps.dtype), 0)
+    return kps
+
+
+def _person_rois(
+    frame_shape: tuple,
+    boxes: list[tuple[float, float, float, float]],
+    padding: float,
+) -> list[tuple[int, int, int, int]]:
+    """Integer (x1, y1, x2, y2) crops around person boxes, grown by `padding` of their size and clipped to the frame."""
+    height, width = frame_shape[:2]
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    margin = (boxes[:, 2:] - boxes[:, :2]) * padding
+    lo = np.floor(np.maximum(boxes[:, :2] - margin, 0)).astype(int)
+    hi = np.ceil(np.minimum(boxes[:, 2:] + margin, (width, height))).astype(int)
+    # At least one pixel, even for degenerate boxes
+    hi = np.maximum(hi, lo + 1)
+    return [tuple(roi) for roi in np.concatenate([lo, hi], axis=1).tolist()]
+
+
+def _crop_pose(result, offset: tuple[int, int], box: tuple[float, float, float, float],
+               min_iou: float = 0.3) -> np.ndarray | None:
+    """
+    (17, 3) float32 keypoints, in frame coordinates, of the pose in a person
+    crop's Result that overlaps the person box best: a padded crop may also
+    show parts of neighbours. None when no pose overlaps it by min_iou.
+    """
+    xyxy, _, _ = _box_arrays(result)
+    if not len(xyxy):
+        return None
+    ious = iou_matrix(xyxy + np.tile(offset, 2), [box])[:, 0]
+    best = int(np.argmax(ious))
+    if ious[best] < min_iou:
+        return None
+    kps = _keypoint_array(result)[best].astype(np.float32)
+    return _offset_keypoints(kps, offset)
+
+
+def _crop_rois(
+    frames: list[np.ndarray],
+    rois: list[tuple[int, int, int, int] | None] | None,
+) -> tuple[list[np.ndarray], list[tuple[int, int]]]:
+    """(crops, top-left offsets) of frames for optional per-frame (x1, y1, x2, y2) rois."""
+    if rois is None:
+        return frames, [(0, 0)] * len(frames)
+    crops, offsets = [], []
+    for frame, roi in zip(frames, rois):
+        if roi is None:
+            crops.append(frame)
+            offsets.append((0, 0))
+        else:
+            x1, y1, x2, y2 = roi
+            crops.append(frame[y1:y2, x1:x2])
+            offsets.append((x1, y1))
+    return crops, offsets
+
+
+def _detection_dicts(xyxy: np.ndarray, conf: np.ndarray, cls: np.ndarray, names: dict) -> list[dict]:
+    """API detection dicts from box arrays (surgical fields empty, filled in by the caller)."""
+    return [
+        {
+            "class_id":   class_id,
+            "class_name": names[class_id],
+            "confidence": confidence,
+            "x1": x1, "y1": y1, "x2": x2, "y2": y2,
+            # Custom classifier fields (populated by the caller if available)
+            "surgical_label":      None,
+            "surgical_confidence": None,
+            "surgical_risk":       None,
+        }
+        for (x1, y1, x2, y2), confidence, class_id in zip(np.round(xyxy, 2).tolist(), conf.tolist(), cls.tolist())
+    ]
+
+
+def _classify_posture(keypoints: np.ndarray) -> str:
     """
-    Heuristic posture classification based on YOLOv8-pose keypoints.
+    Heuristic posture classification based on one person's YOLOv8-pose
+    keypoints ((17, 3) x, y, confidence).
 
     Returns one of: defensive | exercise | distress | neutral
     """
-    kp_map = {kp["name"]: kp for kp in keypoints if kp["confidence"] > 0.3}
+    kp_map = {
+        name: Keypoint(name, x, y, c)
+        for name, (x, y, c) in zip(KEYPOINT_NAMES, keypoints.tolist())
+        if c > 0.3
+    }
 
     def get(name: str):
         return kp_map.get(name)
@@ -203,43 +508,43 @@ def _classify_posture(keypoints: list[dict]) -> str:
     # ── Defensive posture ─────────────────────────────────────────────────
     # Arms crossed: elbows very close horizontally
     if left_elbow and right_elbow:
-        elbow_dist = abs(left_elbow["x"] - right_elbow["x"])
-        frame_width = max(left_elbow["x"], right_elbow["x"]) or 640
+        elbow_dist = abs(left_elbow.x - right_elbow.x)
+        frame_width = max(left_elbow.x, right_elbow.x) or 640
         if elbow_dist / frame_width < 0.12:
             scores["defensive"] += 2
 
     # Hunched: shoulders raised above nose (cowering)
     if left_shoulder and right_shoulder and nose:
-        shoulder_avg_y = (left_shoulder["y"] + right_shoulder["y"]) / 2
-        if shoulder_avg_y < nose["y"] * 0.95:
+        shoulder_avg_y = (left_shoulder.y + right_shoulder.y) / 2
+        if shoulder_avg_y < nose.y * 0.95:
             scores["defensive"] += 1
 
     # Wrists near face (protecting face)
     if left_wrist and nose:
-        if abs(left_wrist["x"] - nose["x"]) < 50 and abs(left_wrist["y"] - nose["y"]) < 80:
+        if abs(left_wrist.x - nose.x) < 50 and abs(left_wrist.y - nose.y) < 80:
             scores["defensive"] += 1
     if right_wrist and nose:
-        if abs(right_wrist["x"] - nose["x"]) < 50 and abs(right_wrist["y"] - nose["y"]) < 80:
+        if abs(right_wrist.x - nose.x) < 50 and abs(right_wrist.y - nose.y) < 80:
             scores["defensive"] += 1
 
     # ── Exercise / Physiotherapy ──────────────────────────────────────────
     # Wrists raised above shoulders
-    if left_wrist and left_shoulder and left_wrist["y"] < left_shoulder["y"]:
+    if left_wrist and left_shoulder and left_wrist.y < left_shoulder.y:
         scores["exercise"] += 1
-    if right_wrist and right_shoulder and right_wrist["y"] < right_shoulder["y"]:
+    if right_wrist and right_shoulder and right_wrist.y < right_shoulder.y:
         scores["exercise"] += 1
 
     # Shoulders wide apart (arms extended)
     if left_shoulder and right_shoulder:
-        shoulder_width = abs(left_shoulder["x"] - right_shoulder["x"])
+        shoulder_width = abs(left_shoulder.x - right_shoulder.x)
         if shoulder_width > 120:
             scores["exercise"] += 1
 
     # ── Distress ──────────────────────────────────────────────────────────
     # Head tilted significantly (looking away/avoidance)
     if left_shoulder and right_shoulder and nose:
-        shoulder_mid_x = (left_shoulder["x"] + right_shoulder["x"]) / 2
-        head_offset = abs(nose["x"] - shoulder_mid_x)
+        shoulder_mid_x = (left_shoulder.x + right_shoulder.x) / 2
+        head_offset = abs(nose.x - shoulder_mid_x)
         if head_offset > 60:
             scores["distress"] += 1
 
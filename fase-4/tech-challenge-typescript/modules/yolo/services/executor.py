@@ -0,0 +1,117 @@
+"""
+Bounded executor for CPU-bound inference work.
+
+The FastAPI endpoints are async, but model inference and JPEG decode/encode
+are blocking calls. InferenceExecutor runs that work on a thread pool sized to
+the machine's cores, keeping the event loop free for concurrent pollers and
+/health, and caps how many jobs may be running or waiting at once so that
+overload surfaces as ExecutorSaturated (HTTP 503) instead of unbounded latency.
+"""
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class ExecutorSaturated(RuntimeError):
+    """Raised when the executor already holds max_workers + max_queue jobs."""
+
+
+class InferenceExecutor:
+    """
+    Thread pool with a queue-depth limit.
+
+    Usage:
+        executor = InferenceExecutor()
+        result = await executor.run(detector.detect_objects, frame)
+    """
+
+    def __init__(self, max_workers: int | None = None, max_queue: int | None = None):
+        self.max_workers = max(1, max_workers or os.cpu_count() or 1)
+        self.max_queue = max(0, max_queue if max_queue is not None else self.max_workers * 4)
+
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self._pending = 0
+        self._lock = threading.Lock()
+
+        _limit_torch_threads(self.max_workers)
+
+    @property
+    def pending(self) -> int:
+        """Jobs currently running or waiting for a worker."""
+        return self._pending
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs):
+        """
+        Submit fn to the pool and return a concurrent.futures.Future.
+        Raises ExecutorSaturated when the queue is full.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise ExecutorSaturated(
+                f"Fila de inferência cheia ({self.max_workers} workers + {self.max_queue} na fila)."
+            )
+        with self._lock:
+            self._pending += 1
+
+        try:
+            future = self._pool.submit(fn, *args, **kwargs)
+        except Exception:
+            self._release()
+            raise
+
+        # Free the slot when the job actually finishes, not when the awaiting
+        # request goes away (a cancelled request does not stop a running job).
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) on the pool and await its result."""
+        future = self.submit(functools.partial(fn, *args, **kwargs))
+        return await asyncio.wrap_future(future)
+
+    def run_on_each_worker(self, fn: Callable[[], Any]) -> list:
+        """
+        Submit fn once per worker thread (e.g. to load thread-local models)
+        and return the futures. Each call holds its thread until all of them
+        have run, so no worker picks up two of them.
+        """
+        barrier = threading.Barrier(self.max_workers)
+
+        def once():
+            try:
+                return fn()
+            finally:
+                barrier.wait()
+
+        return [self.submit(once) for _ in range(self.max_workers)]
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+        }
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+
+def _limit_torch_threads(workers: int):
+    """
+    Give each worker a fair share of cores for intra-op parallelism, so that
+    `workers` concurrent forward passes do not oversubscribe the CPU.
+    """
+    try:
+        import torch
+    except ImportError:
+        return
+    cores = os.cpu_count() or 1
+    torch.set_num_threads(max(1, cores // workers))
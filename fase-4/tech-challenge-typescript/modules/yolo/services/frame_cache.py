@@ -0,0 +1,226 @@
+"""
+Result cache for single-frame requests.
+
+Polling clients resend the same picture over and over (paused video, an idle
+exam room), and every request would rerun both models and the overlay
+encode. FrameResultCache keeps recent results keyed by the decoded frame:
+
+  exact       → SHA-1 of the pixels (+ shape): only byte-identical frames hit
+  perceptual  → 64-bit difference hash (+ shape): frames within max_distance
+                differing bits hit too (JPEG re-encoding, sensor noise)
+
+Each frame fingerprint can hold several variants (e.g. raw detections, or a
+/detect/frame response for a given analysis_type/overlay). Entries expire
+after ttl_s and the least recently used ones are evicted beyond max_entries
+or max_bytes.
+
+Perceptual lookups don't scan the whole cache: the 64 hash bits are split
+into max_distance + 1 bands, and two hashes at most max_distance bits apart
+are equal on at least one band. Entries are indexed by (band, value), so only
+entries sharing a band with the frame are compared, outside the cache lock.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+import cv2
+import numpy as np
+
+CACHE_MODES = ("off", "exact", "perceptual")
+
+
+class FrameResultCache:
+    """
+    Usage:
+        cache = FrameResultCache(max_entries=512, ttl_s=30, mode="perceptual")
+        fp = cache.fingerprint(frame)
+        result = cache.get(fp, ("detect", False))
+        if result is None:
+            result = run_models(frame)
+            cache.put(fp, ("detect", False), result, nbytes=...)
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_s: float = 30.0,
+        mode: str = "exact",
+        max_distance: int = 4,
+    ):
+        """
+        Args:
+            max_entries:  Cached results (all variants) kept at most. 0 disables the cache.
+            max_bytes:    Approximate memory cap, from the sizes given to put().
+            ttl_s:        Seconds a result stays valid.
+            mode:         off | exact | perceptual
+            max_distance: Perceptual mode: differing hash bits (of 64) still counted as the same frame.
+        """
+        if mode not in CACHE_MODES:
+            raise ValueError(f"mode deve ser um de {CACHE_MODES}: {mode!r}")
+        self.mode = mode if max_entries > 0 else "off"
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl_s
+        self.max_distance = max_distance
+
+        # (fingerprint, variant) → (value, nbytes, expires_at); oldest first
+        self._entries: OrderedDict[tuple, tuple[Any, int, float]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Perceptual mode: (shape, variant, band, band bits) → keys of the entries
+        self._bands = _hash_bands(max_distance) if self.mode == "perceptual" and max_distance > 0 else []
+        self._index: dict[tuple, set[tuple]] = {}
+
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def fingerprint(self, frame: np.ndarray) -> tuple | None:
+        """Cache key of a decoded BGR frame (None when the cache is off)."""
+        if self.mode == "exact":
+            digest = hashlib.sha1(np.ascontiguousarray(frame).data, usedforsecurity=False).digest()
+            return (frame.shape, digest)
+        if self.mode == "perceptual":
+            return (frame.shape, _dhash(frame))
+        return None
+
+    def get(self, fingerprint: tuple | None, variant: Hashable) -> Any | None:
+        """Cached value for this frame and variant, or None."""
+        if fingerprint is None:
+            return None
+        key = (fingerprint, variant)
+        near = False
+        if self._bands:
+            with self._lock:
+                candidates = [] if key in self._entries else self._candidates(fingerprint, variant)
+            if candidates:
+                # Distances outside the lock, over the band-sharing entries only
+                near_key = _nearest(fingerprint, candidates, self.max_distance)
+                if near_key is not None:
+                    key, near = near_key, True
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)    # None if evicted meanwhile
+            if entry is not None and entry[2] <= now:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.near_hits += near
+            return entry[0]
+
+    def put(self, fingerprint: tuple | None, variant: Hashable, value: Any, nbytes: int = 0):
+        """Store a value; nbytes is its approximate size for the memory cap."""
+        if fingerprint is None or nbytes > self.max_bytes:
+            return
+        key = (fingerprint, variant)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, nbytes, time.monotonic() + self.ttl)
+            self._bytes += nbytes
+            for index_key in self._index_keys(fingerprint, variant):
+                self._index.setdefault(index_key, set()).add(key)
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._index.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "mode": self.mode,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "mb": round(self._bytes / 2**20, 2),
+            "max_mb": round(self.max_bytes / 2**20, 2),
+            "ttl_s": self.ttl,
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    # ── Internals ─────────────────────────────────────────────────────────
+
+    def _index_keys(self, fingerprint: tuple, variant: Hashable) -> list[tuple]:
+        shape, bits = fingerprint
+        return [(shape, variant, band, (bits >> shift) & mask) for band, (shift, mask) in enumerate(self._bands)]
+
+    def _candidates(self, fingerprint: tuple, variant: Hashable) -> list[tuple]:
+        """Keys of the same shape and variant sharing at least one hash band (under self._lock)."""
+        keys: set[tuple] = set()
+        for index_key in self._index_keys(fingerprint, variant):
+            keys |= self._index.get(index_key, set())
+        return list(keys)
+
+    def _remove(self, key: tuple):
+        _, nbytes, _ = self._entries.pop(key)
+        self._bytes -= nbytes
+        fingerprint, variant = key
+        for index_key in self._index_keys(fingerprint, variant):
+            bucket = self._index.get(index_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._index[index_key]
+
+    def _evict(self):
+        now = time.monotonic()
+        # Oldest-used first: drop expired ones, then whatever exceeds the caps
+        while self._entries:
+            key, (_, _, expires) = next(iter(self._entries.items()))
+            if expires <= now:
+                self.expirations += 1
+            elif len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self.evictions += 1
+            else:
+                break
+            self._remove(key)
+
+
+def _hash_bands(max_distance: int) -> list[tuple[int, int]]:
+    """(shift, mask) of max_distance + 1 near-equal bands covering the 64 hash bits."""
+    count = min(max_distance + 1, 64)
+    bounds = [round(i * 64 / count) for i in range(count + 1)]
+    return [(lo, (1 << (hi - lo)) - 1) for lo, hi in zip(bounds, bounds[1:])]
+
+
+def _nearest(fingerprint: tuple, keys: list[tuple], max_distance: int) -> tuple | None:
+    """Key among `keys` whose hash is closest to fingerprint's, within max_distance bits."""
+    bits = fingerprint[1]
+    best, best_distance = None, max_distance + 1
+    for key in keys:
+        distance = (bits ^ key[0][1]).bit_count()
+        if distance < best_distance:
+            best, best_distance = key, distance
+    return best
+
+
+def _dhash(frame: np.ndarray) -> int:
+    """64-bit difference hash: brightness gradients of a 9x8 grayscale thumbnail."""
+    # Area averaging over the whole frame: sampling shortcuts (nearest-neighbour
+    # pre-shrink, strides) let pixel noise flip bits in flat scenes
+    small = cv2.resize(frame, (9, 8), interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+    bits = (gray[:, 1:] > gray[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
@@ -0,0 +1,264 @@
+"""
+Asynchronous video analysis jobs.
+
+Long recordings can take minutes to analyze, longer than proxies keep an
+HTTP request open. A job is created from an uploaded video, persisted on disk
+and processed by a local worker pool; clients poll its progress and fetch the
+final DetectionResponse when it is done.
+
+On-disk layout (one directory per job, survives restarts):
+
+  <jobs_dir>/<job_id>/job.json     state, progress, final results
+  <jobs_dir>/<job_id>/video.<ext>  uploaded video (deleted once finished)
+
+Jobs found as queued or running at startup are re-enqueued from scratch, so
+the partial frame_detections of a running job are only kept in memory.
+Finished jobs (done or failed) are deleted, directory and all, once older
+than retention_s or beyond the max_finished most recent ones; the purge runs
+at startup, after each job and while the workers are idle.
+"""
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Runner signature: runner(job, video_path, report) -> DetectionResponse dict.
+# report(progress_dict) merges progress fields into the job and persists it.
+JobRunner = Callable[[dict, str, Callable[[dict], None]], dict]
+
+# Seconds between retention purges while the workers are idle
+PURGE_INTERVAL_S = 60.0
+
+
+class JobManager:
+    """
+    Usage:
+        manager = JobManager(Path("assets/jobs"), runner, workers=1, retention_s=24 * 3600)
+        manager.start()
+        job = manager.submit("/tmp/upload.mp4", {"analysis_type": None, "mode": "dense"})
+        manager.get(job["id"])
+    """
+
+    def __init__(
+        self,
+        jobs_dir: Path,
+        runner: JobRunner,
+        workers: int = 1,
+        retention_s: float | None = 24 * 3600,
+        max_finished: int | None = 1000,
+    ):
+        """
+        Args:
+            jobs_dir:     Where jobs are persisted.
+            runner:       Function that analyzes a job's video (see JobRunner).
+            workers:      Jobs processed concurrently.
+            retention_s:  Seconds a finished job is kept after finishing. None = forever.
+            max_finished: Finished jobs kept at most (most recent first). None = no limit.
+        """
+        self.jobs_dir = Path(jobs_dir)
+        self.workers = max(1, workers)
+        self.retention_s = retention_s
+        self.max_finished = max_finished
+        self._runner = runner
+        self._jobs: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._queue: queue.Queue[str | None] = queue.Queue()
+        self._threads: list[threading.Thread] = []
+
+    # ── Lifecycle ─────────────────────────────────────────────────────────
+
+    def start(self):
+        """Load persisted jobs, re-enqueue unfinished ones and start the workers."""
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        pending: list[dict] = []
+
+        for state_file in self.jobs_dir.glob("*/job.json"):
+            try:
+                job = json.loads(state_file.read_text())
+            except (OSError, ValueError) as exc:
+                print(f"[jobs] Estado ilegível ignorado: {state_file} ({exc})")
+                continue
+            if job["status"] in (QUEUED, RUNNING):
+                # Interrupted by a restart: start over, partial results are stale
+                job.update(status=QUEUED, frames_processed=0, progress=0.0,
+                           eta_seconds=None, frame_detections=[], started_at=None)
+                self._persist(job)
+                pending.append(job)
+            else:
+                # Left behind if the server stopped between finishing and cleanup
+                (state_file.parent / job["video"]).unlink(missing_ok=True)
+            self._jobs[job["id"]] = job
+
+        for job in sorted(pending, key=lambda j: j["created_at"]):
+            self._queue.put(job["id"])
+        if pending:
+            print(f"[jobs] {len(pending)} job(s) retomado(s) da fila em disco.")
+        self.purge()
+
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Stop idle workers. A job still running stays 'running' on disk and is retried on restart."""
+        for _ in self._threads:
+            self._queue.put(None)
+
+    # ── API ───────────────────────────────────────────────────────────────
+
+    def submit(self, video_path: str, params: dict, suffix: str | None = None, move: bool = True) -> dict:
+        """
+        Store the uploaded video in the job store (moved, or copied when
+        `move` is false) and enqueue it. suffix defaults to the path's.
+        """
+        job_id = uuid.uuid4().hex
+        job_dir = self.jobs_dir / job_id
+        job_dir.mkdir(parents=True)
+
+        suffix = suffix or Path(video_path).suffix or ".mp4"
+        stored = job_dir / f"video{suffix}"
+        if move:
+            shutil.move(video_path, stored)
+        else:
+            shutil.copyfile(video_path, stored)
+
+        job = {
+            "id": job_id,
+            "status": QUEUED,
+            "params": params,
+            "video": stored.name,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "total_frames": None,
+            "frames_processed": 0,
+            "progress": 0.0,
+            "eta_seconds": None,
+            "frame_detections": [],
+            "result": None,
+            "error": None,
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            self._persist(job)
+        self._queue.put(job_id)
+        return dict(job)
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def purge(self) -> int:
+        """Delete the finished jobs beyond retention_s / max_finished. Returns how many."""
+        now = time.time()
+        with self._lock:
+            finished = sorted(
+                (j for j in self._jobs.values() if j["status"] in (DONE, FAILED)),
+                key=lambda j: j["finished_at"] or j["created_at"],
+                reverse=True,
+            )
+            expired = [
+                job["id"] for rank, job in enumerate(finished)
+                if (self.max_finished is not None and rank >= self.max_finished)
+                or (self.retention_s is not None
+                    and now - (job["finished_at"] or job["created_at"]) > self.retention_s)
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+        for job_id in expired:
+            shutil.rmtree(self.jobs_dir / job_id, ignore_errors=True)
+        if expired:
+            print(f"[jobs] {len(expired)} job(s) finalizado(s) removido(s) do disco.")
+        return len(expired)
+
+    def queue_position(self, job_id: str) -> int | None:
+        """1-based position among queued jobs, or None if not queued."""
+        with self._lock:
+            queued = sorted(
+                (j for j in self._jobs.values() if j["status"] == QUEUED),
+                key=lambda j: j["created_at"],
+            )
+        for pos, job in enumerate(queued, start=1):
+            if job["id"] == job_id:
+                return pos
+        return None
+
+    # ── Worker ────────────────────────────────────────────────────────────
+
+    def _work(self):
+        while True:
+            try:
+                job_id = self._queue.get(timeout=PURGE_INTERVAL_S)
+            except queue.Empty:
+                self.purge()
+                continue
+            if job_id is None:
+                return
+            self._run(job_id)
+            self.purge()
+
+    def _run(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] != QUEUED:
+                return
+            job.update(status=RUNNING, started_at=time.time())
+            self._persist(job)
+            snapshot = dict(job)
+
+        video_path = str(self.jobs_dir / job_id / snapshot["video"])
+        try:
+            result = self._runner(snapshot, video_path, lambda progress: self._update(job_id, progress))
+        except Exception as exc:
+            self._update(job_id, {"status": FAILED, "error": str(exc), "finished_at": time.time()})
+            print(f"[jobs] Job {job_id} falhou: {exc}")
+        else:
+            self._update(job_id, {
+                "status": DONE,
+                "result": result,
+                "progress": 1.0,
+                "eta_seconds": 0.0,
+                "frames_processed": result.get("frames_processed", 0),
+                "frame_detections": result.get("frame_detections", []),
+                "finished_at": time.time(),
+            })
+        finally:
+            # The video is only needed until the job finishes (success or failure)
+            with self._lock:
+                finished = self._jobs[job_id]["status"] in (DONE, FAILED)
+            if finished:
+                try:
+                    os.unlink(video_path)
+                except OSError:
+                    pass
+
+    def _update(self, job_id: str, fields: dict):
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(fields)
+            self._persist(job)
+
+    def _persist(self, job: dict):
+        """Atomically write job.json (write to a temp file, then rename)."""
+        job_dir = self.jobs_dir / job["id"]
+        tmp = job_dir / "job.json.tmp"
+        if job["status"] not in (DONE, FAILED):
+            # Progress updates stay small: rewriting the growing list on every
+            # batch would make a long video's I/O quadratic
+            job = {**job, "frame_detections": []}
+        tmp.write_text(json.dumps(job))
+        os.replace(tmp, job_dir / "job.json")
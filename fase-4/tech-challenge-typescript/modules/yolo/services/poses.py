@@ -0,0 +1,137 @@
+"""
+Array-backed pose representation shared by the detector, the analyzers,
+main.py and realtime.py.
+
+The poses of one frame are a single PoseArray: an (N, 17, 3) float32 array
+of x, y, confidence per COCO keypoint, plus one posture label per person.
+Keypoints are addressed by name through KEYPOINT_INDEX instead of being
+stored as 17 dicts per person; the API JSON shape
+({person_id, keypoints: [{name, x, y, confidence}], posture_label}) is only
+built by to_dicts() when a response is serialized.
+"""
+import math
+from typing import NamedTuple
+
+import numpy as np
+
+# YOLOv8-pose COCO keypoint names (17 keypoints)
+KEYPOINT_NAMES = [
+    "nose", "left_eye", "right_eye", "left_ear", "right_ear",
+    "left_shoulder", "right_shoulder", "left_elbow", "right_elbow",
+    "left_wrist", "right_wrist", "left_hip", "right_hip",
+    "left_knee", "right_knee", "left_ankle", "right_ankle",
+]
+KEYPOINT_INDEX = {name: i for i, name in enumerate(KEYPOINT_NAMES)}
+
+# Keypoints below this confidence (or at the origin) are treated as missing
+VISIBLE_CONFIDENCE = 0.30
+
+
+class Keypoint(NamedTuple):
+    """One named keypoint, for rules that read a handful of points of one person."""
+    name: str
+    x: float
+    y: float
+    conf: float
+
+    @property
+    def visible(self) -> bool:
+        return self.conf > VISIBLE_CONFIDENCE and (self.x > 0 or self.y > 0)
+
+    def pt(self) -> tuple[int, int]:
+        return (int(self.x), int(self.y))
+
+    def dist(self, other: "Keypoint") -> float:
+        return math.hypot(self.x - other.x, self.y - other.y)
+
+
+class PoseArray:
+    """
+    Usage:
+        poses = PoseArray(kps)                  # kps: (N, 17, 3) x, y, confidence
+        len(poses), poses[0]                    # people, (17, 3) of person 0
+        poses.point("left_wrist")               # (N, 3)
+        poses.visible()                         # (N, 17) bool
+        visible_keypoints(poses[0])["nose"].x   # named access for one person
+        poses.to_dicts()                        # API JSON shape
+    """
+
+    __slots__ = ("data", "postures")
+
+    def __init__(self, data: np.ndarray | None = None, postures: list[str] | None = None):
+        if data is None:
+            data = np.zeros((0, 17, 3), dtype=np.float32)
+        self.data = np.asarray(data, dtype=np.float32).reshape(-1, 17, 3)
+        self.postures = list(postures) if postures is not None else ["neutral"] * len(self.data)
+        if len(self.postures) != len(self.data):
+            raise ValueError(f"{len(self.postures)} posturas para {len(self.data)} pessoas")
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, person: int) -> np.ndarray:
+        """(17, 3) x, y, confidence of one person (a view, not a copy)."""
+        return self.data[person]
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, PoseArray):
+            return NotImplemented
+        return self.postures == other.postures and np.array_equal(self.data, other.data)
+
+    def __repr__(self) -> str:
+        return f"PoseArray(people={len(self)}, postures={self.postures})"
+
+    @property
+    def xy(self) -> np.ndarray:
+        """(N, 17, 2) keypoint coordinates."""
+        return self.data[..., :2]
+
+    @property
+    def conf(self) -> np.ndarray:
+        """(N, 17) keypoint confidences."""
+        return self.data[..., 2]
+
+    def point(self, name: str) -> np.ndarray:
+        """(N, 3) x, y, confidence of keypoint `name` for every person."""
+        return self.data[:, KEYPOINT_INDEX[name]]
+
+    def visible(self, min_conf: float = VISIBLE_CONFIDENCE) -> np.ndarray:
+        """(N, 17) mask of keypoints above min_conf and off the origin."""
+        return (self.data[..., 2] > min_conf) & ((self.data[..., 0] > 0) | (self.data[..., 1] > 0))
+
+    def to_dicts(self) -> list[dict]:
+        """PersonPose-compatible dicts (x, y rounded to 2 decimals, confidence to 3)."""
+        xy = np.round(self.data[..., :2].astype(np.float64), 2).tolist()
+        conf = np.round(self.data[..., 2].astype(np.float64), 3).tolist()
+        return [
+            {
+                "person_id": person_id,
+                "posture_label": posture,
+                "keypoints": [
+                    {"name": name, "x": x, "y": y, "confidence": c}
+                    for name, (x, y), c in zip(KEYPOINT_NAMES, person_xy, person_conf)
+                ],
+            }
+            for person_id, (person_xy, person_conf, posture) in enumerate(zip(xy, conf, self.postures))
+        ]
+
+    @classmethod
+    def from_dicts(cls, poses: list[dict]) -> "PoseArray":
+        """Inverse of to_dicts() (e.g. poses stored in a job result)."""
+        data = np.zeros((len(poses), 17, 3), dtype=np.float32)
+        for person, pose in enumerate(poses):
+            for kp in pose["keypoints"]:
+                data[person, KEYPOINT_INDEX[kp["name"]]] = (kp["x"], kp["y"], kp["confidence"])
+        return cls(data, [pose["posture_label"] for pose in poses])
+
+
+def visible_keypoints(kps: np.ndarray, min_conf: float = VISIBLE_CONFIDENCE) -> dict[str, Keypoint]:
+    """Visible keypoints of one person ((17, 3) array) by name."""
+    return {
+        name: Keypoint(name, x, y, c)
+        for name, (x, y, c) in zip(KEYPOINT_NAMES, kps[:17].tolist())
+        if c > min_conf and (x > 0 or y > 0)
+    }
@@ -0,0 +1,446 @@
+"""
+Multi-process model serving.
+
+With one API process, every inference shares its interpreter: the forward
+passes release the GIL, but the ultralytics pre/post-processing and our own
+per-detection Python code do not, so concurrent clinic streams end up
+serialized. ProcessInferencePool runs the models in N worker processes
+instead (one per physical core by default), each with its own YOLODetector.
+
+Frame transport avoids pickling the arrays:
+
+  API process                                   worker process
+  ───────────                                   ──────────────
+  frame → free slot of the shared-memory ring
+  (slot, shape) ── request queue (tiny) ──────→ ndarray view on the slot
+                                                detector.detect_batch(views)
+  future resolved, slots freed ←── results queue ── (detections, PoseArray) pairs
+
+Frames larger than a slot are sent through the request queue instead. A
+batch is split into chunks of at most max_batch_size frames, and chunks go to
+the least busy workers, so a large batch is spread over several processes.
+A worker that dies fails its in-flight batches and is restarted (one that
+keeps failing to load its models is left out after load_retries restarts).
+detect_batch() gives up after result_timeout seconds rather than blocking on a
+stuck worker, which is killed and restarted so its ring slots come back.
+"""
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from services.poses import PoseArray
+
+# Control message sent by a worker once its models are loaded and warmed up
+_READY = "ready"
+
+# Seconds between liveness checks of the worker processes
+_CHECK_INTERVAL_S = 0.5
+
+
+class ProcessInferencePool:
+    """
+    Usage:
+        pool = ProcessInferencePool(workers=4, detector_kwargs={"inference_mode": "unified"})
+        pool.start()
+        pool.ready.result()                 # models loaded in every worker
+        results = pool.detect_batch(frames, need_objects=True)
+        pool.close()
+    """
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        max_batch_size: int = 8,
+        slots: int | None = None,
+        max_frame_size: tuple[int, int] = (1280, 720),
+        detector_kwargs: dict | None = None,
+        backend: dict | None = None,
+        warmup: dict | None = None,
+        result_timeout: float = 120.0,
+        load_retries: int = 2,
+    ):
+        """
+        Args:
+            workers:         Inference processes. None = physical cores.
+            max_batch_size:  Frames per request to a worker (and per forward pass).
+            slots:           Frames the shared-memory ring holds. None = 2 batches per worker.
+            max_frame_size:  (width, height) of the largest BGR frame a slot holds.
+            detector_kwargs: YOLODetector arguments (inference_mode, object_every, imgsz, ...).
+            backend:         configure_backend() arguments for the workers.
+            warmup:          YOLODetector.warmup() arguments; None = no warm-up.
+            result_timeout:  Seconds detect_batch() waits for its results (or for free
+                             ring slots) before failing.
+            load_retries:    Restarts of a worker whose models fail to load before it
+                             is left out; ready fails only if no worker loads.
+        """
+        self.workers = max(1, workers or physical_cores())
+        self.max_batch_size = max(1, max_batch_size)
+        self.slots = max(self.max_batch_size, slots or 2 * self.max_batch_size * self.workers)
+        width, height = max_frame_size
+        self.slot_bytes = width * height * 3
+
+        self.result_timeout = result_timeout
+        self.load_retries = max(0, load_retries)
+        self._config = {
+            "workers": self.workers,
+            "max_batch_size": self.max_batch_size,
+            "detector_kwargs": detector_kwargs or {},
+            "backend": backend or {},
+            "warmup": warmup,
+        }
+        self._ctx = mp.get_context("spawn")   # fork would copy the parent's torch/thread state
+        self._shm: shared_memory.SharedMemory | None = None
+        self._results = self._ctx.Queue()
+        self._processes: list = [None] * self.workers
+        self._requests: list = [None] * self.workers
+
+        # Slot ring: contiguous runs are not needed, any free slots will do
+        self._free_slots: list[int] = []
+        self._slots_cond = threading.Condition()
+
+        self._lock = threading.Lock()
+        self._jobs: dict[int, tuple[int, list[int], Future]] = {}   # job id → (worker, slots, future)
+        self._in_flight = [0] * self.workers
+        self._job_ids = itertools.count()
+        self._ready_workers: set[int] = set()
+        self._load_failures = [0] * self.workers
+        self._load_error: str | None = None
+        self._closing = False
+        self._dispatcher: threading.Thread | None = None
+        self.inline_frames = 0
+        self.restarts = 0
+
+        self.ready: Future = Future()
+
+    # ── Lifecycle ─────────────────────────────────────────────────────────
+
+    def start(self):
+        """Allocate the shared-memory ring and spawn the workers (returns at once; see self.ready)."""
+        self._shm = shared_memory.SharedMemory(create=True, size=self.slots * self.slot_bytes)
+        self._free_slots = list(range(self.slots))
+        for worker in range(self.workers):
+            self._spawn(worker)
+        self._dispatcher = threading.Thread(target=self._dispatch_results, name="pool-results", daemon=True)
+        self._dispatcher.start()
+
+    def close(self, timeout: float = 5.0):
+        """Stop the workers, fail pending batches and release the shared memory."""
+        self._closing = True
+        for requests in self._requests:
+            if requests is not None:
+                requests.put(None)
+        for process in self._processes:
+            if process is not None:
+                process.join(timeout)
+                if process.is_alive():
+                    process.terminate()
+        with self._lock:
+            jobs, self._jobs = self._jobs, {}
+        for _, _, future in jobs.values():
+            future.set_exception(RuntimeError("Pool de inferência encerrado."))
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def _spawn(self, worker: int):
+        # Restarts run under self._lock: submit() never puts work on a queue being replaced
+        self._requests[worker] = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker, self._shm.name, self.slot_bytes, self._requests[worker], self._results, self._config),
+            name=f"inference-{worker}",
+            daemon=True,
+        )
+        process.start()
+        self._processes[worker] = process
+
+    # ── API ───────────────────────────────────────────────────────────────
+
+    def detect_batch(
+        self,
+        frames: list[np.ndarray],
+        need_objects: bool = False,
+        imgsz: int | None = None,
+        pose_rois: list[tuple[int, int, int, int] | None] | None = None,
+        frame_indices: list[int] | None = None,
+    ) -> list[tuple[list[dict], PoseArray]]:
+        """Same contract as YOLODetector.detect_batch(), run in the worker processes. Blocking."""
+        # Positions are relative to the whole call, not to each worker request
+        if frame_indices is None:
+            frame_indices = list(range(len(frames)))
+        futures = [
+            self.submit(
+                frames[start:start + self.max_batch_size], need_objects, imgsz,
+                pose_rois[start:start + self.max_batch_size] if pose_rois is not None else None,
+                frame_indices[start:start + self.max_batch_size],
+            )
+            for start in range(0, len(frames), self.max_batch_size)
+        ]
+        deadline = time.monotonic() + self.result_timeout
+        results: list = []
+        for future in futures:
+            try:
+                results.extend(future.result(timeout=max(0.0, deadline - time.monotonic())))
+            except FutureTimeoutError:
+                self._abandon(futures)
+                raise RuntimeError(
+                    f"Processo de inferência não respondeu em {self.result_timeout:.0f} s."
+                ) from None
+        return results
+
+    def submit(
+        self,
+        frames: list[np.ndarray],
+        need_objects: bool = False,
+        imgsz: int | None = None,
+        pose_rois: list[tuple[int, int, int, int] | None] | None = None,
+        frame_indices: list[int] | None = None,
+    ) -> Future:
+        """Send up to max_batch_size frames to the least busy worker; the future yields detect_batch()'s list."""
+        if len(frames) > self.max_batch_size:
+            raise ValueError(f"Lote de {len(frames)} frames excede max_batch_size={self.max_batch_size}.")
+
+        fits = [f.nbytes <= self.slot_bytes for f in frames]
+        slots = self._acquire_slots(sum(fits))
+        slot_iter = iter(slots)
+        payload = []
+        for frame, fit in zip(frames, fits):
+            if fit:
+                slot = next(slot_iter)
+                view = np.ndarray(frame.shape, dtype=np.uint8, buffer=self._shm.buf, offset=slot * self.slot_bytes)
+                view[...] = frame
+                payload.append((slot, frame.shape))
+            else:
+                self.inline_frames += 1
+                payload.append((None, np.ascontiguousarray(frame)))
+
+        future: Future = Future()
+        with self._lock:
+            # Workers left out after failing to load are never restarted
+            alive = [w for w in range(self.workers) if self._processes[w] is not None]
+            if not alive:
+                self._release_slots(slots)
+                raise RuntimeError("Nenhum processo de inferência disponível.")
+            worker = min(alive, key=lambda w: self._in_flight[w])
+            job_id = next(self._job_ids)
+            self._jobs[job_id] = (worker, slots, future)
+            self._in_flight[worker] += 1
+            options = {"need_objects": need_objects, "imgsz": imgsz, "pose_rois": pose_rois,
+                       "frame_indices": frame_indices}
+            self._requests[worker].put((job_id, payload, options))
+        return future
+
+    def stats(self) -> dict:
+        with self._slots_cond:
+            free = len(self._free_slots)
+        return {
+            "workers": self.workers,
+            "ready_workers": len(self._ready_workers),
+            "in_flight": sum(self._in_flight),
+            "shm_slots": self.slots,
+            "shm_slots_free": free,
+            "shm_slot_mb": round(self.slot_bytes / 1e6, 2),
+            "inline_frames": self.inline_frames,
+            "restarts": self.restarts,
+        }
+
+    # ── Internals ─────────────────────────────────────────────────────────
+
+    def _acquire_slots(self, n: int) -> list[int]:
+        """Take n slots at once (never a partial set, so concurrent callers cannot deadlock)."""
+        with self._slots_cond:
+            if not self._slots_cond.wait_for(lambda: len(self._free_slots) >= n, self.result_timeout):
+                raise RuntimeError(
+                    f"Memória compartilhada de inferência sem espaço livre após {self.result_timeout:.0f} s."
+                )
+            taken, self._free_slots = self._free_slots[:n], self._free_slots[n:]
+        return taken
+
+    def _release_slots(self, slots: list[int]):
+        if not slots:
+            return
+        with self._slots_cond:
+            self._free_slots.extend(slots)
+            self._slots_cond.notify_all()
+
+    def _finish(self, job_id: int) -> Future | None:
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+            if job is None:
+                return None
+            worker, slots, future = job
+            self._in_flight[worker] -= 1
+        self._release_slots(slots)
+        return future
+
+    def _abandon(self, futures: list[Future]):
+        """Fail the still pending batches of a timed-out call and kill the workers holding them."""
+        with self._lock:
+            pending = {id(f) for f in futures if not f.done()}
+            stuck = [job_id for job_id, (_, _, f) in self._jobs.items() if id(f) in pending]
+            workers = {self._jobs[job_id][0] for job_id in stuck}
+            processes = {w: self._processes[w] for w in workers if self._processes[w] is not None}
+        # Killed before the slots are released, so a stuck worker cannot read
+        # frames written into them by the next batch. _check_workers() fails
+        # the worker's other batches and restarts it.
+        for worker, process in processes.items():
+            print(f"[pool] Worker {worker} não respondeu em {self.result_timeout:.0f} s; encerrando.")
+            process.kill()
+        for job_id in stuck:
+            future = self._finish(job_id)
+            if future is not None:
+                future.set_exception(RuntimeError("Processo de inferência não respondeu."))
+
+    def _dispatch_results(self):
+        next_check = time.monotonic() + _CHECK_INTERVAL_S
+        while not self._closing:
+            # On a timer, not only when the queue goes idle: busy workers
+            # returning results must not hide a dead one
+            if time.monotonic() >= next_check:
+                self._check_workers()
+                next_check = time.monotonic() + _CHECK_INTERVAL_S
+            try:
+                job_id, value, error = self._results.get(timeout=_CHECK_INTERVAL_S)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                return
+
+            if job_id == _READY:
+                self._on_ready(value, error)
+                continue
+            future = self._finish(job_id)
+            if future is None:
+                continue
+            if error is not None:
+                future.set_exception(RuntimeError(error))
+            else:
+                future.set_result(value)
+
+    def _on_ready(self, worker: int, error: str | None):
+        if error is not None:
+            # The worker exits; _check_workers() restarts it or leaves it out
+            print(f"[pool] Worker {worker} falhou ao carregar os modelos: {error}")
+            self._load_error = error
+            return
+        self._ready_workers.add(worker)
+        self._load_failures[worker] = 0
+        self._settle_ready()
+
+    def _settle_ready(self):
+        """Resolve ready once every worker has loaded or been left out."""
+        if self.ready.done():
+            return
+        left_out = sum(process is None for process in self._processes)
+        if len(self._ready_workers) + left_out < self.workers:
+            return
+        if self._ready_workers:
+            self.ready.set_result(True)
+        else:
+            self.ready.set_exception(RuntimeError(self._load_error or "Nenhum processo de inferência carregou."))
+
+    def _check_workers(self):
+        """Fail the batches of dead workers and restart them."""
+        for worker, process in enumerate(self._processes):
+            if self._closing or process is None or process.is_alive():
+                continue
+            loaded = worker in self._ready_workers
+            if not loaded:
+                self._load_failures[worker] += 1
+                self._load_error = self._load_error or (
+                    f"processo terminou durante o carregamento (exit code {process.exitcode})"
+                )
+            # Died while loading too often: restarting would most likely fail
+            # the same way, so it is left out of submit()
+            restart = loaded or self._load_failures[worker] <= self.load_retries
+            with self._lock:
+                # Same critical section as submit(): no batch can reach the
+                # old queue after this snapshot
+                dead = [job_id for job_id, (w, _, _) in self._jobs.items() if w == worker]
+                self._ready_workers.discard(worker)
+                if restart:
+                    self.restarts += 1
+                    self._spawn(worker)
+                else:
+                    self._processes[worker] = None
+            for job_id in dead:
+                future = self._finish(job_id)
+                if future is not None:
+                    future.set_exception(RuntimeError(f"Processo de inferência {worker} terminou."))
+            if restart:
+                print(f"[pool] Worker {worker} terminou (exit code {process.exitcode}); reiniciando.")
+            else:
+                print(f"[pool] Worker {worker} desativado após {self._load_failures[worker]} falhas de carregamento.")
+                self._settle_ready()
+
+
+def _worker_main(worker: int, shm_name: str, slot_bytes: int, requests, results, config: dict):
+    """Worker process: own detector and models, frames read straight from the shared-memory ring."""
+    from services.backends import configure_backend
+    from services.detector import YOLODetector
+    from services.executor import _limit_torch_threads
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        _limit_torch_threads(config["workers"])   # cores split among the worker processes
+        configure_backend(**config["backend"])
+        detector = YOLODetector(max_batch_size=config["max_batch_size"], **config["detector_kwargs"])
+        if config["warmup"] is not None:
+            detector.warmup(**config["warmup"])
+    except Exception as exc:
+        results.put((_READY, worker, f"{type(exc).__name__}: {exc}"))
+        shm.close()
+        return
+    results.put((_READY, worker, None))
+
+    while True:
+        message = requests.get()
+        if message is None:
+            break
+        job_id, payload, options = message
+        frames = [
+            np.ndarray(item, dtype=np.uint8, buffer=shm.buf, offset=slot * slot_bytes) if slot is not None else item
+            for slot, item in payload
+        ]
+        try:
+            results.put((job_id, detector.detect_batch(frames, **options), None))
+        except Exception as exc:
+            results.put((job_id, None, f"{type(exc).__name__}: {exc}"))
+        # Views must be gone before the segment can be closed
+        del frames
+
+    shm.close()
+
+
+def physical_cores() -> int:
+    """Physical CPU cores (hyper-threads excluded), falling back to logical cores."""
+    try:
+        import psutil
+        cores = psutil.cpu_count(logical=False)
+        if cores:
+            return cores
+    except ImportError:
+        pass
+    try:
+        with open("/proc/cpuinfo") as f:
+            cores, physical_id = set(), None
+            for line in f:
+                key, _, value = line.partition(":")
+                key = key.strip()
+                if key == "physical id":
+                    physical_id = value.strip()
+                elif key == "core id":
+                    cores.add((physical_id, value.strip()))
+        if cores:
+            return len(cores)
+    except OSError:
+        pass
+    return os.cpu_count() or 1
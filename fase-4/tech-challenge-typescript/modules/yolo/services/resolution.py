@@ -0,0 +1,147 @@
+"""
+Model input resolution policy.
+
+ultralytics letterboxes every frame to `imgsz` on its longer side (640 by
+default), whatever the frame size: the input resolution, not the camera
+resolution, sets both the cost of a forward pass and the smallest person the
+models can still see. ResolutionPolicy picks it per forward pass:
+
+  imgsz  → the configured size, lowered (down to min_imgsz) while the people
+           of recent frames are large: the smallest of them only needs about
+           subject_px input pixels of height to be detected, so big subjects
+           are analyzed at a fraction of the cost
+  roi    → optionally, a crop around the people of recent frames for the pose
+           model: the crop, not the whole frame, is letterboxed to imgsz, so
+           small or distant people get more input pixels. The whole frame is
+           used again every roi_refresh passes and whenever nobody was found,
+           so people entering the scene are picked up.
+
+A policy follows one stream of frames (a dense video analysis, a realtime
+session); without min_imgsz and roi it always returns the fixed imgsz.
+"""
+from collections import deque
+
+import numpy as np
+
+# ultralytics input sizes are multiples of the model stride
+IMGSZ_STRIDE = 32
+
+
+def round_imgsz(size: float) -> int:
+    """Nearest valid model input size (multiple of the stride, at least one stride)."""
+    return max(IMGSZ_STRIDE, int(round(size / IMGSZ_STRIDE)) * IMGSZ_STRIDE)
+
+
+class ResolutionPolicy:
+    """
+    Usage:
+        policy = ResolutionPolicy(imgsz=640, min_imgsz=320, roi=True)
+        for frame in stream:
+            imgsz, roi = policy.plan(frame.shape)
+            detections, poses = detector.detect_batch([frame], imgsz=imgsz, pose_rois=[roi])[0]
+            policy.observe(frame.shape, [(d["x1"], d["y1"], d["x2"], d["y2"])
+                                         for d in detections if d["class_id"] == 0])
+    """
+
+    def __init__(
+        self,
+        imgsz: int = 640,
+        min_imgsz: int | None = None,
+        subject_px: int = 96,
+        window: int = 10,
+        roi: bool = False,
+        roi_padding: float = 0.25,
+        roi_max_area: float = 0.5,
+        roi_refresh: int = 10,
+    ):
+        """
+        Args:
+            imgsz:        Model input size (the largest one used).
+            min_imgsz:    Smallest size adaptive downscaling may pick. None = fixed imgsz.
+            subject_px:   Input pixels of height the smallest recent person should keep.
+            window:       Recent frames whose people are taken into account.
+            roi:          Crop the pose model input around the people of the last frame.
+            roi_padding:  Margin around each person box, as a fraction of its size.
+            roi_max_area: Crops covering more of the frame than this are not worth it.
+            roi_refresh:  Passes between whole-frame passes when using crops.
+        """
+        self.imgsz = round_imgsz(imgsz)
+        self.min_imgsz = round_imgsz(min_imgsz) if min_imgsz else self.imgsz
+        self.subject_px = subject_px
+        self.roi_enabled = roi
+        self.roi_padding = roi_padding
+        self.roi_max_area = roi_max_area
+        self.roi_refresh = max(1, roi_refresh)
+
+        # Height (px) of the smallest person of each recent frame; None = nobody
+        self._subjects: deque[float | None] = deque(maxlen=max(1, window))
+        self._boxes = np.zeros((0, 4))          # people of the last observed frame
+        self._since_full = self.roi_refresh     # the first pass always sees the whole frame
+
+        self.last_imgsz = self.imgsz
+        self.last_roi: tuple[int, int, int, int] | None = None
+        self.passes = 0
+        self.roi_passes = 0
+
+    @property
+    def adaptive(self) -> bool:
+        return self.min_imgsz < self.imgsz or self.roi_enabled
+
+    def plan(self, frame_shape: tuple) -> tuple[int, tuple[int, int, int, int] | None]:
+        """(imgsz, pose roi (x1, y1, x2, y2) or None) for the next forward pass on frames of this shape."""
+        height, width = frame_shape[:2]
+        roi = self._roi(width, height) if self.roi_enabled else None
+        self._since_full = self._since_full + 1 if roi is not None else 0
+
+        # The crop (or frame) is letterboxed to imgsz on its longer side
+        region = max(roi[2] - roi[0], roi[3] - roi[1]) if roi is not None else max(width, height)
+        imgsz = self.imgsz
+        subjects = [s for s in self._subjects if s is not None]
+        # Only while every recent frame had people: an empty frame may just
+        # have people too small for the current size
+        if self.min_imgsz < self.imgsz and subjects and len(subjects) == len(self._subjects):
+            needed = self.subject_px * region / min(subjects)
+            imgsz = min(self.imgsz, max(self.min_imgsz, round_imgsz(needed)))
+
+        self.last_imgsz, self.last_roi = imgsz, roi
+        self.passes += 1
+        self.roi_passes += roi is not None
+        return imgsz, roi
+
+    def observe(self, frame_shape: tuple, person_boxes):
+        """Record the people (x1, y1, x2, y2 in frame pixels) found in a frame."""
+        boxes = np.asarray(person_boxes, dtype=np.float64).reshape(-1, 4)
+        heights = boxes[:, 3] - boxes[:, 1]
+        self._subjects.append(float(heights.min()) if len(boxes) and heights.min() > 0 else None)
+        self._boxes = boxes
+
+    def reset(self):
+        """Forget the recent frames (e.g. after a scene cut)."""
+        self._subjects.clear()
+        self._boxes = np.zeros((0, 4))
+        self._since_full = self.roi_refresh
+
+    def stats(self) -> dict:
+        return {
+            "imgsz": self.imgsz,
+            "min_imgsz": self.min_imgsz,
+            "roi": self.roi_enabled,
+            "last_imgsz": self.last_imgsz,
+            "passes": self.passes,
+            "roi_passes": self.roi_passes,
+        }
+
+    # ── Internals ─────────────────────────────────────────────────────────
+
+    def _roi(self, width: int, height: int) -> tuple[int, int, int, int] | None:
+        """Padded union of the last people, or None for a whole-frame pass."""
+        if not len(self._boxes) or self._since_full + 1 >= self.roi_refresh:
+            return None
+        size = self._boxes[:, 2:] - self._boxes[:, :2]
+        lo = (self._boxes[:, :2] - size * self.roi_padding).min(axis=0)
+        hi = (self._boxes[:, 2:] + size * self.roi_padding).max(axis=0)
+        x1, y1 = max(0, int(lo[0])), max(0, int(lo[1]))
+        x2, y2 = min(width, int(np.ceil(hi[0]))), min(height, int(np.ceil(hi[1])))
+        if x2 <= x1 or y2 <= y1 or (x2 - x1) * (y2 - y1) > self.roi_max_area * width * height:
+            return None
+        return x1, y1, x2, y2
@@ -0,0 +1,224 @@
+"""
+Video frame sampler.
+
+Seeking with cv2.CAP_PROP_POS_FRAMES on H.264/VP8 makes the decoder jump to
+the previous keyframe and decode forward to the requested frame, so N seeks
+cost roughly N × (keyframe interval / 2) decodes plus the seek overhead.
+When samples are dense it is cheaper to scan forward with grab() (demux +
+decode, no colour conversion) and retrieve() only the frames we keep.
+
+FrameSampler picks the strategy from the sample spacing:
+
+  scan  → gap between samples <= keyframe interval: one forward pass
+  seek  → sparse samples on long files: one seek per sample, optionally
+          snapped to the keyframe grid so each seek decodes a single frame
+
+Every call returns SamplingStats with the strategy used and decode timings.
+
+iter_frames() is the dense counterpart: a generator over the whole video at a
+fixed stride that samples more densely right after scene changes.
+"""
+import time
+from dataclasses import asdict, dataclass
+from typing import Iterator
+
+import cv2
+import numpy as np
+
+# Keyframe spacing assumed when none is configured: 2 s of video, the usual
+# GOP of browser (MediaRecorder) and camera encoders.
+DEFAULT_KEYFRAME_SECONDS = 2.0
+
+# Bhattacharyya distance between grey-level histograms above which two
+# consecutive samples are considered different scenes (0 = identical, 1 = disjoint)
+DEFAULT_SCENE_THRESHOLD = 0.30
+
+
+@dataclass
+class SamplingStats:
+    strategy: str            # scan | seek
+    total_frames: int        # frames in the container (counted if the header lacks it)
+    frames_requested: int
+    frames_decoded: int      # frames returned
+    frames_grabbed: int      # frames demuxed/decoded by grab() while scanning
+    seeks: int
+    keyframe_interval: int
+    decode_ms: float         # time spent seeking/grabbing/retrieving
+    total_ms: float          # including container open
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class FrameSampler:
+    """
+    Usage:
+        sampler = FrameSampler(snap_to_keyframes=True)
+        frames, stats = sampler.sample("video.mp4", num_frames=8)
+    """
+
+    def __init__(
+        self,
+        keyframe_interval: int | None = None,
+        snap_to_keyframes: bool = False,
+        scan_gap_factor: float = 1.0,
+    ):
+        """
+        Args:
+            keyframe_interval: GOP length in frames. None = DEFAULT_KEYFRAME_SECONDS × fps.
+            snap_to_keyframes: In seek mode, move each sample to the nearest
+                               keyframe-grid index (exact index is not kept).
+            scan_gap_factor:   Scan when the sample gap <= factor × keyframe interval.
+        """
+        self.keyframe_interval = keyframe_interval
+        self.snap_to_keyframes = snap_to_keyframes
+        self.scan_gap_factor = scan_gap_factor
+
+    def sample(self, video_path: str, num_frames: int = 8) -> tuple[list[np.ndarray], SamplingStats]:
+        """Extract num_frames evenly-spaced frames. Returns (frames, stats)."""
+        t0 = time.perf_counter()
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError(f"Cannot open video: {video_path}")
+
+        try:
+            total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+            grabbed = 0
+            if total <= 0:
+                # Streams without a frame count in the header (e.g. MediaRecorder
+                # webm): count with a grab-only pass, then rewind.
+                while cap.grab():
+                    grabbed += 1
+                total = grabbed
+                cap.release()
+                cap = cv2.VideoCapture(video_path)
+
+            kf_interval = self.keyframe_interval or max(1, round(fps * DEFAULT_KEYFRAME_SECONDS))
+            indices = np.linspace(0, max(total - 1, 0), num_frames, dtype=int).tolist()
+            gap = total / max(num_frames, 1)
+
+            t_decode = time.perf_counter()
+            if gap <= kf_interval * self.scan_gap_factor:
+                strategy = "scan"
+                frames, scan_grabbed = _scan(cap, indices)
+                grabbed += scan_grabbed
+                seeks = 0
+            else:
+                strategy = "seek"
+                if self.snap_to_keyframes:
+                    last_key = (max(total - 1, 0) // kf_interval) * kf_interval
+                    indices = [min(round(i / kf_interval) * kf_interval, last_key) for i in indices]
+                frames, seeks = _seek(cap, indices)
+            decode_ms = (time.perf_counter() - t_decode) * 1000.0
+        finally:
+            cap.release()
+
+        stats = SamplingStats(
+            strategy=strategy,
+            total_frames=total,
+            frames_requested=num_frames,
+            frames_decoded=len(frames),
+            frames_grabbed=grabbed,
+            seeks=seeks,
+            keyframe_interval=kf_interval,
+            decode_ms=round(decode_ms, 2),
+            total_ms=round((time.perf_counter() - t0) * 1000.0, 2),
+        )
+        return frames, stats
+
+    def iter_frames(
+        self,
+        video_path: str,
+        stride: int = 15,
+        scene_threshold: float = DEFAULT_SCENE_THRESHOLD,
+    ) -> Iterator[tuple[int, np.ndarray, bool]]:
+        """
+        Yield (frame_index, frame, scene_change) over the whole video.
+
+        One frame every `stride` frames is kept. When a kept frame differs from
+        the previous one by more than scene_threshold (histogram distance),
+        the next 2 × stride frames are sampled at stride // 4 to cover the
+        transition. The video is scanned forward with grab(), and only one
+        frame is held at a time, so memory does not grow with video length.
+        """
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError(f"Cannot open video: {video_path}")
+
+        stride = max(1, stride)
+        burst_stride = max(1, stride // 4)
+        burst_until = -1
+        prev_signature = None
+        next_pos = 0
+        pos = 0
+
+        try:
+            while cap.grab():
+                if pos >= next_pos:
+                    ret, frame = cap.retrieve()
+                    if ret:
+                        signature = _scene_signature(frame)
+                        scene_change = prev_signature is None or cv2.compareHist(
+                            prev_signature, signature, cv2.HISTCMP_BHATTACHARYYA,
+                        ) > scene_threshold
+                        prev_signature = signature
+                        if scene_change:
+                            burst_until = pos + 2 * stride
+                        yield pos, frame, scene_change
+                    next_pos = pos + (burst_stride if pos < burst_until else stride)
+                pos += 1
+        finally:
+            cap.release()
+
+
+def _scene_signature(frame: np.ndarray) -> np.ndarray:
+    """Normalized 32-bin grey histogram of a 64×36 thumbnail (~0.1 ms per frame)."""
+    small = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), (64, 36), interpolation=cv2.INTER_AREA)
+    hist = cv2.calcHist([small], [0], None, [32], [0, 256])
+    return cv2.normalize(hist, hist)
+
+
+def _scan(cap: cv2.VideoCapture, indices: list[int]) -> tuple[list[np.ndarray], int]:
+    """Forward pass with grab(); retrieve() only at the wanted indices."""
+    frames: list[np.ndarray] = []
+    wanted = iter(indices)
+    target = next(wanted, None)
+    pos = 0
+    grabbed = 0
+
+    while target is not None:
+        if not cap.grab():
+            break
+        grabbed += 1
+        if pos == target:
+            ret, frame = cap.retrieve()
+            # linspace may repeat an index on very short clips
+            while target == pos:
+                if ret:
+                    frames.append(frame)
+                target = next(wanted, None)
+        pos += 1
+
+    return frames, grabbed
+
+
+def _seek(cap: cv2.VideoCapture, indices: list[int]) -> tuple[list[np.ndarray], int]:
+    """One seek + read per index; repeated indices reuse the previous frame."""
+    frames: list[np.ndarray] = []
+    seeks = 0
+    last_idx, last_frame = None, None
+
+    for idx in indices:
+        if idx == last_idx:
+            if last_frame is not None:
+                frames.append(last_frame)
+            continue
+        cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+        seeks += 1
+        ret, frame = cap.read()
+        last_idx, last_frame = idx, (frame if ret else None)
+        if ret:
+            frames.append(frame)
+
+    return frames, seeks
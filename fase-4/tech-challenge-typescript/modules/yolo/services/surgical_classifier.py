@@ -19,6 +19,7 @@ Para treinar o modelo:
 """
 
 import os
+import threading
 from pathlib import Path
 from typing import Optional
 
@@ -65,11 +66,14 @@ class SurgicalClassifier:
         # Classify a crop (e.g., inside a detected bounding box)
         crop = frame[y1:y2, x1:x2]
         result = clf.classify(crop)
+
+        # Classify every instrument box of a frame in one batch
+        results = clf.classify_regions(frame, [(x1, y1, x2, y2), ...])
     """
 
     def __init__(self, model_path: Path = _MODEL_PATH):
         self._model_path = model_path
-        self._model = None
+        self._local = threading.local()       # per-thread YOLO instance (predictors aren't thread-safe)
         self._available: bool | None = None   # None = not yet checked
 
     @property
@@ -84,11 +88,15 @@ class SurgicalClassifier:
                 )
         return self._available
 
+    @property
+    def _model(self):
+        return getattr(self._local, "model", None)
+
     def _load(self):
         if self._model is None and self.available:
             try:
-                from ultralytics import YOLO
-                self._model = YOLO(str(self._model_path))
+                from services.backends import load_model
+                self._local.model = load_model(self._model_path, task="classify", imgsz=224)
                 print(f"[SurgicalClassifier] Modelo carregado: {self._model_path.name}")
             except Exception as exc:
                 print(f"[SurgicalClassifier] Falha ao carregar modelo: {exc}")
@@ -111,54 +119,36 @@ class SurgicalClassifier:
 
             Returns None if model is unavailable or confidence < threshold.
         """
-        if not self.available:
-            return None
+        return self.classify_batch([image])[0]
+
+    def classify_batch(self, images: list[np.ndarray]) -> list[Optional[dict]]:
+        """
+        Classifies several frames/crops in a single forward pass.
+
+        Returns one classify()-style result (or None) per input image, in order.
+        """
+        out: list[Optional[dict]] = [None] * len(images)
+        if not images or not self.available:
+            return out
 
         self._load()
         if self._model is None:
-            return None
+            return out
 
-        if image is None or image.size == 0:
-            return None
+        # Empty crops are skipped but keep their slot in the output
+        slots = [i for i, img in enumerate(images) if img is not None and img.size > 0]
+        if not slots:
+            return out
 
         try:
-            results = self._model(image, verbose=False, imgsz=224)
+            results = self._model([images[i] for i in slots], verbose=False, imgsz=224)
         except Exception as exc:
             print(f"[SurgicalClassifier] Erro de inferência: {exc}")
-            return None
-
-        if not results:
-            return None
-
-        probs    = results[0].probs
-        names    = results[0].names          # {idx: class_key}
-        top1_idx = int(probs.top1)
-        top1_conf = float(probs.top1conf)
-
-        if top1_conf < CONFIDENCE_THRESHOLD:
-            return None
-
-        top1_key = names[top1_idx]
-
-        # Top-3 results
-        top3 = []
-        top5_idxs = probs.top5
-        top5_confs = probs.top5conf.tolist()
-        for idx, conf in zip(top5_idxs[:3], top5_confs[:3]):
-            key = names[int(idx)]
-            top3.append({
-                "class_key":  key,
-                "label":      INSTRUMENT_LABELS.get(key, key),
-                "confidence": round(float(conf), 3),
-            })
-
-        return {
-            "class_key":  top1_key,
-            "label":      INSTRUMENT_LABELS.get(top1_key, top1_key),
-            "confidence": round(top1_conf, 3),
-            "risk":       INSTRUMENT_RISK.get(top1_key, "medium"),
-            "top3":       top3,
-        }
+            return out
+
+        for i, result in zip(slots, results):
+            out[i] = _parse_result(result)
+        return out
 
     def classify_region(
         self,
@@ -177,19 +167,96 @@ class SurgicalClassifier:
         Returns:
             Same as classify(), or None.
         """
-        h, w = frame.shape[:2]
-        pad_x = int((x2 - x1) * padding)
-        pad_y = int((y2 - y1) * padding)
-        cx1 = max(0, x1 - pad_x)
-        cy1 = max(0, y1 - pad_y)
-        cx2 = min(w, x2 + pad_x)
-        cy2 = min(h, y2 + pad_y)
-
-        if cx2 <= cx1 or cy2 <= cy1:
-            return None
-
-        crop = frame[cy1:cy2, cx1:cx2]
-        return self.classify(crop)
+        return self.classify_regions(frame, [(x1, y1, x2, y2)], padding)[0]
+
+    def classify_regions(
+        self,
+        frame: np.ndarray,
+        boxes: list[tuple[int, int, int, int]],
+        padding: float = 0.10,
+    ) -> list[Optional[dict]]:
+        """
+        Crops, letterboxes and classifies every (x1, y1, x2, y2) box of a frame
+        in one forward pass, instead of one 224×224 pass per instrument.
+
+        Letterboxing (pad to square, then resize) keeps elongated instruments
+        whole, where a center crop would cut their tips.
+
+        Returns one classify()-style result (or None) per box, in order.
+        """
+        if not boxes or not self.available:
+            return [None] * len(boxes)
+
+        crops = [_letterbox(_crop_region(frame, *box, padding=padding), 224) for box in boxes]
+        return self.classify_batch(crops)
+
+
+def _parse_result(result) -> Optional[dict]:
+    """classify()-style dict from an ultralytics classification Result."""
+    probs    = result.probs
+    names    = result.names          # {idx: class_key}
+    top1_idx = int(probs.top1)
+    top1_conf = float(probs.top1conf)
+
+    if top1_conf < CONFIDENCE_THRESHOLD:
+        return None
+
+    top1_key = names[top1_idx]
+
+    # Top-3 results
+    top3 = []
+    top5_idxs = probs.top5
+    top5_confs = probs.top5conf.tolist()
+    for idx, conf in zip(top5_idxs[:3], top5_confs[:3]):
+        key = names[int(idx)]
+        top3.append({
+            "class_key":  key,
+            "label":      INSTRUMENT_LABELS.get(key, key),
+            "confidence": round(float(conf), 3),
+        })
+
+    return {
+        "class_key":  top1_key,
+        "label":      INSTRUMENT_LABELS.get(top1_key, top1_key),
+        "confidence": round(top1_conf, 3),
+        "risk":       INSTRUMENT_RISK.get(top1_key, "medium"),
+        "top3":       top3,
+    }
+
+
+def _crop_region(
+    frame: np.ndarray,
+    x1: int, y1: int, x2: int, y2: int,
+    padding: float = 0.10,
+) -> Optional[np.ndarray]:
+    """Padded crop of a box, clipped to the frame. None if the box is empty."""
+    h, w = frame.shape[:2]
+    pad_x = int((x2 - x1) * padding)
+    pad_y = int((y2 - y1) * padding)
+    cx1 = max(0, x1 - pad_x)
+    cy1 = max(0, y1 - pad_y)
+    cx2 = min(w, x2 + pad_x)
+    cy2 = min(h, y2 + pad_y)
+
+    if cx2 <= cx1 or cy2 <= cy1:
+        return None
+
+    return frame[cy1:cy2, cx1:cx2]
+
+
+def _letterbox(image: Optional[np.ndarray], size: int) -> Optional[np.ndarray]:
+    """Resize keeping aspect ratio and pad to size×size with neutral grey (114)."""
+    if image is None:
+        return None
+    h, w = image.shape[:2]
+    scale = size / max(h, w)
+    nh, nw = max(1, round(h * scale)), max(1, round(w * scale))
+    resized = cv2.resize(image, (nw, nh), interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+
+    canvas = np.full((size, size, 3), 114, dtype=image.dtype)
+    top, left = (size - nh) // 2, (size - nw) // 2
+    canvas[top:top + nh, left:left + nw] = resized
+    return canvas
 
 
 # Module-level singleton (shared across detector + realtime)
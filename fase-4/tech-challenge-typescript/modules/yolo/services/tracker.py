@@ -0,0 +1,244 @@
+"""
+Lightweight multi-object tracker for the realtime loop.
+
+Full detection (object + pose models) on every 1280×720 webcam frame does not
+reach real time on CPU. IoUTracker lets realtime.py run the models only every
+N frames and propagate boxes and keypoints in between:
+
+  - constant-velocity motion model per track (box delta per frame, smoothed)
+  - ByteTrack-style association: high-confidence detections are matched to
+    tracks first, low-confidence ones may only extend existing tracks
+  - keypoints follow their track: translated/scaled with the predicted box
+  - stable track IDs across frames and brief misses
+
+`uncertain` tells the caller when propagated positions should not be trusted
+(tracks appearing/disappearing, or fast motion since the last detection) so
+that it can run a full detection earlier than scheduled.
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+
+
+@dataclass
+class Track:
+    track_id: int
+    cls_id: int
+    box: np.ndarray                      # (4,) x1, y1, x2, y2 — current (predicted) position
+    confidence: float
+    keypoints: np.ndarray | None = None  # (17, 3) x, y, conf — current position
+    data: dict = field(default_factory=dict)   # caller payload (label, posture, ...)
+
+    # Motion state
+    velocity: np.ndarray = field(default_factory=lambda: np.zeros(4, dtype=np.float32))
+    detected_box: np.ndarray | None = None         # box at the last matched detection
+    detected_keypoints: np.ndarray | None = None
+    frames_since_update: int = 0
+    misses: int = 0                       # detection rounds without a match
+    hits: int = 1
+
+
+class IoUTracker:
+    """
+    Usage:
+        tracker = IoUTracker()
+        # detection frame
+        tracks = tracker.step([{"box": (x1, y1, x2, y2), "cls_id": 0, "confidence": 0.9,
+                                "keypoints": kps, "data": {...}}, ...])
+        # intermediate frame
+        tracks = tracker.step()
+        if tracker.uncertain:
+            ...  # run detection on the next frame
+    """
+
+    def __init__(
+        self,
+        iou_threshold: float = 0.3,
+        high_confidence: float = 0.5,
+        max_misses: int = 2,
+        max_drift: float = 0.5,
+        velocity_smoothing: float = 0.5,
+    ):
+        """
+        Args:
+            iou_threshold:      Minimum IoU between a predicted track and a detection.
+            high_confidence:    Detections below this can only extend existing tracks.
+            max_misses:         Detection rounds a track survives without a match.
+            max_drift:          Uncertain once a track was extrapolated further than
+                                this fraction of its box size since its last detection.
+            velocity_smoothing: Weight of the previous velocity in the running estimate.
+        """
+        self.iou_threshold = iou_threshold
+        self.high_confidence = high_confidence
+        self.max_misses = max_misses
+        self.max_drift = max_drift
+        self.velocity_smoothing = velocity_smoothing
+
+        self._tracks: list[Track] = []
+        self._next_id = 1
+        self._changed = False
+
+    @property
+    def tracks(self) -> list[Track]:
+        """Tracks matched at the last detection round (coasting ones are hidden)."""
+        return [t for t in self._tracks if t.misses == 0]
+
+    @property
+    def uncertain(self) -> bool:
+        """True when the next frame should get a full detection."""
+        if self._changed:
+            return True
+        for t in self.tracks:
+            if t.frames_since_update == 0:
+                continue
+            size = max(t.detected_box[2] - t.detected_box[0], t.detected_box[3] - t.detected_box[1], 1.0)
+            center_speed = float(np.abs((t.velocity[:2] + t.velocity[2:]) / 2).max())
+            drift = center_speed * t.frames_since_update
+            if drift > self.max_drift * size:
+                return True
+        return False
+
+    def reset(self):
+        self._tracks.clear()
+        self._changed = False
+
+    def step(self, detections: list[dict] | None = None) -> list[Track]:
+        """
+        Advance all tracks by one frame. When detections are given (a detection
+        frame), associate them and correct the tracks. Returns self.tracks.
+
+        Each detection is a dict with "box" (x1, y1, x2, y2), "cls_id",
+        "confidence" and optional "keypoints" ((17, 3) array) and "data".
+        """
+        for track in self._tracks:
+            self._predict(track)
+
+        if detections is not None:
+            self._update(detections)
+        return self.tracks
+
+    # ── Internals ─────────────────────────────────────────────────────────
+
+    def _predict(self, track: Track):
+        track.frames_since_update += 1
+        new_box = track.detected_box + track.velocity * track.frames_since_update
+        if track.detected_keypoints is not None:
+            track.keypoints = _warp_keypoints(track.detected_keypoints, track.detected_box, new_box)
+        track.box = new_box
+
+    def _update(self, detections: list[dict]):
+        high = [d for d in detections if d["confidence"] >= self.high_confidence]
+        low = [d for d in detections if d["confidence"] < self.high_confidence]
+
+        # 1st pass: high-confidence detections against every live track
+        unmatched_tracks = list(range(len(self._tracks)))
+        pairs, unmatched_high = self._associate(unmatched_tracks, high)
+        for ti, di in pairs:
+            self._correct(self._tracks[ti], high[di])
+        matched = {ti for ti, _ in pairs}
+        unmatched_tracks = [ti for ti in unmatched_tracks if ti not in matched]
+
+        # 2nd pass: low-confidence detections only rescue remaining tracks
+        pairs, _ = self._associate(unmatched_tracks, low)
+        for ti, di in pairs:
+            self._correct(self._tracks[ti], low[di])
+        matched |= {ti for ti, _ in pairs}
+
+        lost = 0
+        for ti, track in enumerate(self._tracks):
+            if ti not in matched:
+                track.misses += 1
+                lost += track.misses == 1
+        self._tracks = [t for t in self._tracks if t.misses <= self.max_misses]
+
+        for di in unmatched_high:
+            self._tracks.append(self._new_track(high[di]))
+
+        self._changed = bool(unmatched_high) or lost > 0
+
+    def _associate(self, track_idx: list[int], detections: list[dict]) -> tuple[list[tuple[int, int]], list[int]]:
+        """Greedy IoU matching of same-class pairs. Returns (pairs, unmatched detection indices)."""
+        if not track_idx or not detections:
+            return [], list(range(len(detections)))
+
+        track_boxes = np.array([self._tracks[i].box for i in track_idx], dtype=np.float32)
+        det_boxes = np.array([d["box"] for d in detections], dtype=np.float32)
+        ious = iou_matrix(track_boxes, det_boxes)
+        same_cls = (np.array([self._tracks[i].cls_id for i in track_idx])[:, None]
+                    == np.array([d["cls_id"] for d in detections])[None, :])
+        ious[~same_cls] = 0.0
+
+        pairs = [(track_idx[ti], di) for ti, di in match_boxes(ious, self.iou_threshold)]
+        matched_dets = {di for _, di in pairs}
+        return pairs, [di for di in range(len(detections)) if di not in matched_dets]
+
+    def _correct(self, track: Track, det: dict):
+        box = np.asarray(det["box"], dtype=np.float32)
+        observed = (box - track.detected_box) / max(track.frames_since_update, 1)
+        s = self.velocity_smoothing
+        track.velocity = s * track.velocity + (1 - s) * observed
+
+        track.box = track.detected_box = box
+        track.confidence = float(det["confidence"])
+        keypoints = det.get("keypoints")
+        track.keypoints = track.detected_keypoints = None if keypoints is None else np.asarray(keypoints, np.float32)
+        track.data = det.get("data", {})
+        track.frames_since_update = 0
+        track.misses = 0
+        track.hits += 1
+
+    def _new_track(self, det: dict) -> Track:
+        box = np.asarray(det["box"], dtype=np.float32)
+        keypoints = det.get("keypoints")
+        keypoints = None if keypoints is None else np.asarray(keypoints, np.float32)
+        track = Track(
+            track_id=self._next_id,
+            cls_id=int(det["cls_id"]),
+            box=box,
+            confidence=float(det["confidence"]),
+            keypoints=keypoints,
+            data=det.get("data", {}),
+            detected_box=box,
+            detected_keypoints=keypoints,
+        )
+        self._next_id += 1
+        return track
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between (N, 4) and (M, 4) xyxy boxes → (N, M)."""
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    ix1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    iy1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    ix2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    iy2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-6), 0.0)
+
+
+def match_boxes(ious: np.ndarray, threshold: float = 0.3) -> list[tuple[int, int]]:
+    """Greedy one-to-one matching on an IoU matrix: highest IoU first, >= threshold."""
+    ious = np.array(ious, dtype=np.float32)
+    pairs: list[tuple[int, int]] = []
+    if ious.size == 0:
+        return pairs
+    while True:
+        i, j = np.unravel_index(np.argmax(ious), ious.shape)
+        if ious[i, j] < threshold:
+            return pairs
+        pairs.append((int(i), int(j)))
+        ious[i, :] = -1.0
+        ious[:, j] = -1.0
+
+
+def _warp_keypoints(keypoints: np.ndarray, src_box: np.ndarray, dst_box: np.ndarray) -> np.ndarray:
+    """Move keypoints with their box: same relative position inside the box."""
+    src_wh = np.maximum(src_box[2:] - src_box[:2], 1.0)
+    scale = (dst_box[2:] - dst_box[:2]) / src_wh
+    warped = keypoints.copy()
+    warped[:, :2] = (keypoints[:, :2] - src_box[:2]) * scale + dst_box[:2]
+    return warped
@@ -0,0 +1,171 @@
+"""
+Persistent per-video detection cache for /detect and /jobs.
+
+Clinicians re-upload the same recording with different analysis_type hints,
+but the hint only changes the final aggregation step: the per-frame
+detections and poses are the same every time. VideoResultCache stores the
+hint-independent part of an analysis (frame_detections, the
+ClinicalContextAccumulator counters, sampling stats) on disk, so a repeated
+upload only reruns analyze().
+
+Entries are keyed by the video content digest plus every parameter that
+changes the detections (sampling mode, stride, number of frames, model
+weights digests, backend, precision, inference mode...). On-disk layout:
+
+  <cache_dir>/<key>.json   one entry; its mtime is the last use
+
+The least recently used entries are deleted beyond max_bytes. The directory
+can be shared by several server processes: writes are atomic renames and the
+size bound is enforced from the directory listing.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any
+
+
+class VideoResultCache:
+    """
+    Usage:
+        cache = VideoResultCache(Path("assets/cache/videos"), max_bytes=256 * 1024 * 1024)
+        key = cache.key(video_path, {"mode": "dense", "stride": 15, "models": "..."})
+        entry = cache.get(key)
+        if entry is None:
+            entry = analyze_frames(video_path)
+            cache.put(key, entry)
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int = 256 * 1024 * 1024):
+        """
+        Args:
+            cache_dir: Where entries are stored (created on first put).
+            max_bytes: Total size of the entries kept on disk. 0 disables the cache.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def key(self, video_path: str | Path, params: dict) -> str | None:
+        """Cache key of a video file and the parameters of its analysis (None when disabled)."""
+        if not self.enabled:
+            return None
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(video_digest(video_path).encode())
+        digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def get(self, key: str | None) -> dict | None:
+        """Cached entry for `key`, or None."""
+        if key is None:
+            return None
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text())
+            os.utime(path)      # last use, for LRU eviction
+        except FileNotFoundError:
+            entry = None
+        except (OSError, ValueError) as exc:
+            print(f"[video_cache] Entrada ilegível descartada: {path.name} ({exc})")
+            path.unlink(missing_ok=True)
+            entry = None
+            with self._lock:
+                self.errors += 1
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def put(self, key: str | None, entry: dict[str, Any]):
+        """Store an entry (JSON-serializable) and evict beyond max_bytes."""
+        if key is None:
+            return
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            data = json.dumps(entry, separators=(",", ":")).encode()
+            if len(data) > self.max_bytes:
+                return
+            # Write-then-rename: concurrent readers never see a partial entry
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, self._path(key))
+            except BaseException:
+                os.unlink(tmp)
+                raise
+            self._evict()
+        except OSError as exc:
+            print(f"[video_cache] Falha ao gravar entrada {key}: {exc}")
+            with self._lock:
+                self.errors += 1
+
+    def clear(self):
+        for path in self.cache_dir.glob("*.json"):
+            path.unlink(missing_ok=True)
+
+    def stats(self) -> dict:
+        entries = self._entries()
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(entries),
+            "mb": round(sum(size for _, _, size in entries) / 2**20, 2),
+            "max_mb": round(self.max_bytes / 2**20, 2),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "errors": self.errors,
+        }
+
+    # ── Internals ─────────────────────────────────────────────────────────
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _entries(self) -> list[tuple[float, Path, int]]:
+        """(mtime, path, size) of every entry on disk."""
+        entries = []
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:   # evicted by another process meanwhile
+                continue
+            entries.append((st.st_mtime, path, st.st_size))
+        return entries
+
+    def _evict(self):
+        entries = sorted(self._entries(), key=lambda e: e[0])
+        total = sum(size for _, _, size in entries)
+        # Least recently used first
+        for _, path, size in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+
+def video_digest(path: str | Path) -> str:
+    """Content hash of a video file (read in 1 MB chunks)."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Tests import the service modules the way main.py does (from services.x import ...)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,60 @@
+"""crops inference mode: poses stay aligned with the person boxes."""
+import numpy as np
+
+from services.detector import YOLODetector
+
+
+class _Array:
+    """Stand-in for a torch tensor: .cpu().numpy()."""
+
+    def __init__(self, data):
+        self._data = np.asarray(data, dtype=np.float32)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self._data
+
+
+class _Data:
+    def __init__(self, data):
+        self.data = _Array(data)
+
+    def __len__(self):
+        return len(self.data.numpy())
+
+
+class _PoseResult:
+    """Pose Result of one crop, in crop coordinates: one pose per (box, keypoint x, y)."""
+
+    def __init__(self, poses: list[tuple[tuple[float, float, float, float], float, float]]):
+        boxes = [[*box, 0.9, 0] for box, _, _ in poses]
+        kps = [np.tile([x, y, 0.9], (17, 1)) for _, x, y in poses]
+        self.boxes = _Data(np.reshape(boxes, (-1, 6)))
+        self.keypoints = _Data(np.reshape(kps, (-1, 17, 3)))
+
+
+def test_person_without_pose_keeps_later_poses_aligned(monkeypatch):
+    detector = YOLODetector(inference_mode="crops", pose_crop_padding=0.0)
+    detector._local.pose_model = object()   # never loaded: _predict is replaced
+
+    frame = np.zeros((200, 400, 3), dtype=np.uint8)
+    boxes = [(0, 0, 100, 200), (150, 0, 250, 200), (300, 0, 400, 200)]
+    # The crops are exactly the boxes (no padding); the middle one has no pose
+    results = [
+        _PoseResult([((0, 0, 100, 200), 10, 20)]),
+        _PoseResult([]),
+        _PoseResult([((0, 0, 100, 200), 30, 40)]),
+    ]
+    monkeypatch.setattr(detector, "_predict", lambda model, crops, imgsz=None: results[:len(crops)])
+
+    (poses,) = detector.detect_poses_in_boxes([frame], [boxes])
+
+    assert len(poses) == len(boxes)
+    assert len(poses.postures) == len(boxes)
+    np.testing.assert_allclose(poses[0][:, :2], np.tile([10, 20], (17, 1)))
+    assert not poses[1][:, 2].any()
+    # Third pose mapped back to frame coordinates of the third box
+    np.testing.assert_allclose(poses[2][:, :2], np.tile([330, 40], (17, 1)))
+
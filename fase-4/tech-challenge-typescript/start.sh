@@ -224,7 +224,8 @@ cd "$SCRIPT_DIR"
 log_step "Aguardando serviços iniciarem..."
 
 if [ "$NO_YOLO" = false ]; then
-  wait_for_http "http://localhost:$YOLO_PORT/health" "YOLOv8 API  " 30
+  # /ready only answers 200 once the models are loaded and warmed up
+  wait_for_http "http://localhost:$YOLO_PORT/ready" "YOLOv8 API  " 120
 fi
 
 wait_for_http "http://localhost:$AGENTS_PORT/examples/index.html" "Agents API  " 30